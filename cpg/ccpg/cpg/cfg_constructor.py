@@ -1,5 +1,5 @@
-from networkx import DiGraph
-from utils.data_structure import Queue
+from utils.ast_index import ASTIndex
+from utils.compact_cpg import CFG_EDGE, CPGraph
 from utils.setting import logger
 from ccpg.util.common import cpg_edge_type
 
@@ -21,7 +21,10 @@ goto_statement
 declaration
 """
 
-def cfg_build(ast_cpg: DiGraph = None, node: str = None) -> list:
+statement_node_types = ['function_definition', 'labeled_statement', 'compound_statement', 'expression_statement', 'if_statement', 'switch_statement', 'switch_statement', 'do_statement', 'while_statement', 'for_statement', 'return_statement', 'break_statement', 'continue_statement', 'goto_statement', 'declaration', 'ret_type', 'case_statement']
+sibling_loop_types = ['for_statement', 'do_statement', 'while_statement', 'switch_statement']
+
+def cfg_build(ast_cpg: CPGraph = None, node: str = None) -> list:
     """Handler of Control Flow Graph builder.
 
     attributes:
@@ -69,73 +72,26 @@ def cfg_build(ast_cpg: DiGraph = None, node: str = None) -> list:
     
     return entrynode, fringe
 
-def is_statementnode(ast_cpg: DiGraph, node: str) -> bool:
+def is_statementnode(ast_cpg: CPGraph, node: str) -> bool:
     """Check one node is statement node or not"""
-    statement_node_types = ['function_definition', 'labeled_statement', 'compound_statement', 'expression_statement', 'if_statement', 'switch_statement', 'switch_statement', 'do_statement', 'while_statement', 'for_statement', 'return_statement', 'break_statement', 'continue_statement', 'goto_statement', 'declaration', 'ret_type', 'case_statement']
-
     return ast_cpg.nodes[node]['cpg_node'].node_type in statement_node_types
 
-def seek_parent(ast_cpg: DiGraph, node: str, node_types: list) -> str:
+def get_ast_index(ast_cpg: CPGraph) -> ASTIndex:
+    """AST index of ast_cpg, built once per function at the first lookup"""
+    if ast_cpg.ast_index == None:
+        ast_cpg.ast_index = ASTIndex(ast_cpg, statement_node_types)
+    return ast_cpg.ast_index
+
+def seek_parent(ast_cpg: CPGraph, node: str, node_types: list) -> str:
     """Find specific node whose type matches node type in node_types"""
-    queue = Queue()
-    queue.push(node)
-    visited = list()
-    visited.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-        predecessors = list(ast_cpg.predecessors(current_node))
-        for _predecessor in predecessors:
-            _predecessor_type = ast_cpg.nodes[_predecessor]['cpg_node'].node_type
-            if _predecessor_type not in node_types and is_statementnode(ast_cpg, _predecessor):
-                if _predecessor not in visited:
-                    visited.append(_predecessor)
-                    queue.push(_predecessor)
-                else:
-                    logger.debug('Seeks parent appears circle edge.')
-            elif _predecessor_type in node_types and is_statementnode(ast_cpg, _predecessor):
-                return _predecessor
-    
-    return False
+    return get_ast_index(ast_cpg).enclosing(node, node_types)
 
-def seek_statement_sibling(ast_cpg: DiGraph, node: str) -> str:
+def seek_statement_sibling(ast_cpg: CPGraph, node: str) -> str:
     """Find the node's next statement sibling"""
-    queue = Queue()
-    queue.push(node)
-    visited = list()
-    visited.append(node)
-
-    loop_types = ['for_statement', 'do_statement', 'while_statement', 'switch_statement']
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-        predecessors = list(ast_cpg.predecessors(current_node))
-        for _predecessor in predecessors:
-            _p_successors = list(ast_cpg.successors(_predecessor))
-            cur_node_idx = _p_successors.index(current_node) + 1
-            siblings = _p_successors[cur_node_idx:]
-            _has_statement_node = False
-            next_statement = None
-            for _sibling in siblings:
-                if is_statementnode(ast_cpg, _sibling):
-                    _has_statement_node = True
-                    next_statement = _sibling
-                    break
-            if _has_statement_node:
-                return next_statement
-            # the logic is for situation nested for, and second for has no sibling
-            elif not _has_statement_node and ast_cpg.nodes[_predecessor]['cpg_node'].node_type in loop_types:
-                return _predecessor
-            else:
-                if _predecessor not in visited:
-                    visited.append(_predecessor)
-                    queue.push(_predecessor)
-                else:
-                    logger.debug('Seek next statement has circle')
-    
-    return False
+    # the logic of loop types is for situation nested for, and second for has no sibling
+    return get_ast_index(ast_cpg).next_statement(node, sibling_loop_types)
 
-def has_default_case(ast_cpg: DiGraph, node: str) -> bool:
+def has_default_case(ast_cpg: CPGraph, node: str) -> bool:
     """Check whether switch statement has default option"""
     has_default = False
     node_successors = list(ast_cpg.successors(node))
@@ -144,7 +100,7 @@ def has_default_case(ast_cpg: DiGraph, node: str) -> bool:
             has_default = True
             break
     return has_default
-def has_else_default(ast_cpg: DiGraph, node: str):
+def has_else_default(ast_cpg: CPGraph, node: str):
     node_successors = ast_cpg.successors(node)
     res_has = False
     for _successor in node_successors:
@@ -154,20 +110,11 @@ def has_else_default(ast_cpg: DiGraph, node: str):
     
     return res_has
 
-def seek_labeled_statement(ast_cpg: DiGraph, label: str) -> str:
+def seek_labeled_statement(ast_cpg: CPGraph, label: str) -> str:
     """Find the labeled statement with specific label"""
-    # traverse all nodes in the graph and find labeled statement whose label token matches label.
-    all_nodes = ast_cpg.nodes
-    for _node in all_nodes:
-        if ast_cpg.nodes[_node]['cpg_node'].node_token == label:
-            labeled_statement = list(ast_cpg.predecessors(_node))
-            # only one parent
-            if len(labeled_statement) == 1:
-                return labeled_statement[0]
-    
-    return False
+    return get_ast_index(ast_cpg).labeled_statement(label)
 
-def cfg_singlenode(ast_cpg: DiGraph, node: str) -> list:
+def cfg_singlenode(ast_cpg: CPGraph, node: str) -> list:
     """Singlenode control flow graph"""
     entrynode = node
     fringe = [node]
@@ -176,7 +123,7 @@ def cfg_singlenode(ast_cpg: DiGraph, node: str) -> list:
 
     return [entrynode, fringe]
 
-def cfg_functiondefinition(ast_cpg: DiGraph, node: str) -> list:
+def cfg_functiondefinition(ast_cpg: CPGraph, node: str) -> list:
     """Parse function definition"""
     entrynode = node
     fringe = [node]
@@ -189,25 +136,25 @@ def cfg_functiondefinition(ast_cpg: DiGraph, node: str) -> list:
         if _s_entrynode == None:
             continue
         for _entrynode in fringe:
-            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type=edge_type)
         fringe = _s_fringe
     
     return [entrynode, fringe]
 
-def cfg_labeledstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_labeledstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse labeled statement"""
     entrynode = node
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
     labeled_statement_successors = list(ast_cpg.successors(node))
 
     _s_entrynode, fringe = cfg_build(ast_cpg, labeled_statement_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, _s_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, _s_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, _s_entrynode, edge_type=edge_type)
 
     return [entrynode, fringe]
 
-def cfg_compoundstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_compoundstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse compound statement"""
     entrynode = node
     fringe = [node]
@@ -222,7 +169,7 @@ def cfg_compoundstatement(ast_cpg: DiGraph, node: str) -> list:
         _s_entrynode_type = ast_cpg.nodes[_s_entrynode]['cpg_node'].node_type
         if _s_entrynode_type == 'case_statement':
             for _entrynode in fringe:
-                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
                 ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type=edge_type)
             # assume default is the last case (if there is default)
             if has_default_case(ast_cpg, _s_entrynode):
@@ -231,17 +178,17 @@ def cfg_compoundstatement(ast_cpg: DiGraph, node: str) -> list:
                 fringe = _s_fringe + [node]
         else:
             for _entrynode in fringe:
-                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
                 ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type=edge_type)
             fringe = _s_fringe
     
     return [entrynode, fringe]
 
-def cfg_expressionstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_expressionstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse expression statement"""
     return cfg_singlenode(ast_cpg, node)
 
-def cfg_ifstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_ifstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse if statement"""
     entrynode = node
     fringe = list()
@@ -252,15 +199,15 @@ def cfg_ifstatement(ast_cpg: DiGraph, node: str) -> list:
     # situation: only have then block
     if c_child == 3:
         then_entrynode, then_fringe = cfg_build(ast_cpg, if_statement_successors[2])
-        edge_type = cpg_edge_type(ast_cpg, entrynode, then_entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, entrynode, then_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, then_entrynode, edge_type=edge_type)
         fringe = then_fringe + [node]
     # situation: have both then and else block
     elif c_child == 5:
         then_entrynode, then_fringe = cfg_build(ast_cpg, if_statement_successors[2])
         else_entrynode, else_fringe = cfg_build(ast_cpg, if_statement_successors[4])
-        then_edge = cpg_edge_type(ast_cpg, entrynode, then_entrynode, '010')
-        else_edge = cpg_edge_type(ast_cpg, entrynode, else_entrynode, '010')
+        then_edge = cpg_edge_type(ast_cpg, entrynode, then_entrynode, CFG_EDGE)
+        else_edge = cpg_edge_type(ast_cpg, entrynode, else_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, then_entrynode, edge_type=then_edge)
         ast_cpg.add_edge(entrynode, else_entrynode, edge_type=else_edge)
         fringe = then_fringe + else_fringe
@@ -270,7 +217,7 @@ def cfg_ifstatement(ast_cpg: DiGraph, node: str) -> list:
     
     return [entrynode, fringe]
 
-def cfg_switchstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_switchstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse switch statement"""
     entrynode = node
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
@@ -278,12 +225,12 @@ def cfg_switchstatement(ast_cpg: DiGraph, node: str) -> list:
 
     # handle switch block
     sub_entrynode, fringe = cfg_build(ast_cpg, switch_statement_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type=edge_type)
 
     return [entrynode, fringe]
 
-def cfg_dostatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_dostatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse do statement"""
     entrynode = node
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
@@ -295,17 +242,17 @@ def cfg_dostatement(ast_cpg: DiGraph, node: str) -> list:
         exit(-1)
     # the second child is the body
     sub_entrynode, fringe = cfg_build(ast_cpg, do_statement_successors[1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type=edge_type)
 
     # add do while loop return edge
     for _fringe in fringe:
-        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, CFG_EDGE)
         ast_cpg.add_edge(_fringe, entrynode, edge_type=edge_type)
     
     return [entrynode, fringe]
 
-def cfg_whilestatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_whilestatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse while statement"""
     entrynode = node
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
@@ -315,17 +262,17 @@ def cfg_whilestatement(ast_cpg: DiGraph, node: str) -> list:
     sub_entrynode, fringe = cfg_build(ast_cpg, while_statement_successors[-1])
 
     if sub_entrynode:
-        edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, sub_entrynode, edge_type=edge_type)
     
     # add while loop return edge
     for _fringe in fringe:
-        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, CFG_EDGE)
         ast_cpg.add_edge(_fringe, entrynode, edge_type=edge_type)
     
     return [entrynode, fringe + [node]]
 
-def cfg_forstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_forstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse for statement"""
     entrynode = node
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
@@ -333,33 +280,33 @@ def cfg_forstatement(ast_cpg: DiGraph, node: str) -> list:
 
     # the last children is the for body
     sub_entrynode, fringe = cfg_build(ast_cpg, for_statement_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type=edge_type)
 
     # add for loop return edge
     for _fringe in fringe:
-        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, CFG_EDGE)
         ast_cpg.add_edge(_fringe, entrynode, edge_type=edge_type)
     
     return [entrynode, fringe + [node]]
 
-def cfg_returnstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_returnstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse return statement"""
     entrynode = node
     fringe = list()
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
 
-    _method = list(ast_cpg.nodes)[0]
+    _method = get_ast_index(ast_cpg).root
     ret_type = list(ast_cpg.successors(_method))[-1]
 
     # add edge between return statement and ret type
-    edge_type = cpg_edge_type(ast_cpg, entrynode, ret_type, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, ret_type, CFG_EDGE)
     ast_cpg.add_edge(entrynode, ret_type, edge_type=edge_type)
 
     return [entrynode, fringe]
     
 
-def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_breakstatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse break statement"""
     # In C, break statement has no label. 
     # Just find next statement, and add control flow edge
@@ -381,7 +328,7 @@ def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
     if parent_node:
         loop_node = seek_statement_sibling(ast_cpg, parent_node)
         if loop_node:
-            loop_guard_type = cpg_edge_type(ast_cpg, parent_node, loop_node, '010')
+            loop_guard_type = cpg_edge_type(ast_cpg, parent_node, loop_node, CFG_EDGE)
             ast_cpg.add_edge(parent_node, loop_node, edge_type=loop_guard_type)
     
     # break to next statement
@@ -397,12 +344,12 @@ def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
     if not next_statement_node:
         return [entrynode, fringe]
     else:
-        edge_type = cpg_edge_type(ast_cpg, node, next_statement_node, '010')
+        edge_type = cpg_edge_type(ast_cpg, node, next_statement_node, CFG_EDGE)
         ast_cpg.add_edge(node, next_statement_node, edge_type=edge_type)
     
     return [entrynode, fringe]
 
-def cfg_continuestatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_continuestatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse continue statement"""
     entrynode = node
     fringe = list()
@@ -413,7 +360,7 @@ def cfg_continuestatement(ast_cpg: DiGraph, node: str) -> list:
 
     if loop_node:
         # add edge from continue statement to loop node
-        edge_type = cpg_edge_type(ast_cpg, node, loop_node, '010')
+        edge_type = cpg_edge_type(ast_cpg, node, loop_node, CFG_EDGE)
         ast_cpg.add_edge(node, loop_node, edge_type=edge_type)
     
     parent_types = ['if_statement', 'switch_statement']
@@ -423,7 +370,7 @@ def cfg_continuestatement(ast_cpg: DiGraph, node: str) -> list:
     
     return [entrynode, fringe]
     
-def cfg_gotostatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_gotostatement(ast_cpg: CPGraph, node: str) -> list:
     """"Parse goto statement"""
     # goto statement has no fringe, connect it to the labeled statement.
 
@@ -444,25 +391,25 @@ def cfg_gotostatement(ast_cpg: DiGraph, node: str) -> list:
     if guarded_node and not has_else_default(ast_cpg, guarded_node):
         next_sibling = seek_statement_sibling(ast_cpg, guarded_node)
         if next_sibling:
-            _edge_type = cpg_edge_type(ast_cpg, guarded_node, next_sibling, '010')
+            _edge_type = cpg_edge_type(ast_cpg, guarded_node, next_sibling, CFG_EDGE)
             ast_cpg.add_edge(guarded_node, next_sibling, edge_type=_edge_type)
 
     label = ast_cpg.nodes[goto_statement_successors[-1]]['cpg_node'].node_token
     labeled_statement = seek_labeled_statement(ast_cpg, label)
     if labeled_statement:
-        edge_type = cpg_edge_type(ast_cpg, node, labeled_statement, '010')
+        edge_type = cpg_edge_type(ast_cpg, node, labeled_statement, CFG_EDGE)
         ast_cpg.add_edge(node, labeled_statement, edge_type=edge_type)
     
     return [entrynode, fringe]
 
-def cfg_declaration(ast_cpg: DiGraph, node: str) -> list:
+def cfg_declaration(ast_cpg: CPGraph, node: str) -> list:
     """Parse declaration"""
     return cfg_singlenode(ast_cpg, node)
 
-def cfg_rettype(ast_cpg: DiGraph, node: str) -> list:
+def cfg_rettype(ast_cpg: CPGraph, node: str) -> list:
     return cfg_singlenode(ast_cpg, node)
 
-def cfg_casestatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_casestatement(ast_cpg: CPGraph, node: str) -> list:
     """Parse case statement"""
     entrynode = node
     fringe = [node]
@@ -475,7 +422,7 @@ def cfg_casestatement(ast_cpg: DiGraph, node: str) -> list:
         if _s_entrynode == None:
             continue
         for _entrynode in fringe:
-            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type=edge_type)
         
         fringe = _s_fringe
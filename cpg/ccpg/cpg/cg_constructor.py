@@ -1,23 +1,70 @@
 from utils.setting import logger
-from utils.data_structure import Queue
+from utils.traversal import entity_successors, level_order, stat_successors
 from ccpg.cpg.ast_constructor import gen_ast_cpg
-from ccpg.cpg.cfg_constructor import cfg_build
+from ccpg.cpg.cfg_constructor import cfg_build, statement_node_types
 from ccpg.cpg.cg_node import CGNode, CalleeNode
 from ccpg.cpg.ddg_constructor import ddg_build
-from networkx import DiGraph
+from utils.compact_cpg import AST_EDGE, CPGraph
+from utils.complexity import ComplexityBudget, degrade_record, truncate_sast
+from utils.dedup import build_deduplicated
+from utils.parallel import ordered_imap
+from utils.parse_cache import ParseCache
+from utils.profiler import profile_func_phase
+from utils.supervisor import Budget, FailureReport, supervised_map
+from functools import partial
 
+# version of sast & cpg construction, bump it to invalidate parse cache entries
+CONSTRUCTOR_VERSION = '8'
 
+# functions and complexity budget of the running cg_dict_constructor, set once per build worker process
+worker_funcs = list()
+worker_complexity = None
 
-def check_edge(cpg: DiGraph, start: str, end: str) -> str:
+def check_edge(cpg: CPGraph, start: str, end: str) -> str:
     """Check the encoding of edge between start and end
     """
-    if cpg.has_edge(start, end):
-        return cpg[start][end]['edge_type']
+    edge_type = cpg.edge_type(start, end)
+    if edge_type != None:
+        return edge_type
     
     return False
 
-def cg_dict_constructor(func_list: list) -> dict:
-    """Parse all functions to construct func dict for call graph building.
+def build_cgnode(func, complexity: ComplexityBudget = None) -> CGNode:
+    """Construct cpg and CGNode of one function, functions over complexity are built in its degrade mode.
+    """
+    degraded = degrade_record(func.sast, statement_node_types, complexity)
+    mode = degraded[0] if degraded != None else None
+    sast = func.sast
+    if mode == 'truncate':
+        sast = truncate_sast(sast, statement_node_types, ['compound_statement'], complexity)
+    func_root = sast.root
+    with profile_func_phase('ast', func):
+        ast_cpg = gen_ast_cpg(sast)
+    if mode == 'ast_only':
+        for node in ast_cpg.nodes:
+            if ast_cpg.node_type(node) in statement_node_types:
+                ast_cpg.set_statement(node)
+        entrynode, fringe, callees = func_root, [func_root], dict()
+    else:
+        with profile_func_phase('cfg', func):
+            entrynode, fringe = cfg_build(ast_cpg, func_root)
+        if mode != 'skip_ddg':
+            with profile_func_phase('ddg', func):
+                ddg_build(ast_cpg, func_root)
+        with profile_func_phase('callees', func):
+            callees = list_all_callees(ast_cpg, func_root, func.file_name)
+    ast_cpg.freeze()
+
+    func_cgnode = CGNode(func.file_name, func.func_name, func.parameter_type, entrynode, fringe, ast_cpg, callees)
+    func_cgnode.degraded = degraded
+    return func_cgnode
+
+def cg_dict_constructor(func_list: list, cache: ParseCache = None, budget: Budget = None, report: FailureReport = None, workers: int = 1, complexity: ComplexityBudget = None) -> dict:
+    """Parse all functions to construct func dict for call graph building, CGNodes of unchanged files are taken from cache.
+
+    With budget, cpgs are built in supervised worker processes, functions failing or over budget are skipped and recorded in report.
+    Otherwise workers > 1 builds them with a process pool, the func dict is the same as the serial one.
+    Functions over complexity are built in its degrade mode and their CGNodes record it.
     """
     if func_list == None:
         logger.error('CG_dict_constructor needs function list, exit')
@@ -25,14 +72,23 @@ def cg_dict_constructor(func_list: list) -> dict:
     logger.info('Start generating function dict...')
     cg_dict = dict()
     logger.debug(len(func_list))
-    for func in func_list:
+    func_cgnodes = get_cached_cgnodes(func_list, cache, complexity)
+
+    def build(funcs: list, cgnodes: list) -> None:
+        if budget != None:
+            build_cgnodes_supervised(funcs, cgnodes, cache, budget, report, workers, complexity)
+        elif workers > 1:
+            build_cgnodes_parallel(funcs, cgnodes, cache, workers, complexity)
+        else:
+            build_cgnodes_serial(funcs, cgnodes, cache, complexity)
+
+    # identical functions share the cpg of one representative
+    build_deduplicated(func_list, func_cgnodes, build, share_cgnode, cache, report)
+    for func, func_cgnode in zip(func_list, func_cgnodes):
         # logger.error(func.file_name + '-' + func.func_name)
-        func_root = func.sast.root
-        ast_cpg = gen_ast_cpg(func.sast)
-        entrynode, fringe = cfg_build(ast_cpg, func_root)
-        ddg_build(ast_cpg, func_root)
-        callees = list_all_callees(ast_cpg, func_root, func.file_name)
-        func_cgnode = CGNode(func.file_name, func.func_name, func.parameter_type, entrynode, fringe, ast_cpg, callees)
+        if func_cgnode == None:
+            # skipped by the supervisor
+            continue
         key = func.file_name + '-' + func.func_name
         if key not in cg_dict.keys():
             cg_dict[key] = [func_cgnode]
@@ -42,60 +98,134 @@ def cg_dict_constructor(func_list: list) -> dict:
         
     return cg_dict
 
-def list_all_callees(cpg: DiGraph, node: str, file_name: str) -> dict:
+def share_cgnode(func, cgnode: CGNode) -> CGNode:
+    """CGNode of func on the cpg of cgnode, the CGNode of a function with the same sast, callees are bound to the file of func.
+    """
+    callees = dict()
+    for stat_node, _callees in cgnode.callees.items():
+        callees[stat_node] = [CalleeNode(x.node_key, func.file_name, x.callee_name, x.param_num) for x in _callees]
+
+    func_cgnode = CGNode(func.file_name, func.func_name, func.parameter_type, cgnode.entrynode, cgnode.fringe, cgnode.cpg, callees)
+    func_cgnode.degraded = cgnode.degraded
+    return func_cgnode
+
+def get_cached_cgnodes(func_list: list, cache: ParseCache = None, complexity: ComplexityBudget = None) -> list:
+    """CGNodes of functions found in cache, None for functions to build.
+
+    Only complete CGNodes of functions within complexity are taken, degraded ones depend on the budget they were built with.
+    """
+    if cache == None:
+        return [None] * len(func_list)
+
+    func_cgnodes = list()
+    for func in func_list:
+        func_cgnode = None
+        if degrade_record(func.sast, statement_node_types, complexity) == None:
+            func_cgnode = cache.get_cgnode(func)
+        if func_cgnode != None and func_cgnode.degraded != None:
+            func_cgnode = None
+        func_cgnodes.append(func_cgnode)
+
+    return func_cgnodes
+
+def init_build_worker(func_list: list, complexity: ComplexityBudget = None) -> None:
+    """Keep the function list and the complexity budget in the build worker process, tasks only carry indices into the list.
+    """
+    global worker_funcs, worker_complexity
+    worker_funcs = func_list
+    worker_complexity = complexity
+
+def build_compact_cgnode(idx: int) -> list:
+    """Build the cpg of worker_funcs[idx] in a build worker process.
+
+    returns:
+        [entrynode, fringe, compact_state, callees, degraded] -- CGNode fields with the cpg reduced to CPGraph.compact_state(), None if construction exits.
+                                                            Truncated cpgs do not share the nodes of the function sast, the whole cpg is returned instead of compact_state.
+    """
+    try:
+        func_cgnode = build_cgnode(worker_funcs[idx], worker_complexity)
+    except SystemExit:
+        return None
+
+    cpg_state = func_cgnode.cpg
+    if func_cgnode.degraded == None or func_cgnode.degraded[0] != 'truncate':
+        cpg_state = cpg_state.compact_state()
+    return [func_cgnode.entrynode, func_cgnode.fringe, cpg_state, func_cgnode.callees, func_cgnode.degraded]
+
+def build_cgnodes_parallel(func_list: list, func_cgnodes: list, cache: ParseCache, workers: int, complexity: ComplexityBudget = None) -> None:
+    """Fill missing CGNodes with a process pool, results are merged in the order of func_list.
+    """
+    todo = [idx for idx, cgnode in enumerate(func_cgnodes) if cgnode == None]
+    # several functions per task keep workers busy, small enough to balance large functions
+    chunksize = max(1, min(64, len(todo) // (workers * 8)))
+    results = ordered_imap(build_compact_cgnode, todo, workers, init_build_worker, (func_list, complexity), chunksize)
+    for idx, res in zip(todo, results):
+        func = func_list[idx]
+        if res == None:
+            logger.error(f'Constructing cpg of {func.file_name} {func.func_name} failed, exit.')
+            exit(-1)
+        entrynode, fringe, cpg_state, callees, degraded = res
+        if not isinstance(cpg_state, CPGraph):
+            cpg_state = CPGraph(func.sast, cpg_state)
+        func_cgnode = CGNode(func.file_name, func.func_name, func.parameter_type, entrynode, fringe, cpg_state, callees)
+        func_cgnode.degraded = degraded
+        func_cgnodes[idx] = func_cgnode
+        if cache != None:
+            cache.put_cgnode(func, func_cgnode)
+
+def build_cgnodes_serial(func_list: list, func_cgnodes: list, cache: ParseCache, complexity: ComplexityBudget = None) -> None:
+    """Fill missing CGNodes in the current process.
+    """
+    for idx, func in enumerate(func_list):
+        if func_cgnodes[idx] != None:
+            continue
+        func_cgnodes[idx] = build_cgnode(func, complexity)
+        if cache != None:
+            cache.put_cgnode(func, func_cgnodes[idx])
+
+def build_cgnodes_supervised(func_list: list, func_cgnodes: list, cache: ParseCache, budget: Budget, report: FailureReport, workers: int, complexity: ComplexityBudget = None) -> None:
+    """Fill missing CGNodes in supervised worker processes, functions failing or over budget stay None and are reported.
+    """
+    todo = [idx for idx, cgnode in enumerate(func_cgnodes) if cgnode == None]
+    results = supervised_map(partial(build_cgnode, complexity=complexity), [func_list[idx] for idx in todo], workers, budget)
+    for idx, [status, func_cgnode, detail, elapsed] in zip(todo, results):
+        func = func_list[idx]
+        if status != 'ok':
+            if report != None:
+                report.add('cpg', func.file_name, func.func_name, status, detail, elapsed)
+            continue
+        func_cgnodes[idx] = func_cgnode
+        if cache != None:
+            cache.put_cgnode(func, func_cgnode)
+
+def list_all_callees(cpg: CPGraph, node: str, file_name: str) -> dict:
     """Given a code property graph instance and its root node, traverse all statements and find related callees.
     """
     callee_info = dict()
 
-    visited = list()
-    queue = Queue()
-    queue.push(node)
-    visited.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
+    for current_node in level_order(node, lambda x: stat_successors(cpg, x)):
         callees = extract_callees(cpg, current_node, file_name)
         if current_node in callee_info:
             logger.error('Callees exist duplicate dict key, exit')
             exit(-1)
         if len(callees) > 0:
             callee_info[current_node] = callees
-        
-        node_successors = list(cpg.successors(current_node))
-        for _successor in node_successors:
-            if cpg.nodes[_successor]['cpg_node'].match_statement and _successor not in visited and check_edge(cpg, current_node, _successor) in ['010', '110', '011', '111']:
-                queue.push(_successor)
-                visited.append(_successor)
     
     return callee_info
 
-def extract_callees(cpg: DiGraph, node: str, file_name: str) -> list:
+def extract_callees(cpg: CPGraph, node: str, file_name: str) -> list:
     """Given a code property graph instance and one statement node, find callees rooted by this statement. 
     """
     callee_list = list()
 
-    visited = list()
-    queue = Queue()
-    queue.push(node)
-    visited.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
+    for current_node in level_order(node, lambda x: entity_successors(cpg, x, AST_EDGE)):
         if cpg.nodes[current_node]['cpg_node'].node_type == 'call_expression':
             callee_node = extract_single_callee(cpg, node, current_node, file_name)
             callee_list.append(callee_node)
-        
-        node_successors = list(cpg.successors(current_node))
-        for _successor in node_successors:
-            if cpg.nodes[_successor]['cpg_node'].match_statement:
-                continue
-            if check_edge(cpg, current_node, _successor) in ['100'] and _successor not in visited:
-                queue.push(_successor)
-                visited.append(_successor)
     
     return callee_list
 
-def extract_single_callee(cpg: DiGraph, stat_node: str, invocation_node: str, file_name: str) -> CalleeNode:
+def extract_single_callee(cpg: CPGraph, stat_node: str, invocation_node: str, file_name: str) -> CalleeNode:
     """Extract callee information and construct calleenode.
     """
     node_successors = list(cpg.successors(invocation_node))
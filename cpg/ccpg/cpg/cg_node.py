@@ -1,7 +1,8 @@
-from networkx import DiGraph
+from utils.compact_cpg import CPGraph
+from utils.pickling import Slotted, intern_str
 from utils.setting import logger
 
-class CGNode():
+class CGNode(Slotted):
     """Function Meta Structure for call graph construction.
 
     Consider the OJ dataset structure, we construct call graph with file as basic unit.
@@ -10,42 +11,55 @@ class CGNode():
         file_name: A string indicating the file name including current function.
         func_name: A string indicating the name of current function.
         parameter_type: A list including parameter types of current function.
-        entrynode: A string indicating the entry point of cpg.
+        entrynode: An integer indicating the entry point of cpg.
         fringe: A list including control flow graph out points.
-        cpg: A DiGraph indicating code property graph of current function.
+        cpg: A CPGraph indicating code property graph of current function.
         callees: A dict including function call points in current function.
+        node_base: An integer added to node ids of cpg to make them unique across functions, assigned at encoding.
+        degraded: None if cpg is complete, otherwise a list [mode, node number, statement number] of a function built over its complexity budget.
+
+    File, function and parameter type names are interned, they repeat across the CGNodes of a corpus.
     """
-    def __init__(self, file_name: str, func_name: str, parameter_type: list, entrynode: str, fringe: list, cpg: DiGraph, callees: dict) -> None:
+    __slots__ = ['file_name', 'func_name', 'parameter_type', 'entrynode', 'fringe', 'cpg', 'callees', 'node_base', 'degraded']
+    slot_defaults = {'node_base': 0, 'degraded': None}
+    interned = ('file_name', 'func_name')
+
+    def __init__(self, file_name: str, func_name: str, parameter_type: list, entrynode: int, fringe: list, cpg: CPGraph, callees: dict) -> None:
         """Init CGNode class with specifc parameters.
         """
-        self.file_name = file_name
-        self.func_name = func_name
-        self.parameter_type = parameter_type
+        self.file_name = intern_str(file_name)
+        self.func_name = intern_str(func_name)
+        self.parameter_type = [intern_str(x) for x in parameter_type]
         self.entrynode = entrynode
         self.fringe = fringe
         self.cpg = cpg
         self.callees = callees
+        self.node_base = 0
+        self.degraded = None
     
     def get_key(self) -> str:
         """Generate a unique key for this function.
         """
         return self.file_name + '-' + self.func_name
 
-class CalleeNode():
+class CalleeNode(Slotted):
     """Class structure for callee function meta information.
 
     Attributes:
-        node_key: A string indicating statement node key
+        node_key: An integer indicating statement node id in the cpg of the caller
         file_name: A string indicating file name including the callee function.
         callee_name: A string indicating the name of callee function.
         param_num: An integer indicating the number of arguments.
     """
-    def __init__(self, node_key: str, file_name: str, callee_name: str, param_num: int) -> None:
+    __slots__ = ['node_key', 'file_name', 'callee_name', 'param_num']
+    interned = ('file_name', 'callee_name')
+
+    def __init__(self, node_key: int, file_name: str, callee_name: str, param_num: int) -> None:
         """Init CalleeNode class with specific parameters
         """
         self.node_key = node_key
-        self.file_name = file_name
-        self.callee_name = callee_name
+        self.file_name = intern_str(file_name)
+        self.callee_name = intern_str(callee_name)
         self.param_num = param_num
 
     def get_key(self) -> str:
@@ -1,4 +1,9 @@
 from utils.setting import *
+from utils.discovery import read_source
+from utils.parse_cache import ParseCache, cached_imap, grammar_digest
+from utils.complexity import ComplexityBudget
+from utils.supervisor import Budget, FailureReport
+from ccpg.sast.parser_session import get_session
 from ccpg.sast.src_parser import *
 from ccpg.util.common import *
 from ccpg.util.visualize import *
@@ -46,38 +51,113 @@ def cpg4singlefile(file_path: str) -> list:
     
     return func_list
 
-def extract_funcs(dir_path: str) -> list:
-    """Extract all functions from multiple files
+def init_extract_worker() -> None:
+    """Load tree-sitter grammar and compile queries once per extraction process.
+    """
+    get_session()
+
+def extract_file_funcs(source) -> list:
+    """Parse one file with the parser of current process.
+
+    attributes:
+        source -- file path, or [member name, source code] of an archive member.
+
+    returns:
+        [file_path, file_funcs] -- file path and the FunUnits extracted from it.
+    """
+    file_path, src_code = read_source(source)
+    return [file_path, c_parser(file_path, src_code=src_code)]
+
+def iter_file_funcs(dir_path: str, workers: int = 1, cache: ParseCache = None, src_filter: SourceFilter = None, report: FailureReport = None):
+    """Yield the valid functions of each file in file order, see extract_funcs for the attributes.
     """
     if dir_path == None:
         logger.error('Extract funcs lacks directory path.')
     
-    files = traverse_src_files(dir_path, 'c')
-    func_list = list()
+    files = traverse_src_files(dir_path, 'c', src_filter)
     logger.info('Extract functions...')
-    for file in files:
+    for file, file_func in cached_imap(extract_file_funcs, files, workers, init_extract_worker, cache):
         logger.info(file)
-        file_func = c_parser(file)
         if len(file_func) == 0:
+            if report != None:
+                report.add('extract', file, '', 'no_function')
+                continue
             logger.warn(file)
             exit(-1)
         if not has_entry_function(file_func):
+            if report != None:
+                report.add('extract', file, '', 'no_entry_function')
+                continue
             logger.warn(file)
             exit(-1)
+        file_funcs = list()
         for func in file_func:
+            # entries of the parse cache are shared by equal files of other directories
+            func.file_path = file
             if not func.has_type('ERROR'):
-                func_list.append(func)
+                file_funcs.append(func)
+            elif report != None:
+                report.add('extract', file, func.func_name, 'parse_error')
             else:
                 logger.error(file)
                 logger.error(func.func_name)
                 exit(-1)
+        yield file_funcs
+
+def extract_funcs(dir_path: str, workers: int = 1, cache: ParseCache = None, src_filter: SourceFilter = None, report: FailureReport = None) -> list:
+    """Extract all functions from multiple files
+
+    attributes:
+        dir_path -- directory (or .tar, .tar.gz, .zip archive) including c files.
+        workers -- number of parsing processes, functions keep the order of the serial path.
+        cache -- parse cache, unchanged files are loaded from it instead of being parsed.
+        src_filter -- size, exclude and shard options of source files.
+        report -- if given, malformed files and functions are skipped and recorded instead of exiting.
+    """
+    func_list = list()
+    for file_funcs in iter_file_funcs(dir_path, workers, cache, src_filter, report):
+        func_list += file_funcs
     
     return func_list
 
-def cpg4multifiles(func_list: list) -> dict:
-    """Generate cpg for multi files.
+def open_parse_cache(cache_path: str, max_size: int) -> ParseCache:
+    """Open the parse cache of c files, entries are bound to current grammar and constructor version.
+
+    attributes:
+        cache_path -- root directory of the parse cache.
+        max_size -- upper bound of the cache size in MB.
+    """
+    version = 'c-{}-{}' .format(grammar_digest(get_session().parser.lib_path), CONSTRUCTOR_VERSION)
+    return ParseCache(os.path.join(cache_path, 'c'), max_size * 1024 * 1024, version)
+
+def cpg4multifiles(func_list: list, cache: ParseCache = None, budget: Budget = None, report: FailureReport = None, workers: int = 1, complexity: ComplexityBudget = None) -> dict:
+    """Generate cpg for multi files, CGNodes of unchanged files are taken from cache.
+
+    With budget, cpgs are built in supervised worker processes and functions over budget are skipped and recorded in report.
+    Functions over complexity are built in its degrade mode.
     """
     logger.info('Generate CPG Dict...')
-    cpg_dict = cg_dict_constructor(func_list)
+    cpg_dict = cg_dict_constructor(func_list, cache, budget, report, workers, complexity)
+
+    return cpg_dict
+
+def cpg4chunks(dir_path: str, chunk_size: int, workers: int = 1, cache: ParseCache = None, src_filter: SourceFilter = None, budget: Budget = None, report: FailureReport = None, complexity: ComplexityBudget = None):
+    """Yield [func_list, func_dict] of consecutive files holding at least chunk_size functions (the last chunk may hold fewer),
+    so that only one chunk of cpgs is built at a time. Functions of one file stay in one chunk.
+
+    Cache entries of a chunk are stored once the next chunk is requested.
+    """
+    func_list = list()
+    for file_funcs in iter_file_funcs(dir_path, workers, cache, src_filter, report):
+        func_list += file_funcs
+        if len(func_list) < chunk_size:
+            continue
+        yield [func_list, cpg4multifiles(func_list, cache, budget, report, workers, complexity)]
+        if cache != None:
+            cache.store()
+        func_list = list()
 
-    return cpg_dict
\ No newline at end of file
+    if len(func_list) > 0:
+        yield [func_list, cpg4multifiles(func_list, cache, budget, report, workers, complexity)]
+        if cache != None:
+            cache.store()
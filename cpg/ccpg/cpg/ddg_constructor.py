@@ -1,36 +1,46 @@
-from networkx import DiGraph
+from collections import deque
+from utils.compact_cpg import DDG_EDGE, CPGraph
+from utils.dataflow import reaching_def_edges
 from utils.setting import logger
-from utils.data_structure import Queue
+from utils.traversal import level_order, stat_predecessors, stat_successors
 from ccpg.util.common import cpg_edge_type
 from ccpg.cpg.ddg_node import DDGNode
 
 
-def ddg_build(cfg_cpg: DiGraph, node: str):
+def ddg_build(cfg_cpg: CPGraph, node: str):
     """Identify def-use information in control-flow based code property graph and generate data flow edge for cfg_cpg to form complete code property graph.
     """
     def_use_chain = gen_def_use_chain(cfg_cpg, node)
+    ddg_edges = reaching_def_edges(cfg_cpg, def_use_chain)
+    if ddg_edges == None:
+        ddg_back_tracking(cfg_cpg, def_use_chain)
+        return
+    for _def, _use in ddg_edges:
+        add_ddg_edge(cfg_cpg, _def, _use)
+
+def ddg_back_tracking(cfg_cpg: CPGraph, def_use_chain: dict) -> None:
+    """Add data flow edges by a backward search from every used variable, used when reaching_def_edges cannot decide the edges.
+    """
     for key, value in def_use_chain.items():
         if value.uses == []:
             continue
         for use_var in value.uses:
             back_tracking(cfg_cpg, key, def_use_chain, use_var)
 
-def back_tracking(cfg_cpg: DiGraph, node: str, def_use_chain: dict, use_var: str) -> bool:
+def back_tracking(cfg_cpg: CPGraph, node: str, def_use_chain: dict, use_var: str) -> bool:
     """Given cfg-based code property graph and a node identifier, then do back tracking to add data flow edge
     """
-    visited = list()
-    queue = Queue()
+    visited = set()
+    queue = deque()
     if node == None:
         return True
     
-    queue.push(node)
-    while not queue.is_empty():
-        current_node = queue.pop()
-        visited.append(current_node)
-        predecessors = list(cfg_cpg.predecessors(current_node))
-        for _predecessor in predecessors:
-            _match_stat = cfg_cpg.nodes[_predecessor]['cpg_node'].match_statement
-            if _match_stat and _predecessor not in visited and check_edge(cfg_cpg, _predecessor, current_node) in ['010', '110', '011', '111']:
+    queue.append(node)
+    while queue:
+        current_node = queue.popleft()
+        visited.add(current_node)
+        for _predecessor in stat_predecessors(cfg_cpg, current_node):
+            if _predecessor not in visited:
                 if _predecessor not in def_use_chain:
                     # logger.error(cfg_cpg.nodes[current_node]['cpg_node'].node_type)
                     # logger.error(cfg_cpg.nodes[_predecessor]['cpg_node'].node_type)
@@ -41,7 +51,7 @@ def back_tracking(cfg_cpg: DiGraph, node: str, def_use_chain: dict, use_var: str
                 if has_dd_rel(use_var, ddg_predecessor):
                     add_ddg_edge(cfg_cpg, ddg_predecessor.node_key, node)
                 else:
-                    queue.push(_predecessor)
+                    queue.append(_predecessor)
     
     return True
 
@@ -58,49 +68,38 @@ def has_dd_rel(use_var: str, def_node: DDGNode) -> bool:
     
     return _dd_rel
 
-def add_ddg_edge(cfg_cpg: DiGraph, start_node_identifier: str, end_node_identifier: str) -> bool:
+def add_ddg_edge(cfg_cpg: CPGraph, start_node_identifier: str, end_node_identifier: str) -> bool:
     """Add data flow edge into cfg_cpg to form the complete code property graph
     """
-    edge_type = cpg_edge_type(cfg_cpg, start_node_identifier, end_node_identifier, '001')
+    edge_type = cpg_edge_type(cfg_cpg, start_node_identifier, end_node_identifier, DDG_EDGE)
     cfg_cpg.add_edge(start_node_identifier, end_node_identifier, edge_type=edge_type)
 
     return True
 
-def check_edge(cfg_cpg: DiGraph, start: str, end: str) -> str:
+def check_edge(cfg_cpg: CPGraph, start: str, end: str) -> str:
     """Check the encoding of edge between start and end.
     """
-    if cfg_cpg.has_edge(start, end):
-        return cfg_cpg[start][end]['edge_type']
+    edge_type = cfg_cpg.edge_type(start, end)
+    if edge_type != None:
+        return edge_type
     
     return False
 
-def gen_def_use_chain(cfg_cpg: DiGraph, node: str) -> dict:
+def gen_def_use_chain(cfg_cpg: CPGraph, node: str) -> dict:
     """Traverse cfg_cpg and extract def-use information for each statement node in order. Note, we traverse the graph by level-order.
     """
     ddg_chain = dict()
 
-    check_exist = list()
-    queue = Queue()
-    queue.push(node)
-    check_exist.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
+    for current_node in level_order(node, lambda x: stat_successors(cfg_cpg, x)):
         ddg_node = merge_def_use(cfg_cpg, current_node)
         if ddg_node.node_key in ddg_chain:
             logger.error('Appear duplicated Dict key, exit.')
             exit(-1)
         ddg_chain[ddg_node.node_key] = ddg_node
-        node_successors = list(cfg_cpg.successors(current_node))
-        for _successor in node_successors:
-            if cfg_cpg.nodes[_successor]['cpg_node'].match_statement and _successor not in check_exist and check_edge(cfg_cpg, current_node, _successor) in ['010', '110', '011', '111']:
-                # logger.error(_successor)
-                queue.push(_successor)
-                check_exist.append(_successor)
-    
+
     return ddg_chain
 
-def merge_def_use(cfg_cpg: DiGraph, node: str) -> DDGNode:
+def merge_def_use(cfg_cpg: CPGraph, node: str) -> DDGNode:
     """Parse one statement node, and traverse its all child entities (non-cfg) to collect its def use information and merge them together.
     """
     defs, uses, unknown = [], [], []
@@ -134,7 +133,7 @@ def merge_def_use(cfg_cpg: DiGraph, node: str) -> DDGNode:
 
     return DDGNode(node, cfg_cpg.nodes[node]['cpg_node'].node_type, tmp_defs, tmp_uses, tmp_unknown)
     
-def extract_def_use(cfg_cpg: DiGraph, node: str) -> list:
+def extract_def_use(cfg_cpg: CPGraph, node: str) -> list:
     """Traverse entities of statement identified by node to extract its def-use information.
     """
     node_type = cfg_cpg.nodes[node]['cpg_node'].node_type
@@ -182,7 +181,7 @@ def extract_def_use(cfg_cpg: DiGraph, node: str) -> list:
     
     return [defs, uses, unknown]
 
-def ddg_deeper(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_deeper(cfg_cpg: CPGraph, node: str) -> list:
     """Parse node not be expression"""
     defs, uses, unknown = [], [], []
     node_successors = list(cfg_cpg.successors(node))
@@ -222,7 +221,7 @@ def combine_fields(left_v: list, right_v: list) -> list:
 Handle Expressions
 """
 # conditional_expression
-def ddg_conditional_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_conditional_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse conditional expression and extract def use information
     
     Three children: condition, consequence, alternative
@@ -243,7 +242,7 @@ def ddg_conditional_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # assignment_expression
-def ddg_assignment_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_assignment_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse assignment expression and extract def use information
     
     Left part of assignment expression belongs to defs.
@@ -270,7 +269,7 @@ def ddg_assignment_expression(cfg_cpg: DiGraph, node: str) -> list:
 
 
 # binary_expression
-def ddg_binary_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_binary_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse binary expression and extract def use information
     
     Three children: left, right --> identifier, middle --> operator
@@ -294,7 +293,7 @@ def ddg_binary_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # unary_expression
-def ddg_unary_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_unary_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse unary expression and extract def use information.
 
     Two children: operator & argument
@@ -314,7 +313,7 @@ def ddg_unary_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # update_expression
-def ddg_update_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_update_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse identifier and extract def use information.
 
     Two children argument & operator:
@@ -340,7 +339,7 @@ def ddg_update_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # cast_expression
-def ddg_cast_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_cast_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse cast expression and extract def use information.
 
     Two children: type_descriptor, expression
@@ -360,7 +359,7 @@ def ddg_cast_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # pointer_expression
-def ddg_pointer_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_pointer_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse pointer expression and extract def use information.
     
     Two children: operator, expression
@@ -380,7 +379,7 @@ def ddg_pointer_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # sizeof_expression
-def ddg_sizeof_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_sizeof_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse sizeof expression and extract def use information.
     
     Two children, right child belongs to use.
@@ -399,7 +398,7 @@ def ddg_sizeof_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # subscript_expression
-def ddg_subscript_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_subscript_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse subscript expression and extract def use information.
     
     Two children, both children belongs to uses.
@@ -419,7 +418,7 @@ def ddg_subscript_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # call_expression
-def ddg_call_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_call_expression(cfg_cpg: CPGraph, node: str) -> list:
     """parse call expression and extract def use information.
     
     Two children: call expression only has used variables.
@@ -436,7 +435,7 @@ def ddg_call_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # field_expression
-def ddg_field_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_field_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse field expression and extract def use information.
     
     Two children, need combination (a.b.c, use a, a.b, a.b.c)
@@ -459,7 +458,7 @@ def ddg_field_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # compound_literal_expression
-def ddg_compound_literal_expression(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_compound_literal_expression(cfg_cpg: CPGraph, node: str) -> list:
     """Parse compound literal expression and extract def use information
     
     Two children, both of them belong to uses.
@@ -478,7 +477,7 @@ def ddg_compound_literal_expression(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # identifier
-def ddg_identifier(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_identifier(cfg_cpg: CPGraph, node: str) -> list:
     """Parse identifier and extract def use information. 
     
     Identifier cannot reflect its def use information accurately. We set it as unknown by default.
@@ -492,7 +491,7 @@ def ddg_identifier(cfg_cpg: DiGraph, node: str) -> list:
 Other expressions
 """
 # argument_list
-def ddg_argument_list(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_argument_list(cfg_cpg: CPGraph, node: str) -> list:
     """Parse argument list and extract def use information.
 
     Do not know the number of children. However, all of them belong to uses.
@@ -509,7 +508,7 @@ def ddg_argument_list(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # init_declarator
-def ddg_init_declarator(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_init_declarator(cfg_cpg: CPGraph, node: str) -> list:
     """Parse init declarator and extract def use information.
 
     Three children
@@ -532,7 +531,7 @@ def ddg_init_declarator(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # initializer_list
-def ddg_initializer_list(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_initializer_list(cfg_cpg: CPGraph, node: str) -> list:
     """Parse initializer list
     
     Do not the number of children, however, all of them belong to use.
@@ -550,7 +549,7 @@ def ddg_initializer_list(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # parameter_declaration
-def ddg_parameter_declaration(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_parameter_declaration(cfg_cpg: CPGraph, node: str) -> list:
     """Parse parameter_declaration and extract def use information.
 
     All children belong to defs.
@@ -568,7 +567,7 @@ def ddg_parameter_declaration(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # declaration
-def ddg_declaration(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_declaration(cfg_cpg: CPGraph, node: str) -> list:
     """Parse declaration and extract def use information.
 
     Convert all unknown to defs
@@ -586,7 +585,7 @@ def ddg_declaration(cfg_cpg: DiGraph, node: str) -> list:
     return [defs, uses, unknown]
 
 # array_declarator
-def ddg_array_declarator(cfg_cpg: DiGraph, node: str) -> list:
+def ddg_array_declarator(cfg_cpg: CPGraph, node: str) -> list:
     """Parse array declarator and extract def use information.
     
     All children should belong to uses.
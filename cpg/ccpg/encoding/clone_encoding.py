@@ -1,7 +1,7 @@
 from ccpg.encoding.encoding_new import encoding_clone_entities
 
-def encoding_clone(encode_path: str, func_dict: dict) -> None:
-    """Encoding OJ functionalities [1-15] for code clone detection.
+def clone_entities(func_dict: dict) -> dict:
+    """Global node ids of the functions of each file, keyed by file name.
     """
     functionality_dict = dict()
 
@@ -12,11 +12,15 @@ def encoding_clone(encode_path: str, func_dict: dict) -> None:
     
     for cg_node in all_cg_nodes:
         key = cg_node.file_name
-        cg_entities = list(cg_node.cpg.nodes)
+        cg_entities = [cg_node.node_base + x for x in cg_node.cpg.nodes]
         if key in functionality_dict:
             functionality_dict[key] += cg_entities
         else:
             functionality_dict[key] = cg_entities
-    
-    encoding_clone_entities(encode_path, functionality_dict)
 
+    return functionality_dict
+
+def encoding_clone(encode_path: str, func_dict: dict, entity_id: list = None) -> None:
+    """Encoding OJ functionalities [1-15] for code clone detection.
+    """
+    encoding_clone_entities(encode_path, clone_entities(func_dict), entity_id)
@@ -1,10 +1,14 @@
 import os
+from utils.compact_cpg import AST_EDGE, CFG_EDGE, DDG_EDGE
 from utils.setting import logger
 
-def encoding_entity(clone_classification: str, encode_path: str, entities: list, start_idx: int = 0) -> bool:
+def encoding_entity(clone_classification: str, encode_path: str, entities: list, start_idx: int = 0) -> list:
     """Encoding entity from start index and store it to local file.
     
     Note: we hardcode the file name as `data/entity2id.txt`
+
+    returns:
+        entity_id -- list whose index is the global node id and value is the entity id.
     """
 
     file_name = 'entity2id.txt'
@@ -52,21 +56,26 @@ def encoding_entity(clone_classification: str, encode_path: str, entities: list,
         entity_list.append(_v)
     
     logger.info('Encoding entities: {}' .format(len(entity_list)))
+    node_num = max([x[0] for x in entities]) + 1 if length else 0
+    entity_id = [None] * node_num
+
     # write result to entity2id.txt
     with open(file_name, 'w') as entity2id:
         line_num = str(len(entity_list)) + '\n'
         entity2id.write(line_num)
 
         for idx in range(len(entity_list)):
-            id = idx + start_idx
-            _entity_item = [x.strip('\n').replace(',', ' ') for x in entity_list[idx]]
-            line = str(id) + ',' + ','.join(_entity_item) + '\n'
+            id = str(idx + start_idx)
+            _entity_item = [x.strip('\n').replace(',', ' ') for x in entity_list[idx][:2]]
+            for node in entity_list[idx][2:]:
+                entity_id[node] = id
+            line = id + ',' + ','.join(_entity_item + [str(x) for x in entity_list[idx][2:]]) + '\n'
             entity2id.write(line)
     
-    return True
+    return entity_id
 
-def load_entity_id(encode_path: str) -> dict:
-    """Load entity pair dict, key is the hashkey and value is the id.
+def load_entity_id(encode_path: str) -> list:
+    """Load entity ids of global node ids, index is the global node id and value is the entity id.
     """
     file_name = 'entity2id.txt'
     file_name = os.path.join(encode_path, file_name)
@@ -75,64 +84,51 @@ def load_entity_id(encode_path: str) -> dict:
         logger.error('Cannot find entity2id file, please check.')
         exit(-1)
     
-    entity_id = dict()
+    entity_id = list()
 
     with open(file_name, 'r') as entity2id:
         lines = entity2id.readlines()
     
     for line in lines[1:]:
         line = line.strip('\n').split(',', 3)
-        for hash_id in line[3].split(','):
-            entity_id[hash_id] = line[0]
+        for node in line[3].split(','):
+            node = int(node)
+            if node >= len(entity_id):
+                entity_id += [None] * (node + 1 - len(entity_id))
+            entity_id[node] = line[0]
     
     # logger.info('Load Unique Entities: {}' .format(len(entity_id)))
 
     return entity_id
 
-def load_rel_id(encode_path: str) -> dict:
-    """Load relation id dict
+def find_entity_id(entity_id: list, node: int) -> str:
+    """Return the entity id of a global node id, None if the node is not encoded.
     """
-    file_name = 'rel2id.txt'
-    file_name = os.path.join(encode_path, file_name)
-    if not os.path.exists(file_name):
-        logger.error('Cannot find rel2id file, please check it')
-        exit(-1)
+    if node < 0 or node >= len(entity_id):
+        return None
     
-    rel_id = dict()
-    with open(file_name, 'r') as rel2id:
-        lines = rel2id.readlines()
-    
-    for line in lines[1:]:
-        line = line.strip('\n').split(',')
-        key, id = line[0], line[1]
-        rel_id[key] = id
-    
-    if len(rel_id) != len(lines) - 1:
-        logger.error('Exist Hash Collision, exit')
-        exit(-1)
-    logger.info(f'Load Relations: {len(rel_id)}')
-
-    return rel_id
+    return entity_id[node]
 
-def encoding_triplet(encode_path: str, edges: list) -> bool:
-    """Encode relation between CPGNode and store it to local file.
+def encoding_triplet(encode_path: str, edges: list, entity_id: list = None) -> bool:
+    """Encode relation between CPGNode and store it to local file, entity ids are loaded from entity2id.txt if None.
     """
     triplet_name = 'triple2id.txt'
     triplet_name = os.path.join(encode_path, triplet_name)
 
-    entity_id = load_entity_id(encode_path)
-    rel_id = load_rel_id(encode_path)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
 
     edge_list = list()
 
     for edge in edges:
         start, end, edge_type = edge
-        if start not in entity_id.keys() or end not in entity_id.keys():
+        s = find_entity_id(entity_id, start)
+        e = find_entity_id(entity_id, end)
+        if s == None or e == None:
             logger.error('Appear isolated edge (cannot find start or end node in graph).')
             exit(-1)
-        s = entity_id[start]
-        e = entity_id[end]
-        e_t = rel_id[edge_type]
+        # relation ids in rel2id.txt are the edge type bitmasks
+        e_t = str(edge_type)
         
         edge_list.append([s, e, e_t])
     
@@ -146,33 +142,42 @@ def encoding_triplet(encode_path: str, edges: list) -> bool:
 
     return True
 
-def encoding_statnodes(encode_path: str, s_es: list) -> bool:
-    """Encode statement node entities.
+def encoding_statnodes(encode_path: str, s_es, entity_id: list = None, stat_num: int = None) -> bool:
+    """Encode statement node entities, entity ids are loaded from entity2id.txt if None.
+
+    attributes:
+        s_es -- iterable of [statement, statement, entities...] rows of global node ids.
+        stat_num -- number of rows, if given rows are written as s_es yields them instead of being collected first.
     """
     statnodes_name = 'stat2entity.txt'
     statnodes_name = os.path.join(encode_path, statnodes_name)
-    entity_id = load_entity_id(encode_path)
-
-    stat_nodes = list()
-    for stat_node in s_es:
-        stat_id = list()
-        for node in stat_node:
-            if node not in entity_id.keys():
-                logger.error('Appear isolated node (not appear in graph)')
-                exit(-1)
-            node_id = entity_id[node]
-            stat_id.append(node_id)
-        stat_nodes.append(stat_id)
-    
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
+    if stat_num == None:
+        s_es = list(s_es)
+        stat_num = len(s_es)
+
+    written = 0
     with open(statnodes_name, 'w') as stat2entity:
-        line_num = str(len(stat_nodes)) + '\n'
+        line_num = str(stat_num) + '\n'
         stat2entity.write(line_num)
-        for nodes in stat_nodes:
-            line = ','.join(nodes)
+        for stat_node in s_es:
+            stat_id = list()
+            for node in stat_node:
+                node_id = find_entity_id(entity_id, node)
+                if node_id == None:
+                    logger.error('Appear isolated node (not appear in graph)')
+                    exit(-1)
+                stat_id.append(node_id)
+            line = ','.join(stat_id)
             line = line + '\n'
             stat2entity.write(line)
-    
-    logger.info('Encode statement nodes {}' .format(len(stat_nodes)))
+            written += 1
+
+    if written != stat_num:
+        logger.error(f'Expect {stat_num} statement rows but get {written}, exit.')
+        exit(-1)
+    logger.info('Encode statement nodes {}' .format(stat_num))
 
     return True
 
@@ -308,43 +313,69 @@ def encoding_entity2typetoken(encode_path: str) -> bool:
 
     return True
 
-def encoding_cg(encode_path: str, all_callees: list, func_dict: dict) -> bool:
-    """Encode cg.
-    """
-    cg_name = 'cg2id.txt'
-    cg_name = os.path.join(encode_path, cg_name)
-    entity_id = load_entity_id(encode_path)
+def cg_edges(all_callees: list, func_dict: dict, entity_id: list) -> list:
+    """Call graph edges between callee nodes and the entry node and fringe of the called functions.
+
+    attributes:
+        all_callees -- list of [node_base, callee], node_base is the global id offset of the caller function.
+        func_dict -- dict of CGNodes with assigned node_base.
+        entity_id -- entity ids of global node ids.
 
+    returns:
+        all_edges -- list of [start id, end id, edge type].
+    """
     all_edges = list()
+    # key -> [entry node id, fringe ids] of each function of the key, translated once
+    targets = dict()
 
-    for callee in all_callees:
+    for node_base, callee in all_callees:
         key = callee.get_key()
         if key not in func_dict:
             continue
-        start = callee.node_key
-        if start not in entity_id:
+        start_id = find_entity_id(entity_id, node_base + callee.node_key)
+        if start_id == None:
             logger.error('Cannot find caller node')
             exit(-1)
-        start_id = entity_id[start]
         
-        cg_nodes = func_dict[key]
-        for cg_node in cg_nodes:
-            entrynode = cg_node.entrynode
-            fringe = cg_node.fringe
-            if entrynode not in entity_id:
-                logger.error('Cannot find entry node')
-                exit(-1)
-            entrynode_id = entity_id[entrynode]
-            _f_ids = list()
-            for _f in fringe:
-                if _f not in entity_id:
-                    logger.error('Cannot find fringe')
+        if key not in targets:
+            targets[key] = list()
+            for cg_node in func_dict[key]:
+                entrynode = cg_node.node_base + cg_node.entrynode
+                fringe = [cg_node.node_base + x for x in cg_node.fringe]
+                entrynode_id = find_entity_id(entity_id, entrynode)
+                if entrynode_id == None:
+                    logger.error('Cannot find entry node')
                     exit(-1)
-                _f_ids.append(entity_id[_f])
-            
-            all_edges.append([start_id, entrynode_id, '2'])
+                _f_ids = list()
+                for _f in fringe:
+                    _f_id = find_entity_id(entity_id, _f)
+                    if _f_id == None:
+                        logger.error('Cannot find fringe')
+                        exit(-1)
+                    _f_ids.append(_f_id)
+                targets[key].append([entrynode_id, _f_ids])
+
+        for entrynode_id, _f_ids in targets[key]:
+            all_edges.append([start_id, entrynode_id, str(CFG_EDGE)])
             for id in _f_ids:
-                all_edges.append([id, start_id, '2'])
+                all_edges.append([id, start_id, str(CFG_EDGE)])
+
+    return all_edges
+
+def encoding_cg(encode_path: str, all_callees: list, func_dict: dict, entity_id: list = None) -> bool:
+    """Encode cg.
+
+    attributes:
+        all_callees -- list of [node_base, callee], node_base is the global id offset of the caller function.
+        func_dict -- dict of CGNodes with assigned node_base.
+        entity_id -- entity ids of global node ids, loaded from entity2id.txt if None.
+    """
+    cg_name = 'cg2id.txt'
+    cg_name = os.path.join(encode_path, cg_name)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
+
+    all_edges = cg_edges(all_callees, func_dict, entity_id)
     
     logger.info('CG: {}' .format(len(all_edges)))
     with open(cg_name, 'w') as cg2id:
@@ -411,38 +442,31 @@ def reduce_edges(encode_path: str) -> None:
     dfg = 0
 
     for line in reduced_edges:
-        line = line.split(',')
-        if line[2] == '4':
-            ast += 1
-        elif line[2] == '2':
-            cfg += 1
-        elif line[2] == '1':
-            dfg += 1
-        elif line[2] == '6':
-            ast += 1
-            cfg += 1
-        elif line[2] == '5':
-            ast += 1
-            dfg += 1
-        elif line[2] == '3':
-            cfg += 1
-            dfg += 1
-        elif line[2] == '7':
+        edge_type = int(line.split(',')[2])
+        if edge_type <= 0 or edge_type > AST_EDGE | CFG_EDGE | DDG_EDGE:
+            logger.error('Cannot identify edge')
+            exit(-1)
+        if edge_type & AST_EDGE:
             ast += 1
+        if edge_type & CFG_EDGE:
             cfg += 1
+        if edge_type & DDG_EDGE:
             dfg += 1
-        else:
-            logger.error('Cannot identify edge')
-            exit(-1)
     
     logger.info(f'Triples: {len(reduced_edges)}')
     logger.info(f'AST: {ast} \t CFG: {cfg} \t DFG: {dfg}')
 
 
-def encoding_clone_entities(encode_path: str, functionality_dict: dict) -> None:
-    """Encode functionality for code clone detection.
+def functionality_id(file_name: str) -> int:
+    """OJ functionality [1-15] of a source file, each functionality holds 500 files.
+    """
+    return (int(file_name) - 1) // 500 + 1
+
+def encoding_clone_entities(encode_path: str, functionality_dict: dict, entity_id: list = None) -> None:
+    """Encode functionality for code clone detection, entity ids are loaded from entity2id.txt if None.
     """
-    entity_id = load_entity_id(encode_path)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
     clone_name = 'code_clone.txt'
     clone_name = os.path.join(encode_path, clone_name)
     
@@ -450,13 +474,14 @@ def encoding_clone_entities(encode_path: str, functionality_dict: dict) -> None:
         line_num = str(len(functionality_dict)) + '\n'
         cf.write(line_num)
         for key, value in functionality_dict.items():
-            f_id = (int(key) - 1) // 500 + 1
+            f_id = functionality_id(key)
             entities = list()
             for entity in value:
-                if entity not in entity_id:
+                _entity_id = find_entity_id(entity_id, entity)
+                if _entity_id == None:
                     logger.error('Cannot find functionality entity id')
                     exit(-1)
-                entities.append(entity_id[entity])
+                entities.append(_entity_id)
             _es = ','.join(entities)
             line = str(f_id) + ',' + _es + '\n'
             cf.write(line)
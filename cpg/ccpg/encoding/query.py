@@ -1,34 +1,35 @@
-from utils.data_structure import Queue
-from networkx import DiGraph
+from array import array
+from collections import deque
+from utils.compact_cpg import AST_EDGE, CPGraph
+from utils.traversal import entity_successors
 
-def entity_query(cpg: DiGraph) -> list:
-    """Query entity from cpg, entity is a tuple (hashkey, identifier, token). If identifier or token are empty, it will be none.
+def entity_query(cpg: CPGraph, node_base: int = 0) -> list:
+    """Query entity from cpg, entity is a tuple (node id, identifier, token, match_statement). If identifier or token are empty, it will be none.
+    Global node ids are node_base + local node ids of cpg.
     """
     entities = list()
     ast_nodes = list(cpg.nodes)
 
     for node in ast_nodes:
-        cpg_node = cpg.nodes[node]['cpg_node']
-        entity = (cpg_node.node_key, cpg_node.node_type, cpg_node.node_token, cpg_node.match_statement)
+        entity = (node_base + node, cpg.node_type(node), cpg.node_token(node), cpg.is_statement(node))
         entities.append(entity)
     
     return entities
 
-def edge_query(cpg: DiGraph) -> list:
-    """Given a cpg instance, query all edges. Edge is a tuple (head, tail, edge_type)
+def edge_query(cpg: CPGraph, node_base: int = 0) -> list:
+    """Given a cpg instance, query all edges. Edge is a tuple (head, tail, edge_type) of global node ids and edge kind bitmask
     """
     edges = list()
-    cpg_edges = list(cpg.edges)
+    cpg_edges = list(cpg.edge_items())
 
     for _e in cpg_edges:
-        start, end = _e
-        edge_type = cpg[start][end]['edge_type']
-        edge = (start, end, edge_type)
+        start, end, edge_type = _e
+        edge = (node_base + start, node_base + end, edge_type)
         edges.append(edge)
     
     return edges
 
-def statentity_query(cpg: DiGraph) -> list:
+def statentity_query(cpg: CPGraph) -> list:
     """Query statement node from cpg
     """
     stats = list()
@@ -41,34 +42,41 @@ def statentity_query(cpg: DiGraph) -> list:
     
     return stats
 
-def statnodes_query(cpg: DiGraph, node: str) -> list:
+def statnodes_query(cpg: CPGraph, node: str) -> list:
     """Given a cpg instance, statement node, query its attribute nodes
     """
     child_entities = list()
 
-    queue = Queue()
-    queue.push(node)
+    queue = deque([node])
 
-    while not queue.is_empty():
-        current_node = queue.pop()
-        node_successors = list(cpg.successors(current_node))
-        for _successor in node_successors:
-            if not cpg.nodes[_successor]['cpg_node'].match_statement:
-                child_entities.append(_successor)
-                queue.push(_successor)
+    while queue:
+        current_node = queue.popleft()
+        for _successor in entity_successors(cpg, current_node):
+            child_entities.append(_successor)
+            queue.append(_successor)
     
     return child_entities
 
-def stat_entities(cpg: DiGraph) -> list:
-    """Find statement's entities
+def stat_entities(cpg: CPGraph, node_base: int = 0):
+    """Find statement's entities in one pass over the nodes, every non-statement node belongs to its nearest statement ancestor.
+    Node ids follow AST level order, so parents are visited before their children. Yields rows [statement, statement, entities...] of global node ids
     """
+    stat_flags = cpg.stat_flags
+    # enclosing statement of each node, -1 outside of statements
+    owner = array('i', [-1]) * cpg.number_of_nodes()
+    rows = dict()
 
-    statement_entities = list()
-    stats = statentity_query(cpg)
+    for node in cpg.nodes:
+        if stat_flags[node]:
+            owner[node] = node
+            rows[node] = [node_base + node, node_base + node]
+        elif owner[node] >= 0:
+            rows[owner[node]].append(node_base + node)
+        if owner[node] < 0:
+            continue
+        for _child, _edge_type in cpg.successor_items(node):
+            if _edge_type & AST_EDGE and not stat_flags[_child]:
+                owner[_child] = owner[node]
 
-    for stat in stats:
-        child_entities = statnodes_query(cpg, stat)
-        s_e = [stat, stat] + child_entities
-        statement_entities.append(s_e)
-    
-    return statement_entities
\ No newline at end of file
+    for _, s_e in rows.items():
+        yield s_e
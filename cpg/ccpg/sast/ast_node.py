@@ -1,11 +1,13 @@
+from utils.pickling import Slotted
 from utils.setting import logger
 
 
-class ASTNode():
+class ASTNode(Slotted):
     """Simplified ASTNode derived from tree-sitter Node
     """
+    __slots__ = ['node_key', 'node_type', 'node_token', 'start_idx', 'end_idx']
 
-    def __init__(self, node_key : str = None, node_type : str = None, node_token : str = "", start_idx : int = None, end_idx: int = None) -> None:
+    def __init__(self, node_key : int = None, node_type : str = None, node_token : str = "", start_idx : int = None, end_idx: int = None) -> None:
         if node_key == None or node_token == None or start_idx == None or end_idx == None:
             logger.debug('ASTNode lacks essential params.')
             exit(-1)
@@ -15,7 +17,7 @@ class ASTNode():
         self.start_idx = start_idx
         self.end_idx = end_idx
     
-    def get_ast_key(self) -> str:
+    def get_ast_key(self) -> int:
         return self.node_key
         
     def get_ast_type(self) -> str:
@@ -17,5 +17,9 @@ class ASTParser():
         self.parser = Parser()
         self.parser.set_language(Language(self.lib_path, 'c'))
     
-    def parse(self, src_code: bytes = None) -> tree_sitter.Tree:
-        return self.parser.parse(src_code)
\ No newline at end of file
+    def parse(self, src_code: bytes = None, old_tree: tree_sitter.Tree = None) -> tree_sitter.Tree:
+        """Parse src_code, unchanged parts of old_tree (already edited with Tree.edit) are reused if given.
+        """
+        if old_tree == None:
+            return self.parser.parse(src_code)
+        return self.parser.parse(src_code, old_tree)
\ No newline at end of file
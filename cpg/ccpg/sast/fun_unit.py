@@ -1,11 +1,15 @@
-from treelib import Tree
-from utils.data_structure import Stack
+from utils.compact_sast import CompactSAST
 from utils.setting import logger
 
 class FunUnit():
     """Maintain data for each function (e.g., file_name, func_name, parameter_type)
+
+    The summary (type histogram, typetoken sequence, size, depth) is computed when the sast is built.
+    file_path is the path of the file including the function, '' for FunUnits pickled before it was recorded.
     """
-    def __init__(self, sast: Tree, file_name: str = None, func_name: str = None, parameter_type: list = [], include_path: list = []) -> None:
+    file_path = ''
+
+    def __init__(self, sast: CompactSAST, file_name: str = None, func_name: str = None, parameter_type: list = [], include_path: list = [], file_path: str = '') -> None:
         """Constructor of FunUnit class
         """
         if file_name == None or func_name == None:
@@ -16,58 +20,23 @@ class FunUnit():
         self.func_name = func_name
         self.parameter_type = parameter_type
         self.include_path = include_path
+        self.file_path = file_path
+        self.summary = sast.summary
     
     def gen_type_sequence(self) -> list:
-        """Depth-first search for generating type sequence.
+        """Depth-first type sequence.
         """
-        sequence = list()
-        root = self.sast.root
-
-        stack = Stack()
-        stack.push(root)
-
-        while not stack.is_empty():
-            current_node = stack.pop()
-            _node_data = self.sast.get_node(current_node).data
-            current_node_type = _node_data.node_type
-            sequence.append(current_node_type)
-            children = self.sast.children(current_node)
-            children.reverse()
-            for child in children:
-                stack.push(child.identifier)
-        
-        return sequence
+        return [self.sast.node_type(x) for x in self.summary.preorder]
     
     def has_type(self, type: str) -> bool:
         """Determine whether the sast contains specific type.
         """
-        type_sequence = self.gen_type_sequence()
-        if type in type_sequence:
+        if type in self.summary.type_hist:
             return True
         
         return False
     
     def gen_typetoken_sequence(self) -> list:
-        """Depth-first search for generating type sequence.
+        """Depth-first type/token sequence, collected when the sast is built.
         """
-        sequence = list()
-        root = self.sast.root
-
-        stack = Stack()
-        stack.push(root)
-
-        while not stack.is_empty():
-            current_node = stack.pop()
-            _node_data = self.sast.get_node(current_node).data
-            current_node_type = _node_data.node_type
-            current_node_token = _node_data.node_token
-            sequence.append(current_node_type)
-            if current_node_token:
-                sequence.append(current_node_token)
-            children = self.sast.children(current_node)
-            children.reverse()
-            for child in children:
-                stack.push(child.identifier)
-            
-        
-        return sequence
\ No newline at end of file
+        return self.summary.typetoken_seq
\ No newline at end of file
@@ -0,0 +1,56 @@
+from bisect import bisect_left
+import tree_sitter
+from ccpg.sast.ast_parser import ASTParser
+from ccpg.sast.query_pattern import C_QUERY
+
+class ParserSession():
+    """C parser and compiled queries shared by all files parsed in one process.
+
+    attributes:
+        lib_path -- file path of `my-language.so`, the default library is used if None.
+    """
+    def __init__(self, lib_path: str = None) -> None:
+        self.parser = ASTParser(lib_path)
+        self.query = C_QUERY(lib_path)
+        self.file_query = self.query.file_query()
+        self.function_ret_query = self.query.function_ret_query()
+    
+    def parse(self, src_code: bytes = None, old_tree: tree_sitter.Tree = None) -> tree_sitter.Tree:
+        return self.parser.parse(src_code, old_tree)
+    
+    def query_file(self, root_node: tree_sitter.Node) -> dict:
+        """Collect include paths and functions of one file with a single query pass.
+
+        attributes:
+            root_node -- root node of the file ast.
+        
+        returns:
+            results -- {'include_path': [nodes], 'functions': [function]}, each function is a dict
+                       with 'node', 'name', 'params' (parameter type nodes) and 'ret_type'.
+        """
+        captures = {'include_path': [], 'function': [], 'function_name': [], 'type': [], 'ret_type': []}
+        for node, name in self.file_query.captures(root_node):
+            captures[name].append(node)
+        
+        # captures are in document order, nodes inside a function are located by byte range
+        name_start = [x.start_byte for x in captures['function_name']]
+        param_start = [x.start_byte for x in captures['type']]
+        ret_start = [x.start_byte for x in captures['ret_type']]
+        functions = list()
+        for function in captures['function']:
+            name_idx = bisect_left(name_start, function.start_byte)
+            ret_idx = bisect_left(ret_start, function.start_byte)
+            params = captures['type'][bisect_left(param_start, function.start_byte):bisect_left(param_start, function.end_byte)]
+            functions.append({'node': function, 'name': captures['function_name'][name_idx], 'params': params, 'ret_type': captures['ret_type'][ret_idx]})
+        
+        return {'include_path': captures['include_path'], 'functions': functions}
+
+# sessions created in current process, keyed by library path
+sessions = dict()
+
+def get_session(lib_path: str = None) -> ParserSession:
+    """Return the parser session of current process, grammar and queries are compiled on first use.
+    """
+    if lib_path not in sessions:
+        sessions[lib_path] = ParserSession(lib_path)
+    return sessions[lib_path]
@@ -55,4 +55,21 @@ class C_QUERY():
         (function_definition
         type: * @ret_type)""")
         
-        return query
\ No newline at end of file
+        return query
+    
+    def file_query(self):
+        """Combined pattern matching include paths and functions (name,
+        parameter types, return type) of one file in a single pass
+        """
+        query = self.C_LANGUAGE.query("""
+        (translation_unit (preproc_include path: * @include_path))
+        (translation_unit (function_definition) @function)
+        (function_declarator declarator: (identifier) @function_name)
+        (function_declarator
+        parameters: (
+            parameter_list (
+                parameter_declaration type: * @type)))
+        (function_definition
+        type: * @ret_type)""")
+        
+        return query
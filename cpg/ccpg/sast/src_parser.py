@@ -1,9 +1,8 @@
 from ccpg.sast.ast_builder import build_func_sast
+from utils.profiler import profile_phase
 from utils.setting import logger
-from ccpg.sast.ast_parser import ASTParser
-from ccpg.sast.query_pattern import C_QUERY
+from ccpg.sast.parser_session import ParserSession, get_session
 from ccpg.sast.fun_unit import FunUnit
-import os
 
 exclude_type = [",","{",";","}",")","(",'"',"'","`",""," ","[]","[","]",":",".","''","'.'","b", "\\", "'['", "']","''", "comment", "->", "escape_sequence", "@", "?", ""]
 
@@ -27,11 +26,40 @@ def extract_filename(file_path: str) -> str:
     logger.debug('Parsing file: {}' .format(file_name))
     return file_name
 
-def c_parser(file_path: str) -> list:
+def c_parser(file_path: str, session: ParserSession = None, src_code: bytes = None) -> list:
     """Parse C source code file and extract function unit
     
     attributes:
         file_path -- the path of C source file.
+        session -- parser session holding the compiled queries, the session of current process is used if None.
+        src_code -- content of the file, read from file_path if None (e.g., archive members are parsed from memory).
+    
+    returns:
+        func_list -- list including all functions in one file.
+    """
+    if session == None:
+        session = get_session()
+    
+    serial_code = src_code
+    if serial_code == None:
+        with open(file_path, 'rb') as f:
+            serial_code = f.read()
+    with profile_phase('parse', file_path):
+        code_ast = session.parse(serial_code)
+
+    return c_tree_funcs(file_path, serial_code, code_ast, session)
+
+def c_tree_funcs(file_path: str, serial_code: bytes, code_ast, session: ParserSession = None, reuse: dict = None, func_codes: list = None) -> list:
+    """Extract function units from a parsed C file.
+    
+    attributes:
+        file_path -- the path of C source file.
+        serial_code -- content of the file.
+        code_ast -- tree_sitter Tree of serial_code.
+        session -- parser session holding the compiled queries, the session of current process is used if None.
+        reuse -- dict, function source bytes -> list of FunUnits built before, a function whose source and include
+                 paths are unchanged takes the old FunUnit (its byte offsets are not updated) instead of rebuilding.
+        func_codes -- if given, the source bytes of each returned function are appended to it.
     
     returns:
         func_list -- list including all functions in one file.
@@ -41,42 +69,41 @@ def c_parser(file_path: str) -> list:
     # obtain file name
     file_name = extract_filename(file_path)
     
-    path = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-    lib_path = path + '/lib/my-languages.so'
-    parser = ASTParser(lib_path)
-    
-    with open(file_path, 'rb') as f:
-        serial_code = f.read()
-        code_ast = parser.parse(serial_code)
+    if session == None:
+        session = get_session()
     
     root_node = code_ast.root_node
     # print(code_ast.root_node.sexp())
     
-    query = C_QUERY()
+    # query include paths and functions in one pass
+    with profile_phase('query', file_path):
+        file_query = session.query_file(root_node)
     
-    # query include paths (e.g., include <stdlib.h>)
-    include_path = query.include_path_query().captures(root_node)
-    include_path = [serial_code[x[0].start_byte+1:x[0].end_byte-1].decode('utf8') for x in include_path]
+    # include paths (e.g., include <stdlib.h>)
+    include_path = [serial_code[x.start_byte+1:x.end_byte-1].decode('utf8') for x in file_query['include_path']]
     logger.debug('Include paths: ({})'.format(', '.join(include_path)))
     
-    # query functions
-    functions = query.function_definition_query().captures(root_node)
-    
-    length = len(functions)
-    for idx in range(length):
-        _func_name = query.function_declarator_query().captures(functions[idx][0])
-        _func_name = serial_code[_func_name[0][0].start_byte:_func_name[0][0].end_byte].decode('utf8')
+    for function in file_query['functions']:
+        _f_code = serial_code[function['node'].start_byte:function['node'].end_byte]
+        if func_codes != None:
+            func_codes.append(_f_code)
+        if reuse != None:
+            _olds = reuse.get(_f_code, [])
+            if _olds and _olds[0].include_path == include_path:
+                func_list.append(_olds.pop(0))
+                continue
+        _func_name = serial_code[function['name'].start_byte:function['name'].end_byte].decode('utf8')
         logger.debug('Parsing function ({}) in file ({})' .format(_func_name, file_name))
         
-        _func_type = query.function_parameters_type_query().captures(functions[idx][0])
-        _func_type = [serial_code[x[0].start_byte:x[0].end_byte].decode('utf-8') for x in _func_type]
+        _func_type = [serial_code[x.start_byte:x.end_byte].decode('utf-8') for x in function['params']]
         
         logger.debug('Parameters of function ({}): ({})' .format(_func_name, ', '.join(_func_type)))
         
-        sast = build_func_sast(file_name, _func_name, functions[idx][0], serial_code, exclude_type)
+        with profile_phase('sast', file_path, _func_name, _func_type):
+            sast = build_func_sast(file_name, _func_name, function['node'], serial_code, exclude_type, function['ret_type'])
         
-        cur_func = FunUnit(sast, file_name, _func_name, _func_type, include_path)
+        cur_func = FunUnit(sast, file_name, _func_name, _func_type, include_path, file_path)
         
         func_list.append(cur_func)
     
-    return func_list
\ No newline at end of file
+    return func_list
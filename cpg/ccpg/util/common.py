@@ -1,14 +1,12 @@
-from networkx import DiGraph
+from utils.compact_cpg import CPGraph
 from utils.setting import logger
 
-from treelib import Tree
 
-
-def cpg_edge_type(cpg: DiGraph = None, start: str = None, end: str = None, insert_type: str = None) -> str:
-    """Generate edge type for Code Property Graph.
-    - ast -- 100
-    - cfg -- 010
-    - pdg -- 001
+def cpg_edge_type(cpg: CPGraph = None, start: str = None, end: str = None, insert_type: int = None) -> int:
+    """Generate edge type for Code Property Graph, edge types are bitmasks of edge kinds.
+    - ast -- AST_EDGE (100)
+    - cfg -- CFG_EDGE (010)
+    - pdg -- DDG_EDGE (001)
     - ast & cfg -- 110
     - ast & pdg -- 101
     - cfg & pdg -- 011
@@ -17,35 +15,22 @@ def cpg_edge_type(cpg: DiGraph = None, start: str = None, end: str = None, inser
         cpg -- the instance of Code Property Graph.
         start -- the identifier of start node.
         end -- the identifier of end node.
-        insert_type -- the edge type waiting to insert.
+        insert_type -- the edge kind waiting to insert.
     
     returns:
-        edge_type -- the encoding of edge.
+        edge_type -- the encoding of edge, insert_type ORed into the type of the existing edge.
     """
     if cpg == None or start == None or end == None or insert_type == None:
         logger.error('Lack params for generating edge type.')
         exit(-1)
     
-    if insert_type == '100':
-        edge_type = '100'
-    elif insert_type == '010':
-        if cpg.has_edge(start, end) and cpg[start][end]['edge_type'] in ['100', '110']:
-            edge_type = '110'
-        else:
-            edge_type = '010'
-    elif insert_type == '001':
-        if cpg.has_edge(start, end) and cpg[start][end]['edge_type'] in ['100', '101']:
-            edge_type = '101'
-        elif cpg.has_edge(start, end) and cpg[start][end]['edge_type'] in ['010', '011']:
-            edge_type = '011'
-        else:
-            edge_type = '001'
-    else:
-        edge_type = '000'
+    edge_type = cpg.edge_type(start, end)
+    if edge_type == None:
+        return insert_type
     
-    return edge_type
+    return edge_type | insert_type
 
-def filter_func(ast_cpg: DiGraph = None, type: str = None) -> bool:
+def filter_func(ast_cpg: CPGraph = None, type: str = None) -> bool:
     """Filter functions contain specific type.
 
     attributes:
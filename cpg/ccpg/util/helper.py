@@ -1,13 +1,14 @@
 """Provide some basic help functions.
 """
 import os
-import pickle
 
 from ccpg.sast.fun_unit import FunUnit
 from ccpg.cpg.ast_constructor import gen_ast_cpg
 from ccpg.cpg.cfg_constructor import cfg_build
 from ccpg.cpg.ddg_constructor import ddg_build
 from ccpg.util.visualize import visualize_ast_cpg
+from utils.discovery import SourceFilter, scan_sources
+from utils.pickling import dump_versioned, load_versioned
 
 def has_entry_function(func_list: list) -> bool:
     """Ensure each file having the entry function main.
@@ -37,23 +38,18 @@ def check_extension(file_name: str, extension: str) -> bool:
         return True
     return False
 
-def traverse_src_files(dir_path: str, extension: str) -> list:
-    """Obtain all source files we want to parse.
+def traverse_src_files(dir_path: str, extension: str, src_filter: SourceFilter = None):
+    """Obtain all source files we want to parse, files are yielded while the directory is scanned.
 
     attributes:
-        dir_path -- the directory path we want to parse.
+        dir_path -- the directory path (or .tar, .tar.gz, .zip archive) we want to parse.
         extension -- the file extension we want to parse (e.g., 'java')
+        src_filter -- size, exclude and shard options, keep every source file if None.
     
     returns:
-        files -- list including files we want to parse.
+        files -- generator of file paths, or [member name, source code] for archives.
     """
-    files = list()
-    all_files = traverse_files(dir_path)
-    for file in all_files:
-        if check_extension(file, extension):
-            files.append(file)
-    
-    return files
+    return scan_sources(dir_path, [extension], src_filter)
 
 def check_key_repeat(entities: list) -> bool:
     _exist_key = list()
@@ -76,7 +72,7 @@ def visualize_helper(func: FunUnit, file_name: str) -> bool:
     return True
 
 def load_inter_results(dir_path: str) -> list:
-    """Load inter results of function list and function dict
+    """Load inter results of function list and function dict, unversioned pickles of earlier releases are accepted.
     """
     func_list_path = os.path.join(dir_path, 'func_list.pkl')
     func_dict_path = os.path.join(dir_path, 'func_dict.pkl')
@@ -85,18 +81,13 @@ def load_inter_results(dir_path: str) -> list:
         print('Cannot find stored inter results.')
         exit(-1)
 
-    fl = open(func_list_path, 'rb')
-    func_list = pickle.load(fl)
-    fl.close()
-
-    fd = open(func_dict_path, 'rb')
-    func_dict = pickle.load(fd)
-    fd.close()
+    func_list = load_versioned(func_list_path)
+    func_dict = load_versioned(func_dict_path)
 
     return [func_list, func_dict] 
 
 def store_inter_results(dir_path: str, func_list: list, func_dict: dict) -> bool:
-    """Store inter results of function list and function dict
+    """Store inter results of function list and function dict, each pickle starts with the inter result version.
     """
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
@@ -105,13 +96,8 @@ def store_inter_results(dir_path: str, func_list: list, func_dict: dict) -> bool
     func_dict_path = os.path.join(dir_path, 'func_dict.pkl')
 
     try:
-        fl = open(func_list_path, 'wb')
-        pickle.dump(func_list, fl)
-        fl.close()
-
-        fd = open(func_dict_path, 'wb')
-        pickle.dump(func_dict, fd)
-        fd.close
+        dump_versioned(func_list, func_list_path)
+        dump_versioned(func_dict, func_dict_path)
 
         return True
     except:
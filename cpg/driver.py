@@ -1,94 +1,237 @@
 # ccpg imports
+from ccpg.cpg.cpg_api import cpg4chunks as cpg4chunks_ccpg
 from ccpg.cpg.cpg_api import cpg4multifiles as cpg4multifiles_ccpg
 from ccpg.cpg.cpg_api import extract_funcs as extract_funcs_ccpg
+from ccpg.cpg.cpg_api import open_parse_cache as open_parse_cache_ccpg
 from ccpg.util.helper import load_inter_results as load_inter_results_ccpg
 from ccpg.util.helper import store_inter_results as store_inter_results_ccpg
 from ccpg.util.cpg_statistics import print_cpg_statistics as print_cpg_statistics_ccpg
+from ccpg.util.cpg_statistics import print_func_statistics as print_func_statistics_ccpg
 from ccpg.encoding.batch_encoding import batch_encoding as batch_encoding_ccpg
+from ccpg.encoding.batch_encoding import stream_encoding as stream_encoding_ccpg
+from ccpg.sast.parser_session import get_session as get_session_ccpg
+from ccpg.sast.src_parser import c_tree_funcs
 
 # javacpg imports
+from javacpg.cpg.cpg_api import cpg4chunks as cpg4chunks_javacpg
 from javacpg.cpg.cpg_api import cpg4multifiles as cpg4multifiles_javacpg
 from javacpg.cpg.cpg_api import extract_funcs as extract_funcs_javacpg
+from javacpg.cpg.cpg_api import open_parse_cache as open_parse_cache_javacpg
 from javacpg.util.helper import load_inter_results as load_inter_results_javacpg
 from javacpg.util.helper import store_inter_results as store_inter_results_javacpg
 from javacpg.util.cpg_statistics import print_cpg_statistics as print_cpg_statistics_javacpg
+from javacpg.util.cpg_statistics import print_func_statistics as print_func_statistics_javacpg
 from javacpg.encoding.batch_encoding import batch_encoding as batch_encoding_javacpg
+from javacpg.encoding.batch_encoding import stream_encoding as stream_encoding_javacpg
+from javacpg.sast.parser_session import get_session as get_session_javacpg
+from javacpg.sast.src_parser import java_tree_funcs
 
+from utils.complexity import DEGRADE_MODES, ComplexityBudget
+from utils.discovery import SourceFilter, parse_shard
+from utils.incremental import WatchSession, poll_changes
+from utils.profiler import enable_profiler, profile_phase
 from utils.setting import init_setting, logger
+from utils.supervisor import Budget, FailureReport
 
 import time
 import os
 
 
+def source_filter(args) -> SourceFilter:
+    """ Build source file filter from arguments """
+    return SourceFilter(max_size=args.max_file_size * 1024, exclude=args.exclude, shard=parse_shard(args.shard))
+
+def supervision(args) -> list:
+    """ Build cpg budget and failure report from arguments, both None without --supervise """
+    if not args.supervise:
+        return [None, None]
+    budget = Budget(args.func_timeout, args.func_max_rss * 1024 * 1024, args.max_retries)
+    return [budget, FailureReport(args.failure_report)]
+
+def complexity_budget(args) -> ComplexityBudget:
+    """ Build the per-function complexity budget from arguments, None without --max_func_nodes and --max_func_stats """
+    if args.max_func_nodes < 0 or args.max_func_stats < 0:
+        logger.error('--max_func_nodes and --max_func_stats should not be negative, exit.')
+        exit(-1)
+    if args.degrade not in DEGRADE_MODES:
+        logger.error('Unknown degrade mode: {}, choose from {}, exit.'.format(args.degrade, ', '.join(DEGRADE_MODES)))
+        exit(-1)
+    if args.max_func_nodes == 0 and args.max_func_stats == 0:
+        return None
+    return ComplexityBudget(args.max_func_nodes, args.max_func_stats, args.degrade)
+
+def watch_loop(args, extension: str, tree_funcs, session, cpg4multifiles, outputs) -> None:
+    """ Re-parse changed files of src_path incrementally and rebuild cpgs of changed functions until interrupted """
+    watcher = WatchSession(tree_funcs, session)
+    budget, report = supervision(args)
+    complexity = complexity_budget(args)
+    logger.info(f'Watching {args.src_path}, press Ctrl+C to stop')
+    try:
+        for changed, removed in poll_changes(args.src_path, [extension], source_filter(args), args.watch_interval):
+            start = time.time()
+            watcher.apply(changed, removed)
+            func_list = watcher.func_list()
+            func_dict = cpg4multifiles(func_list, watcher, budget, report, args.workers, complexity)
+            if report != None:
+                report.write()
+            logger.info('Rebuilt cpgs in {:.3f}s'.format(time.time() - start))
+            outputs(args, func_list, func_dict)
+    except KeyboardInterrupt:
+        logger.info('Stop watching')
+
+def stream_main(args, open_parse_cache, cpg4chunks, encode) -> None:
+    """ Build and encode cpgs chunk by chunk, the whole function list and cpg dict are never kept in memory """
+    if not args.encoding:
+        logger.error('--stream only produces encoding results, please add --encoding.')
+        exit(-1)
+    for flag in ['watch', 'load_iresult', 'store_iresult', 'statistics']:
+        if getattr(args, flag):
+            logger.error(f'--stream cannot be used with --{flag}, exit.')
+            exit(-1)
+    if args.chunk_size < 1:
+        logger.error('--chunk_size should be positive, exit.')
+        exit(-1)
+    cache = None
+    if args.cache_path != None:
+        cache = open_parse_cache(args.cache_path, args.cache_size)
+    budget, report = supervision(args)
+    encode(cpg4chunks(args.src_path, args.chunk_size, args.workers, cache, source_filter(args), budget, report, complexity_budget(args)))
+    if cache != None:
+        cache.flush()
+    if report != None:
+        report.write()
+
 def ccpg_main(args):
     """ Main function for ccpg """
+    if args.stream:
+        stream_main(args, open_parse_cache_ccpg, cpg4chunks_ccpg, lambda chunks: stream_encoding_ccpg(args.clone_classification, args.encode_path, chunks))
+        return
+    if args.watch:
+        watch_loop(args, 'c', c_tree_funcs, get_session_ccpg(), cpg4multifiles_ccpg, ccpg_outputs)
+        return
     if args.load_iresult:
         func_list, func_dict = load_inter_results_ccpg(args.iresult_path)
     else:
-        func_list = extract_funcs_ccpg(args.src_path)
-        func_dict = cpg4multifiles_ccpg(func_list)
+        cache = None
+        if args.cache_path != None:
+            cache = open_parse_cache_ccpg(args.cache_path, args.cache_size)
+        budget, report = supervision(args)
+        func_list = extract_funcs_ccpg(args.src_path, args.workers, cache, source_filter(args), report)
+        func_dict = cpg4multifiles_ccpg(func_list, cache, budget, report, args.workers, complexity_budget(args))
+        if cache != None:
+            cache.flush()
+        if report != None:
+            report.write()
+    ccpg_outputs(args, func_list, func_dict)
+
+def ccpg_outputs(args, func_list: list, func_dict: dict) -> None:
+    """ Store, encode and summarize cpgs of ccpg """
     if args.store_iresult:
         store_inter_results_ccpg(args.iresult_path, func_list, func_dict)
     
     if args.encoding:    
-        batch_encoding_ccpg(args.clone_classification, args.encode_path, func_list, func_dict)
+        with profile_phase('encoding'):
+            batch_encoding_ccpg(args.clone_classification, args.encode_path, func_list, func_dict)
 
     if args.statistics:
+        print_func_statistics_ccpg(func_list)
         print_cpg_statistics_ccpg(func_dict)
 
 def javacpg_main(args):
     """ Main function for javacpg """
+    if args.stream:
+        def encode(chunks):
+            stream_encoding_javacpg(args.encode_path, chunks)
+            copy_javacpg_labels(args)
+        stream_main(args, open_parse_cache_javacpg, cpg4chunks_javacpg, encode)
+        return
+    if args.watch:
+        watch_loop(args, 'java', java_tree_funcs, get_session_javacpg(), cpg4multifiles_javacpg, javacpg_outputs)
+        return
     if args.load_iresult:
         func_list, func_dict = load_inter_results_javacpg(args.iresult_path)
     else:
-        func_list = extract_funcs_javacpg(args.src_path)
-        func_dict = cpg4multifiles_javacpg(func_list)
+        cache = None
+        if args.cache_path != None:
+            cache = open_parse_cache_javacpg(args.cache_path, args.cache_size)
+        budget, report = supervision(args)
+        func_list = extract_funcs_javacpg(args.src_path, args.workers, cache, source_filter(args), report)
+        func_dict = cpg4multifiles_javacpg(func_list, cache, budget, report, args.workers, complexity_budget(args))
+        if cache != None:
+            cache.flush()
+        if report != None:
+            report.write()
+    javacpg_outputs(args, func_list, func_dict)
+
+def javacpg_outputs(args, func_list: list, func_dict: dict) -> None:
+    """ Store, encode and summarize cpgs of javacpg """
     if args.store_iresult:
         store_inter_results_javacpg(args.iresult_path, func_list, func_dict)
     
     if args.encoding:    
-        batch_encoding_javacpg(args.encode_path, func_list, func_dict)
+        with profile_phase('encoding'):
+            batch_encoding_javacpg(args.encode_path, func_list, func_dict)
         
-        # Handle different label types based on task
-        if hasattr(args, 'task') and args.task == 'code_smell':
-            # Copy code smell labels for code smell detection task
-            code_smell_labels_path = '../cpgnn/code_smell_labels.csv'
-            if os.path.exists(code_smell_labels_path):
-                logger.info(f'Copying code smell labels from {code_smell_labels_path} to {args.encode_path}')
-                if os.name == 'nt':  # Windows
-                    os.system(f'copy "{code_smell_labels_path}" "{args.encode_path}"')
-                else:  # Unix/Linux
-                    os.system(f'cp "{code_smell_labels_path}" "{args.encode_path}"')
-            else:
-                logger.warning(f'Code smell labels not found at {code_smell_labels_path}')
-                logger.warning('Please run: python cpgnn/prepare_code_smell_data.py --input_folder <your_data_path>')
-        else:
-            # Default: copy clone labels for clone detection task
-            clone_labels_path = '../datasets/bigclonebench/clone_labels.txt'
-            if os.path.exists(clone_labels_path):
-                logger.info(f'Copying clone labels from {clone_labels_path} to {args.encode_path}')
-                if os.name == 'nt':  # Windows
-                    os.system(f'copy "{clone_labels_path}" "{args.encode_path}"')
-                else:  # Unix/Linux
-                    os.system(f'cp "{clone_labels_path}" "{args.encode_path}"')
-            else:
-                logger.error('Clone labels not found! Please check the path: ../datasets/bigclonebench/clone_labels.txt')
-                if not (hasattr(args, 'task') and args.task == 'code_smell'):
-                    exit(1)
+        copy_javacpg_labels(args)
     
     if args.statistics:
+        print_func_statistics_javacpg(func_list)
         print_cpg_statistics_javacpg(func_dict)
 
+def start_profiler(args):
+    """ Enable the phase profiler with --profile, None otherwise """
+    if args.profile == None:
+        return None
+    if args.workers > 1 or args.supervise:
+        logger.error('--profile times phases in the driver process, it cannot be used with --workers > 1 or --supervise, exit.')
+        exit(-1)
+    return enable_profiler(args.profile_memory)
+
+def copy_javacpg_labels(args) -> None:
+    """ Copy the labels of the task next to the encoding results of javacpg """
+    # Handle different label types based on task
+    if hasattr(args, 'task') and args.task == 'code_smell':
+        # Copy code smell labels for code smell detection task
+        code_smell_labels_path = '../cpgnn/code_smell_labels.csv'
+        if os.path.exists(code_smell_labels_path):
+            logger.info(f'Copying code smell labels from {code_smell_labels_path} to {args.encode_path}')
+            if os.name == 'nt':  # Windows
+                os.system(f'copy "{code_smell_labels_path}" "{args.encode_path}"')
+            else:  # Unix/Linux
+                os.system(f'cp "{code_smell_labels_path}" "{args.encode_path}"')
+        else:
+            logger.warning(f'Code smell labels not found at {code_smell_labels_path}')
+            logger.warning('Please run: python cpgnn/prepare_code_smell_data.py --input_folder <your_data_path>')
+    else:
+        # Default: copy clone labels for clone detection task
+        clone_labels_path = '../datasets/bigclonebench/clone_labels.txt'
+        if os.path.exists(clone_labels_path):
+            logger.info(f'Copying clone labels from {clone_labels_path} to {args.encode_path}')
+            if os.name == 'nt':  # Windows
+                os.system(f'copy "{clone_labels_path}" "{args.encode_path}"')
+            else:  # Unix/Linux
+                os.system(f'cp "{clone_labels_path}" "{args.encode_path}"')
+        else:
+            logger.error('Clone labels not found! Please check the path: ../datasets/bigclonebench/clone_labels.txt')
+            if not (hasattr(args, 'task') and args.task == 'code_smell'):
+                exit(1)
+
 if __name__ == '__main__':
     args = init_setting()
 
     strat_time = time.time()
-    if args.lang == 'c':
-        ccpg_main(args)
-    elif args.lang == 'java':
-        javacpg_main(args)
-    else:
-        logger.error('Unknown language: {}'.format(args.lang))
-        exit(1)
+    profiler = start_profiler(args)
+    try:
+        if args.lang == 'c':
+            ccpg_main(args)
+        elif args.lang == 'java':
+            javacpg_main(args)
+        else:
+            logger.error('Unknown language: {}'.format(args.lang))
+            exit(1)
+    finally:
+        # the report is also written when a step exits (e.g., missing labels), the exit still propagates
+        if profiler != None:
+            profiler.write_report(args.profile, args.profile_top)
     end_time = time.time()
     logger.info('Total time: {:.2f}s'.format(end_time - strat_time))
\ No newline at end of file
@@ -0,0 +1,70 @@
+import sys
+sys.path.append('..')
+import argparse
+import os
+import time
+from ccpg.cpg.ast_constructor import gen_ast_cpg as c_gen_ast_cpg
+from ccpg.cpg.cfg_constructor import cfg_build as c_cfg_build
+from ccpg.cpg import ddg_constructor as c_ddg
+from ccpg.sast.src_parser import c_parser
+from javacpg.cpg.ast_constructor import gen_ast_cpg as java_gen_ast_cpg
+from javacpg.cpg.cfg_constructor import cfg_build as java_cfg_build
+from javacpg.cpg import ddg_constructor as java_ddg
+from javacpg.sast.src_parser import java_parser
+from utils.discovery import scan_src_files
+from utils.dataflow import reaching_def_edges
+
+def edge_list(cpg):
+    return [(start, end, attr['edge_type']) for start, end, attr in cpg.edges(data=True)]
+
+def benchmark(func_list, gen_ast_cpg, cfg_build, ddg):
+    """Build the ddg of every function with back tracking and with reaching definitions, compare time and edges.
+    """
+    old_time, new_time, mismatch, fallback = 0, 0, 0, 0
+    for func in func_list:
+        root = func.sast.root
+        old_cpg = gen_ast_cpg(func.sast)
+        cfg_build(old_cpg, root)
+        new_cpg = gen_ast_cpg(func.sast)
+        cfg_build(new_cpg, root)
+
+        start = time.time()
+        ddg.ddg_back_tracking(old_cpg, ddg.gen_def_use_chain(old_cpg, root))
+        old_time += time.time() - start
+
+        start = time.time()
+        def_use_chain = ddg.gen_def_use_chain(new_cpg, root)
+        ddg_edges = reaching_def_edges(new_cpg, def_use_chain)
+        if ddg_edges == None:
+            fallback += 1
+            ddg.ddg_back_tracking(new_cpg, def_use_chain)
+        else:
+            for _def, _use in ddg_edges:
+                ddg.add_ddg_edge(new_cpg, _def, _use)
+        new_time += time.time() - start
+
+        if edge_list(old_cpg) != edge_list(new_cpg):
+            mismatch += 1
+            print('Mismatch: {} {}'.format(func.file_name, func.func_name))
+
+    print('functions: {}, mismatch: {}, back tracking fallback: {}'.format(len(func_list), mismatch, fallback))
+    print('back tracking: {:.3f}s, reaching definitions: {:.3f}s, speedup: {:.2f}x'.format(old_time, new_time, old_time / max(new_time, 1e-9)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lang', type=str, default='c', help='c or java')
+    parser.add_argument('--path', type=str, default='./isfactor.c', help='path to a source file or directory')
+
+    args = parser.parse_args()
+
+    if args.lang == 'c':
+        src_parser, extension, constructors = c_parser, 'c', [c_gen_ast_cpg, c_cfg_build, c_ddg]
+    elif args.lang == 'java':
+        src_parser, extension, constructors = java_parser, 'java', [java_gen_ast_cpg, java_cfg_build, java_ddg]
+    else:
+        print('Error: language should be c or java.')
+        exit(-1)
+
+    files = [args.path] if not os.path.isdir(args.path) else scan_src_files(args.path, [extension])
+    func_list = [func for file in files for func in src_parser(file) if not func.has_type('ERROR')]
+    benchmark(func_list, *constructors)
@@ -0,0 +1,70 @@
+import sys
+sys.path.append('..')
+import argparse
+import time
+from javacpg.cpg.ast_constructor import gen_ast_cpg
+from javacpg.cpg.cfg_constructor import cfg_build
+from javacpg.cpg.cg_constructor import list_all_callees
+from javacpg.cpg.ddg_constructor import ddg_build
+from javacpg.sast.src_parser import java_parser
+from utils.compact_cpg import AST_EDGE, CFG_EDGE
+from utils.traversal import level_order, stat_successors, typed_successors
+
+def synthetic_method(statements: int) -> bytes:
+    """A class with one method of straight-line statements, calls and loops.
+    """
+    lines = ['public class Synthetic {', '  public int run(int n) {', '    int acc = 0;']
+    for idx in range(statements):
+        if idx % 10 == 9:
+            lines.append('    for (int i{0} = 0; i{0} < n; i{0}++) {{ acc += i{0}; }}'.format(idx))
+        elif idx % 3 == 0:
+            lines.append('    acc = Math.max(acc, {}) + n;'.format(idx))
+        else:
+            lines.append('    int v{0} = acc * {0} + n;'.format(idx))
+    lines += ['    return acc;', '  }', '}']
+    return '\n'.join(lines).encode('utf8')
+
+def list_level_order(cpg, start, edge_types, statement):
+    """Level-order traversal with a list-backed queue and list visited check, the former idiom, edge_types lists the accepted edge types.
+    """
+    order = list()
+    visited = [start]
+    queue = [start]
+    while queue:
+        current_node = queue.pop(0)
+        order.append(current_node)
+        for _successor in list(cpg.successors(current_node)):
+            _edge_type = cpg[current_node][_successor]['edge_type']
+            if _successor not in visited and _edge_type in edge_types and (statement == None or cpg.nodes[_successor]['cpg_node'].match_statement == statement):
+                queue.append(_successor)
+                visited.append(_successor)
+    return order
+
+def timed(func, *args):
+    start = time.time()
+    res = func(*args)
+    return [res, time.time() - start]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--statements', type=int, default=700, help='statements of the synthetic method (700 gives about 10k nodes)')
+    args = parser.parse_args()
+
+    func = java_parser('Synthetic.java', src_code=synthetic_method(args.statements))[0]
+    cpg = gen_ast_cpg(func.sast)
+    root = func.sast.root
+    cfg_build(cpg, root)
+    ddg_build(cpg, root)
+    print('nodes: {}, edges: {}'.format(cpg.number_of_nodes(), cpg.number_of_edges()))
+
+    stat_list, stat_list_time = timed(list_level_order, cpg, root, [x for x in range(8) if x & CFG_EDGE], True)
+    stat_new, stat_new_time = timed(lambda: list(level_order(root, lambda x: stat_successors(cpg, x))))
+    print('statements in cfg order   list: {:.3f}s  deque+set: {:.3f}s  same: {}'.format(stat_list_time, stat_new_time, stat_list == stat_new))
+
+    # every node of the function along ast edges
+    ast_list, ast_list_time = timed(list_level_order, cpg, root, [x for x in range(8) if x & AST_EDGE], None)
+    ast_new, ast_new_time = timed(lambda: list(level_order(root, lambda x: typed_successors(cpg, x, AST_EDGE))))
+    print('ast nodes in level order  list: {:.3f}s  deque+set: {:.3f}s  same: {}'.format(ast_list_time, ast_new_time, ast_list == ast_new))
+
+    _, callee_time = timed(list_all_callees, cpg, root)
+    print('list_all_callees: {:.3f}s'.format(callee_time))
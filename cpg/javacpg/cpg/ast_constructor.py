@@ -1,12 +1,10 @@
-from networkx import DiGraph
-from treelib import Tree
-from utils.data_structure import Queue
+from utils.compact_sast import CompactSAST
+from utils.compact_cpg import AST_EDGE, CPGraph
 from utils.setting import logger
 from javacpg.util.common import cpg_edge_type
-from javacpg.cpg.cpg_node import CPGNode
 
 
-def gen_ast_cpg(sast: Tree = None) -> DiGraph:
+def gen_ast_cpg(sast: CompactSAST = None) -> CPGraph:
     """Transform SAST (simplified Abstract Syntax Tree) to CPG.
 
     attributes:
@@ -20,26 +18,12 @@ def gen_ast_cpg(sast: Tree = None) -> DiGraph:
         
         return False
 
-    ast_cpg = DiGraph()
+    ast_cpg = CPGraph(sast)
 
-    root = sast.root
-
-    # add root node to ast_cpg
-    ast_cpg.add_node(root, cpg_node=CPGNode(sast.get_node(root).data))
-
-    queue = Queue()
-    queue.push(root)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-
-        for child in sast.children(current_node):
-            child_identifier = child.identifier
-            child_data = child.data
-            cpg_node = CPGNode(child_data)
-            ast_cpg.add_node(child_identifier, cpg_node=cpg_node)
-            edge_type = cpg_edge_type(ast_cpg, current_node, child_identifier, '100')
-            ast_cpg.add_edge(current_node, child_identifier, edge_type = edge_type)
-            queue.push(child_identifier)
+    # sast node ids are numbered in breadth-first order, ast_cpg shares the node arrays of sast and only adds edges
+    for current_node in range(len(sast)):
+        for child in sast.child_indices(current_node):
+            edge_type = cpg_edge_type(ast_cpg, current_node, child, AST_EDGE)
+            ast_cpg.add_edge(current_node, child, edge_type = edge_type)
     
     return ast_cpg
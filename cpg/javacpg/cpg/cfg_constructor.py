@@ -1,9 +1,13 @@
-from networkx import DiGraph
+from utils.ast_index import ASTIndex
+from utils.compact_cpg import CFG_EDGE, CPGraph
 from javacpg.util.common import cpg_edge_type
-from utils.data_structure import Queue
 from utils.setting import logger
 
-def cfg_build(ast_cpg: DiGraph = None, node: str = None) -> list:
+statement_node_types = ['method_declaration', 'expression_statement', 'local_variable_declaration', 'if_statement', 'for_statement', 'while_statement', 'switch_statement', 'switch_block', 'switch_block_statement_group', 'return_statement', 'block', 'ret_type', 'break_statement', 'enhanced_for_statement', 'continue_statement', 'try_statement', 'do_statement', 'switch_expression', 'label_statement', 'catch_clause', 'finally_clause', 'synchronized_statement', 'throw_statement']
+# a statement without later statement sibling inside these nodes is followed by the node itself
+sibling_loop_types = ['for_statement', 'enhanced_for_statement', 'while_statement', 'do_statement', 'switch_expression']
+
+def cfg_build(ast_cpg: CPGraph = None, node: str = None) -> list:
     """Handler of Control Flow Graph builder.
 
     attributes:
@@ -69,32 +73,20 @@ def cfg_build(ast_cpg: DiGraph = None, node: str = None) -> list:
            
     return entrynode, fringe
 
-def seek_parent(ast_cpg: DiGraph = None, node: str = None, node_types: list = []) -> str:
+def get_ast_index(ast_cpg: CPGraph = None) -> ASTIndex:
+    """AST index of ast_cpg, built once per function at the first lookup.
+    """
+    if ast_cpg.ast_index == None:
+        ast_cpg.ast_index = ASTIndex(ast_cpg, statement_node_types)
+    return ast_cpg.ast_index
+
+def seek_parent(ast_cpg: CPGraph = None, node: str = None, node_types: list = []) -> str:
     """ Find specific node whose type matches node_type.
     """
-    # adopt level-order traversal to find the first predecessor whose node type matches node_types
-    queue = Queue()
-    queue.push(node)
-    node_flag = list()
-    node_flag.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-        predecessors = list(ast_cpg.predecessors(current_node))
-        for _predecessor in predecessors:
-            _predecessor_type = ast_cpg.nodes[_predecessor]['cpg_node'].node_type
-            if  _predecessor_type not in node_types and is_statementnode(ast_cpg, _predecessor):
-                if _predecessor not in node_flag:
-                    node_flag.append(_predecessor)
-                    queue.push(_predecessor)
-                else:
-                    logger.debug('Circle Edge')
-            elif _predecessor_type in node_types and is_statementnode(ast_cpg, _predecessor):
-                return _predecessor
-
-    return False
-
-def seek_statement_sibling(ast_cpg: DiGraph = None, node: str = None) -> str:
+    # the closest statement ancestor whose node type matches node_types
+    return get_ast_index(ast_cpg).enclosing(node, node_types)
+
+def seek_statement_sibling(ast_cpg: CPGraph = None, node: str = None) -> str:
     """Given a node in ast_cpg, find its next statement sibling.
 
     attributes:
@@ -104,62 +96,20 @@ def seek_statement_sibling(ast_cpg: DiGraph = None, node: str = None) -> str:
     returns:
         identifier -- the identifier of next statement sibling, if there is no sibling, return False.
     """
-    queue = Queue()
-    queue.push(node)
-    node_flag = list()
-    node_flag.append(node)
-
-    loop_types = ['for_statement', 'enhanced_for_statement', 'while_statament', 'do_statement', 'switch_expression']
-    # do level-order traversal to find its next statement sibling.
-    while not queue.is_empty():
-        current_node = queue.pop()
-        predecessors = list(ast_cpg.predecessors(current_node))
-        for _predecessor in predecessors:
-            _p_successors = list(ast_cpg.successors(_predecessor))
-            cur_node_idx = _p_successors.index(current_node) + 1
-            siblings = _p_successors[cur_node_idx:]
-            _has_statement_node = False
-            next_statement = None
-            for _sibling in siblings:
-                if is_statementnode(ast_cpg, _sibling):
-                    _has_statement_node = True
-                    next_statement = _sibling
-                    break
-            if _has_statement_node:
-                return next_statement
-            elif not _has_statement_node and ast_cpg.nodes[_predecessor]['cpg_node'].node_type in loop_types:
-                return _predecessor
-            else:
-                if _predecessor not in node_flag:
-                    node_flag.append(_predecessor)
-                    queue.push(_predecessor)
-                else:
-                    logger.debug('Circle Edge')
-    
-    return False
+    # climb until an ancestor has a later statement sibling, or the ancestor is a loop
+    return get_ast_index(ast_cpg).next_statement(node, sibling_loop_types)
 
-def seek_labeled_statement(ast_cpg: DiGraph = None, label: str = None) -> str:
+def seek_labeled_statement(ast_cpg: CPGraph = None, label: str = None) -> str:
     """
     """
-    # traverse all nodes in the graph and find labeled_statement whose label token matches label.
-    all_nodes = ast_cpg.nodes
-    for _node in all_nodes:
-        if ast_cpg.nodes[_node]['cpg_node'].node_token == label:
-            label_statements = list(ast_cpg.predecessors(_node))
-            # only one parent
-            if len(label_statements) == 1:
-                return label_statements[0]
-    
-    return False
+    return get_ast_index(ast_cpg).labeled_statement(label)
             
-def is_statementnode(ast_cpg: DiGraph = None, node: str = None) -> bool:
+def is_statementnode(ast_cpg: CPGraph = None, node: str = None) -> bool:
     """
     """
-    statement_node_types = ['method_declaration', 'expression_statement', 'local_variable_declaration', 'if_statement', 'for_statement', 'while_statement', 'switch_statement', 'switch_block', 'switch_block_statement_group', 'return_statement', 'block', 'ret_type', 'break_statement', 'enhanced_for_statement', 'continue_statement', 'try_statement', 'do_statement', 'switch_expression', 'label_statement', 'catch_clause', 'finally_clause', 'synchronized_statement', 'throw_statement']
-
     return ast_cpg.nodes[node]['cpg_node'].node_type in statement_node_types
 
-def seek_valid_fringe(ast_cpg: DiGraph = None, node: str = None) -> str:
+def seek_valid_fringe(ast_cpg: CPGraph = None, node: str = None) -> str:
     """Given a ast cpg instance and one node identifier, find its valid fringe.
     For example, in a break statement is inserted in try block, try block will no fringe, and now we need add a valid fringe for try block for the completness .
 
@@ -187,7 +137,7 @@ def seek_valid_fringe(ast_cpg: DiGraph = None, node: str = None) -> str:
     # if find no fringe, the fringe is itself.
     return node  
                     
-def cfg_singlenode(ast_cpg: DiGraph = None, node: str = None) -> list:
+def cfg_singlenode(ast_cpg: CPGraph = None, node: str = None) -> list:
     """ For CPGNode in ast_cpg, if it matches one statement, then set match_statement as True. 
 
     attributes:
@@ -206,7 +156,7 @@ def cfg_singlenode(ast_cpg: DiGraph = None, node: str = None) -> list:
 """
 handlers for different kinds of expression statement in java code.
 """
-def cfg_methoddeclaration(ast_cpg: DiGraph = None, node: str = None) -> list:
+def cfg_methoddeclaration(ast_cpg: CPGraph = None, node: str = None) -> list:
     """Generate method cfg.
 
     attributes:
@@ -229,32 +179,32 @@ def cfg_methoddeclaration(ast_cpg: DiGraph = None, node: str = None) -> list:
             if _s_entrynode == None:
                 continue
             for _entrynode in fringe:
-                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
                 ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
             fringe = _s_fringe
             # print(ast_cpg.nodes[fringe[0]]['cpg_node'].node_type)
     
     return [entrynode, fringe]
 
-def cfg_rettype(ast_cpg: DiGraph, node: str) -> list:
+def cfg_rettype(ast_cpg: CPGraph, node: str) -> list:
     return cfg_singlenode(ast_cpg, node)
 
 
-def cfg_statementexpression(ast_cpg: DiGraph, node: str) -> list:
+def cfg_statementexpression(ast_cpg: CPGraph, node: str) -> list:
     return cfg_singlenode(ast_cpg, node)
 
-def cfg_localvariabledeclaraion(ast_cpg: DiGraph, node: str) -> list:
+def cfg_localvariabledeclaraion(ast_cpg: CPGraph, node: str) -> list:
     return cfg_singlenode(ast_cpg, node)
 
-def cfg_assert_statement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_assert_statement(ast_cpg: CPGraph, node: str) -> list:
     return cfg_singlenode(ast_cpg, node)
 
-def cfg_yield_statement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_yield_statement(ast_cpg: CPGraph, node: str) -> list:
     """ TODO 
     """
     return [None, []]
 
-def cfg_labeledstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_labeledstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
 
@@ -266,18 +216,18 @@ def cfg_labeledstatement(ast_cpg: DiGraph, node: str) -> list:
     labeled_statement_successors = list(ast_cpg.successors(node))
 
     _s_entrynode, fringe = cfg_build(ast_cpg, labeled_statement_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, _s_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, _s_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, _s_entrynode, edge_type = edge_type)
 
     return [entrynode, fringe]
 
-def cfg_throwstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_throwstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     return cfg_singlenode(ast_cpg, node)
 
 
-def cfg_ifstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_ifstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -292,21 +242,21 @@ def cfg_ifstatement(ast_cpg: DiGraph, node: str) -> list:
     # handle situation: only have then block.
     elif c_child == 3:
         then_entrynode, then_fringe = cfg_build(ast_cpg, if_statement_successors[2])
-        edge_type = cpg_edge_type(ast_cpg, entrynode, then_entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, entrynode, then_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, then_entrynode, edge_type = edge_type)
         fringe = then_fringe + [node]
     # handle situation: have else block
     elif c_child == 4:
         else_entrynode, else_fringe = cfg_build(ast_cpg, if_statement_successors[-1])
-        edge_type = cpg_edge_type(ast_cpg, entrynode, else_entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, entrynode, else_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, else_entrynode, edge_type = edge_type)
         fringe = else_fringe
     # handle situation: have both then and else block.
     elif c_child == 5:
         then_entrynode, then_fringe = cfg_build(ast_cpg, if_statement_successors[2])
         else_entrynode, else_fringe = cfg_build(ast_cpg, if_statement_successors[4])
-        then_edge = cpg_edge_type(ast_cpg, entrynode, then_entrynode, '010')
-        else_edge = cpg_edge_type(ast_cpg, entrynode, else_entrynode, '010')
+        then_edge = cpg_edge_type(ast_cpg, entrynode, then_entrynode, CFG_EDGE)
+        else_edge = cpg_edge_type(ast_cpg, entrynode, else_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, then_entrynode, edge_type = then_edge)
         ast_cpg.add_edge(entrynode, else_entrynode, edge_type = else_edge)
         fringe = then_fringe + else_fringe
@@ -316,7 +266,7 @@ def cfg_ifstatement(ast_cpg: DiGraph, node: str) -> list:
     
     return [entrynode, fringe]
     
-def cfg_forstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_forstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -329,18 +279,18 @@ def cfg_forstatement(ast_cpg: DiGraph, node: str) -> list:
 
     # handle situation: regard the last children as waiting parsed node.
     sub_entrynode, fringe = cfg_build(ast_cpg, for_statement_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type = edge_type)
 
     # add for loop return edge
     for _fringe in fringe:
-        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, CFG_EDGE)
         ast_cpg.add_edge(_fringe, entrynode, edge_type = edge_type)
 
     return [entrynode, fringe + [node]]
 
 
-def cfg_whilestatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_whilestatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -351,19 +301,19 @@ def cfg_whilestatement(ast_cpg: DiGraph, node: str) -> list:
     sub_entrynode, fringe = cfg_build(ast_cpg, while_statement_successors[-1])
 
     if sub_entrynode:
-        edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
         ast_cpg.add_edge(entrynode, sub_entrynode, edge_type = edge_type)
 
     # add while loop return edge
     for _fringe in fringe:
-        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, CFG_EDGE)
         ast_cpg.add_edge(_fringe, entrynode, edge_type = edge_type)
 
     return [entrynode, fringe + [node]]
 
 
 
-def cfg_dowhilestatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_dowhilestatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -376,17 +326,17 @@ def cfg_dowhilestatement(ast_cpg: DiGraph, node: str) -> list:
         return [entrynode, []]
     
     sub_entrynode, fringe = cfg_build(ast_cpg, dowhile_statement_successors[1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type = edge_type)
 
     # add do while loop return edge
     for _fringe in fringe:
-        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, '010')
+        edge_type = cpg_edge_type(ast_cpg, _fringe, entrynode, CFG_EDGE)
         ast_cpg.add_edge(_fringe, entrynode, edge_type = edge_type)
     
     return [entrynode, fringe]
     
-def cfg_switchexpression(ast_cpg: DiGraph, node: str) -> list:
+def cfg_switchexpression(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -395,12 +345,12 @@ def cfg_switchexpression(ast_cpg: DiGraph, node: str) -> list:
 
     # handle switch block.
     sub_entrynode, fringe = cfg_build(ast_cpg, switch_expression_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type = edge_type)
 
     return [entrynode, fringe + [node]]
 
-def cfg_switchblock(ast_cpg: DiGraph, node: str) -> str:
+def cfg_switchblock(ast_cpg: CPGraph, node: str) -> str:
     """
     """
     entrynode = node
@@ -411,19 +361,19 @@ def cfg_switchblock(ast_cpg: DiGraph, node: str) -> str:
     # handle different switch_block_statement_group
     # first add edge between switch_block and switch_block_statement_group
     for _successor in switch_block_successors:
-        switch_group_edge = cpg_edge_type(ast_cpg, entrynode, _successor, '010')
+        switch_group_edge = cpg_edge_type(ast_cpg, entrynode, _successor, CFG_EDGE)
         ast_cpg.add_edge(entrynode, _successor, edge_type = switch_group_edge)
         _s_entrynode, _s_fringe = cfg_build(ast_cpg, _successor)
         if _s_entrynode == None:
             continue
         for _entrynode in fringe:
-            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
         fringe = _s_fringe
     
     return [entrynode, fringe]
 
-def cfg_switchblockgroup(ast_cpg: DiGraph, node: str) -> str:
+def cfg_switchblockgroup(ast_cpg: CPGraph, node: str) -> str:
     """
     """
     entrynode = node
@@ -437,30 +387,30 @@ def cfg_switchblockgroup(ast_cpg: DiGraph, node: str) -> str:
         if _s_entrynode == None:
             continue
         for _entrynode in fringe:
-            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
         
         fringe = _s_fringe
     
     return [entrynode, fringe]
 
-def cfg_returnstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_returnstatement(ast_cpg: CPGraph, node: str) -> list:
     """For returnstatement, its entrynode is itself, and there is no fringe. We need to connect returnstatement to ret type directly.
     """
     entrynode = node
     fringe = []
     ast_cpg.nodes[node]['cpg_node'].set_statement_node()
 
-    _method = list(ast_cpg.nodes)[0]
+    _method = get_ast_index(ast_cpg).root
     ret_type = list(ast_cpg.successors(_method))[-1]
     # add edge between return statement and ret type
-    edge_type = cpg_edge_type(ast_cpg, entrynode, ret_type, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, ret_type, CFG_EDGE)
     ast_cpg.add_edge(entrynode, ret_type, edge_type = edge_type)
 
     return [entrynode, fringe]
 
 
-def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_breakstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     # break_statement has no fringe, but we should connect it with the break label.
@@ -483,7 +433,7 @@ def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
     if parent_node:
         next_sibling = seek_statement_sibling(ast_cpg, parent_node)
         if next_sibling:
-            parent_loop_type = cpg_edge_type(ast_cpg, parent_node, next_sibling, '010')
+            parent_loop_type = cpg_edge_type(ast_cpg, parent_node, next_sibling, CFG_EDGE)
             ast_cpg.add_edge(parent_node, next_sibling, edge_type = parent_loop_type)
 
     # handle no flag label situation.
@@ -499,7 +449,7 @@ def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
         if not next_statement_node:
             return [entrynode, fringe]
         else:
-            edge_type = cpg_edge_type(ast_cpg, node, next_statement_node, '010')
+            edge_type = cpg_edge_type(ast_cpg, node, next_statement_node, CFG_EDGE)
             ast_cpg.add_edge(node, next_statement_node, edge_type = edge_type)
     
     # handle flag label situation.
@@ -507,15 +457,15 @@ def cfg_breakstatement(ast_cpg: DiGraph, node: str) -> list:
         label = ast_cpg.nodes[break_statement_successors[-1]]['cpg_node'].node_token
         labeled_statement = seek_labeled_statement(ast_cpg, label)
         if labeled_statement:
-            edge_type = cpg_edge_type(ast_cpg, node, labeled_statement, '010')
+            edge_type = cpg_edge_type(ast_cpg, node, labeled_statement, CFG_EDGE)
             ast_cpg.add_edge(node, labeled_statement, edge_type = edge_type)
     
     return [entrynode, fringe]
 
-def cfg_continuestatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_continuestatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
-    def has_else_default(ast_cpg: DiGraph, node: str):
+    def has_else_default(ast_cpg: CPGraph, node: str):
         node_successors = ast_cpg.successors(node)
         res_has = False
         for _successor in node_successors:
@@ -533,7 +483,7 @@ def cfg_continuestatement(ast_cpg: DiGraph, node: str) -> list:
 
     if loop_node:
         # add edge from continue statement to loop node
-        edge_type = cpg_edge_type(ast_cpg, node, loop_node, '010')
+        edge_type = cpg_edge_type(ast_cpg, node, loop_node, CFG_EDGE)
         ast_cpg.add_edge(node, loop_node, edge_type = edge_type)
     
     # TODO may have bug
@@ -544,7 +494,7 @@ def cfg_continuestatement(ast_cpg: DiGraph, node: str) -> list:
 
     return [entrynode, fringe]
 
-def cfg_synchblockstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_synchblockstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -557,13 +507,13 @@ def cfg_synchblockstatement(ast_cpg: DiGraph, node: str) -> list:
         if _s_entrynode == None:
             continue
         for _entrynode in fringe:
-            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
         fringe = _s_fringe
     
     return [entrynode, fringe]
 
-def cfg_trystatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_trystatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     # For try statement, parse its children
@@ -591,18 +541,18 @@ def cfg_trystatement(ast_cpg: DiGraph, node: str) -> list:
                 _s_fringe = [_s_fringe]
             try_block_fringe += _s_fringe
             try_catch_fringe += _s_fringe
-            edge_type = cpg_edge_type(ast_cpg, entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(entrynode, _s_entrynode, edge_type = edge_type)
             fringe = try_block_fringe
         elif _s_entrynode_type == 'catch_clause':
             for _entrynode in try_block_fringe:
-                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
                 ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
                 try_catch_fringe += _s_fringe
             fringe = try_catch_fringe
         elif _s_entrynode_type == 'finally_clause':
             for _entrynode in try_catch_fringe:
-                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode_type, '010')
+                edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode_type, CFG_EDGE)
                 ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
             fringe = _s_fringe
         else:
@@ -612,7 +562,7 @@ def cfg_trystatement(ast_cpg: DiGraph, node: str) -> list:
     return [entrynode, fringe]
              
 
-def cfg_catchclause(ast_cpg: DiGraph, node: str) -> list:
+def cfg_catchclause(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -620,13 +570,13 @@ def cfg_catchclause(ast_cpg: DiGraph, node: str) -> list:
     catchclause_successors = list(ast_cpg.successors(node))
 
     sub_entrynode, fringe = cfg_build(ast_cpg, catchclause_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type = edge_type)
 
     return [entrynode, fringe]
 
 
-def cfg_finallyclause(ast_cpg: DiGraph, node: str) -> list:
+def cfg_finallyclause(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -634,12 +584,12 @@ def cfg_finallyclause(ast_cpg: DiGraph, node: str) -> list:
     finallyclause_successors = list(ast_cpg.successors(node))
 
     sub_entrynode, fringe = cfg_build(ast_cpg, finallyclause_successors[-1])
-    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, '010')
+    edge_type = cpg_edge_type(ast_cpg, entrynode, sub_entrynode, CFG_EDGE)
     ast_cpg.add_edge(entrynode, sub_entrynode, edge_type = edge_type)
 
     return [entrynode, fringe]
 
-def cfg_blockstatement(ast_cpg: DiGraph, node: str) -> list:
+def cfg_blockstatement(ast_cpg: CPGraph, node: str) -> list:
     """
     """
     entrynode = node
@@ -651,7 +601,7 @@ def cfg_blockstatement(ast_cpg: DiGraph, node: str) -> list:
         if _s_entrynode == None:
             continue
         for _entrynode in fringe:
-            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, '010')
+            edge_type = cpg_edge_type(ast_cpg, _entrynode, _s_entrynode, CFG_EDGE)
             ast_cpg.add_edge(_entrynode, _s_entrynode, edge_type = edge_type)
         fringe = _s_fringe
     
@@ -1,27 +1,78 @@
-from networkx import DiGraph
-from utils.data_structure import Queue
+from utils.compact_cpg import AST_EDGE, CPGraph
+from utils.complexity import ComplexityBudget, degrade_record, truncate_sast
+from utils.dedup import build_deduplicated
+from utils.traversal import entity_successors, level_order, stat_successors
+from utils.parallel import ordered_imap
+from utils.parse_cache import ParseCache
+from utils.profiler import profile_func_phase
 from utils.setting import logger
+from utils.supervisor import Budget, FailureReport, supervised_map
 from javacpg.cpg.ast_constructor import gen_ast_cpg
-from javacpg.cpg.cfg_constructor import cfg_build
+from javacpg.cpg.cfg_constructor import cfg_build, statement_node_types
 from javacpg.cpg.cg_node import CalleeNode, CGNode
-from javacpg.cpg.ddg_constructor import ddg_build, merge_def_use
+from javacpg.cpg.ddg_constructor import ddg_build
+from javacpg.cpg.symbol_table import SymbolTable, build_symbol_table
+from functools import partial
 
 int_dict = ['decimal_integer_literal', 'hex_integer_literal', 'octal_integer_literal', 'binary_integer_literal']
 float_dict = ['decimal_floating_point_literal', 'hex_floating_point_literal']
 
-def check_edge(cpg: DiGraph = None, start: str = None, end: str = None) -> str:
+# version of sast & cpg construction, bump it to invalidate parse cache entries
+CONSTRUCTOR_VERSION = '10'
+
+# functions and complexity budget of the running cg_dict_constructor, set once per build worker process
+worker_funcs = list()
+worker_complexity = None
+
+def check_edge(cpg: CPGraph = None, start: str = None, end: str = None) -> str:
     """Check the encoding of edge between start and end.
     """
-    if cpg.has_edge(start, end):
-        return cpg[start][end]['edge_type']
+    edge_type = cpg.edge_type(start, end)
+    if edge_type != None:
+        return edge_type
     
     return False
 
-def cg_dict_constructor(func_list: list = None) -> dict:
+def build_cgnode(func, complexity: ComplexityBudget = None) -> CGNode:
+    """Construct cpg and CGNode of one function, functions over complexity are built in its degrade mode.
+    """
+    degraded = degrade_record(func.sast, statement_node_types, complexity)
+    mode = degraded[0] if degraded != None else None
+    sast = func.sast
+    if mode == 'truncate':
+        sast = truncate_sast(sast, statement_node_types, ['block'], complexity)
+    func_root = sast.root
+    with profile_func_phase('ast', func):
+        ast_cpg = gen_ast_cpg(sast)
+    if mode == 'ast_only':
+        for node in ast_cpg.nodes:
+            if ast_cpg.node_type(node) in statement_node_types:
+                ast_cpg.set_statement(node)
+        entrynode, fringe, callees = func_root, [func_root], dict()
+    else:
+        with profile_func_phase('cfg', func):
+            entrynode, fringe = cfg_build(ast_cpg, func_root)
+        if mode != 'skip_ddg':
+            with profile_func_phase('ddg', func):
+                ddg_build(ast_cpg, func_root)
+        with profile_func_phase('callees', func):
+            callees = list_all_callees(ast_cpg, func_root)
+    ast_cpg.freeze()
+
+    func_cgnode = CGNode(func.file_name, func.import_header, func.func_name, func.parameter_type, func.parameter_name, entrynode, fringe, ast_cpg, callees)
+    func_cgnode.degraded = degraded
+    return func_cgnode
+
+def cg_dict_constructor(func_list: list = None, cache: ParseCache = None, budget: Budget = None, report: FailureReport = None, workers: int = 1, complexity: ComplexityBudget = None) -> dict:
     """Parse all functions extracted from files and store them in dict for later use.
 
     attributes:
         func_list -- list of functions, function is the instance of FunUnit.
+        cache -- parse cache, CGNodes of unchanged files are taken from it.
+        budget -- if given, cpgs are built in supervised worker processes and functions over budget are skipped.
+        report -- records skipped functions, only used with budget.
+        workers -- number of worker processes building cpgs, supervised with budget, the same func_dict as the serial path either way.
+        complexity -- node and statement budget of one function, functions over it are built in its degrade mode.
     
     returns:
         func_dict -- dict of functions, key is function name and value is a list including different CGNodes.
@@ -33,15 +84,23 @@ def cg_dict_constructor(func_list: list = None) -> dict:
         exit(-1)
     
     cg_dict = dict()
+    func_cgnodes = get_cached_cgnodes(func_list, cache, complexity)
 
-    for func in func_list:
-        # construct CGNode
-        func_root = func.sast.root
-        ast_cpg = gen_ast_cpg(func.sast)
-        entrynode, fringe = cfg_build(ast_cpg, func_root)
-        ddg_build(ast_cpg, func_root)
-        callees = list_all_callees(ast_cpg, func_root)
-        func_cgnode = CGNode(func.file_name, func.import_header, func.func_name, func.parameter_type, func.parameter_name, entrynode, fringe, ast_cpg, callees)
+    def build(funcs: list, cgnodes: list) -> None:
+        if budget != None:
+            build_cgnodes_supervised(funcs, cgnodes, cache, budget, report, workers, complexity)
+        elif workers > 1:
+            build_cgnodes_parallel(funcs, cgnodes, cache, workers, complexity)
+        else:
+            build_cgnodes_serial(funcs, cgnodes, cache, complexity)
+
+    # identical functions share the cpg of one representative
+    build_deduplicated(func_list, func_cgnodes, build, share_cgnode, cache, report)
+
+    for func, func_cgnode in zip(func_list, func_cgnodes):
+        if func_cgnode == None:
+            # skipped by the supervisor
+            continue
 
         key = func.func_name + '-' + str(len(func.parameter_type))
         if key not in cg_dict.keys():
@@ -55,7 +114,103 @@ def cg_dict_constructor(func_list: list = None) -> dict:
     return cg_dict
 
 
-def list_all_callees(cpg: DiGraph = None, node: str = None) -> dict:
+def share_cgnode(func, cgnode: CGNode) -> CGNode:
+    """CGNode of func on the cpg of cgnode, the CGNode of a function with the same sast.
+    """
+    func_cgnode = CGNode(func.file_name, func.import_header, func.func_name, func.parameter_type, func.parameter_name, cgnode.entrynode, cgnode.fringe, cgnode.cpg, cgnode.callees)
+    func_cgnode.degraded = cgnode.degraded
+    return func_cgnode
+
+def get_cached_cgnodes(func_list: list, cache: ParseCache = None, complexity: ComplexityBudget = None) -> list:
+    """CGNodes of functions found in cache, None for functions to build.
+
+    Only complete CGNodes of functions within complexity are taken, degraded ones depend on the budget they were built with.
+    """
+    if cache == None:
+        return [None] * len(func_list)
+
+    func_cgnodes = list()
+    for func in func_list:
+        func_cgnode = None
+        if degrade_record(func.sast, statement_node_types, complexity) == None:
+            func_cgnode = cache.get_cgnode(func)
+        if func_cgnode != None and func_cgnode.degraded != None:
+            func_cgnode = None
+        func_cgnodes.append(func_cgnode)
+
+    return func_cgnodes
+
+def build_cgnodes_serial(func_list: list, func_cgnodes: list, cache: ParseCache, complexity: ComplexityBudget = None) -> None:
+    """Fill missing CGNodes in the current process.
+    """
+    for idx, func in enumerate(func_list):
+        if func_cgnodes[idx] != None:
+            continue
+        func_cgnodes[idx] = build_cgnode(func, complexity)
+        if cache != None:
+            cache.put_cgnode(func, func_cgnodes[idx])
+
+def build_cgnodes_supervised(func_list: list, func_cgnodes: list, cache: ParseCache, budget: Budget, report: FailureReport, workers: int, complexity: ComplexityBudget = None) -> None:
+    """Fill missing CGNodes in supervised worker processes, functions failing or over budget stay None and are reported.
+    """
+    todo = [idx for idx, cgnode in enumerate(func_cgnodes) if cgnode == None]
+    results = supervised_map(partial(build_cgnode, complexity=complexity), [func_list[idx] for idx in todo], workers, budget)
+    for idx, [status, func_cgnode, detail, elapsed] in zip(todo, results):
+        func = func_list[idx]
+        if status != 'ok':
+            if report != None:
+                report.add('cpg', func.file_name, func.func_name, status, detail, elapsed)
+            continue
+        func_cgnodes[idx] = func_cgnode
+        if cache != None:
+            cache.put_cgnode(func, func_cgnode)
+
+def init_build_worker(func_list: list, complexity: ComplexityBudget = None) -> None:
+    """Keep the function list and the complexity budget in the build worker process, tasks only carry indices into the list.
+    """
+    global worker_funcs, worker_complexity
+    worker_funcs = func_list
+    worker_complexity = complexity
+
+def build_compact_cgnode(idx: int) -> list:
+    """Build the cpg of worker_funcs[idx] in a build worker process.
+
+    returns:
+        [entrynode, fringe, compact_state, callees, degraded] -- CGNode fields with the cpg reduced to CPGraph.compact_state(), None if construction exits.
+                                                            Truncated cpgs do not share the nodes of the function sast, the whole cpg is returned instead of compact_state.
+    """
+    try:
+        func_cgnode = build_cgnode(worker_funcs[idx], worker_complexity)
+    except SystemExit:
+        return None
+
+    cpg_state = func_cgnode.cpg
+    if func_cgnode.degraded == None or func_cgnode.degraded[0] != 'truncate':
+        cpg_state = cpg_state.compact_state()
+    return [func_cgnode.entrynode, func_cgnode.fringe, cpg_state, func_cgnode.callees, func_cgnode.degraded]
+
+def build_cgnodes_parallel(func_list: list, func_cgnodes: list, cache: ParseCache, workers: int, complexity: ComplexityBudget = None) -> None:
+    """Fill missing CGNodes with a process pool, results are merged in the order of func_list.
+    """
+    todo = [idx for idx, cgnode in enumerate(func_cgnodes) if cgnode == None]
+    # several functions per task keep workers busy, small enough to balance large functions
+    chunksize = max(1, min(64, len(todo) // (workers * 8)))
+    results = ordered_imap(build_compact_cgnode, todo, workers, init_build_worker, (func_list, complexity), chunksize)
+    for idx, res in zip(todo, results):
+        func = func_list[idx]
+        if res == None:
+            logger.error(f'Constructing cpg of {func.file_name} {func.func_name} failed, exit.')
+            exit(-1)
+        entrynode, fringe, cpg_state, callees, degraded = res
+        if not isinstance(cpg_state, CPGraph):
+            cpg_state = CPGraph(func.sast, cpg_state)
+        func_cgnode = CGNode(func.file_name, func.import_header, func.func_name, func.parameter_type, func.parameter_name, entrynode, fringe, cpg_state, callees)
+        func_cgnode.degraded = degraded
+        func_cgnodes[idx] = func_cgnode
+        if cache != None:
+            cache.put_cgnode(func, func_cgnode)
+
+def list_all_callees(cpg: CPGraph = None, node: str = None) -> dict:
     """Given a cfg-based code property graph instance and its root node, traverse all statements and find related callees.
 
     attributes:
@@ -65,58 +220,34 @@ def list_all_callees(cpg: DiGraph = None, node: str = None) -> dict:
         callee_dict -- dict that keys are callee function names, values are CalleeNodes.
     """
     callee_info = dict()
+    # declared variable types, shared by all call sites of the function
+    symbol_table = build_symbol_table(cpg)
 
-    visited = list()
-    queue = Queue()
-    queue.push(node)
-    visited.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-        callees = extract_callees(cpg, current_node)
+    for current_node in level_order(node, lambda x: stat_successors(cpg, x)):
+        callees = extract_callees(cpg, current_node, symbol_table)
         if current_node in callee_info:
             logger.error('Callees exist duplicate dict key, exit.')
             exit(-1)
         if len(callees) > 0:
             callee_info[current_node] = callees
-        
-        node_successors = list(cpg.successors(current_node))
-        for _successor in node_successors:
-            if cpg.nodes[_successor]['cpg_node'].match_statement and _successor not in visited and check_edge(cpg, current_node, _successor) in ['010', '110', '011', '111']:
-                queue.push(_successor)
-                visited.append(_successor)
     
     return callee_info
 
 
-def extract_callees(cpg: DiGraph = None, node: str = None) -> list:
+def extract_callees(cpg: CPGraph = None, node: str = None, symbol_table: SymbolTable = None) -> list:
     """Given a code property graph instance and one statement node, find callees rooted by this statement.
     """
     callee_list = list()
 
-    visited = list()
-    queue = Queue()
-    queue.push(node)
-    visited.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
+    for current_node in level_order(node, lambda x: entity_successors(cpg, x, AST_EDGE)):
         if cpg.nodes[current_node]['cpg_node'].node_type == 'method_invocation':
-            callee_node = extract_single_callee(cpg, node, current_node)
+            callee_node = extract_single_callee(cpg, node, current_node, symbol_table)
             callee_list.append(callee_node)
-        node_successors = list(cpg.successors(current_node))
-        
-        for _successor in node_successors:
-            if cpg.nodes[_successor]['cpg_node'].match_statement:
-                continue
-            if check_edge(cpg, current_node, _successor) in ['100'] and _successor not in visited:
-                queue.push(_successor)
-                visited.append(_successor)
     
     return callee_list
 
-def extract_single_callee(cpg: DiGraph, stat_node: str, invocation_node: str):
-    """Given one method invocation node, extract basic information.
+def extract_single_callee(cpg: CPGraph, stat_node: str, invocation_node: str, symbol_table: SymbolTable):
+    """Given one method invocation node, extract basic information, identifier arguments are typed by their declarations in symbol_table.
     """
     """
     method_invocation: $ => seq(
@@ -164,7 +295,7 @@ def extract_single_callee(cpg: DiGraph, stat_node: str, invocation_node: str):
             callee_args_type.append(_args_type)
         elif _args_type == 'identifier':
             _args_var = cpg.nodes[_args]['cpg_node'].node_token
-            _recover_type = type_recovery(cpg, _args_var, stat_node)
+            _recover_type = symbol_table.lookup(_args_var, cpg.start_idx[_args])
             if _recover_type:
                 callee_args_type.append(_recover_type)
         else:
@@ -173,110 +304,3 @@ def extract_single_callee(cpg: DiGraph, stat_node: str, invocation_node: str):
     callee_node = CalleeNode(stat_node, call_name, callee_args_num, callee_args_type)
     
     return callee_node
-
-def type_recovery(cpg: DiGraph, args_var: str, stat_node: str) -> str:
-    """Given one callee args and do simple type recovery.
-    """
-    # back tracking according to data flow edge.
-    recovery_type = None
-
-    visited = list()
-    queue = Queue()
-    queue.push(stat_node)
-    visited.append(stat_node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-        node_predecessors = list(cpg.predecessors(current_node))
-        for _predecessor in node_predecessors:
-            if cpg.nodes[_predecessor]['cpg_node'].match_statement and _predecessor not in visited and check_edge(cpg, _predecessor, current_node) in ['001', '011', '101', '111']:
-                queue.push(_predecessor)
-                visited.append(_predecessor)
-        
-        # we filter assignment expression, only focus on declaraion statement.
-        if cpg.nodes[current_node]['cpg_node'].node_type == 'assignment_expression':
-            continue
-        ddg_node = merge_def_use(cpg, current_node)
-        if args_var in ddg_node.defs:
-            recovery_type = identify_type(cpg, current_node, args_var)
-            break
-    
-    return recovery_type
-
-def identify_type(cpg: DiGraph, node: str, args_var: str) -> str:
-    """Extract type of args variable.
-    """
-
-    visited = list()
-    queue = Queue()
-    queue.push(node)
-    visited.append(node)
-
-    var_node = None
-
-    while not queue.is_empty():
-        current_node = queue.pop()
-        current_node_token = cpg.nodes[current_node]['cpg_node'].node_token
-        if current_node_token == args_var:
-            var_node = current_node
-            break
-        node_successors = cpg.successors(current_node)
-        for _successor in node_successors:
-            if not cpg.nodes[_successor]['cpg_node'].match_statement and _successor not in visited:
-                queue.push(_successor)
-                visited.append(_successor)
-    
-    if var_node is None:
-        logger.error('Cannot find variable declaration, exit')
-        exit(-1)
-    
-    identified_type = None
-    # back tracking to find type
-    back_queue = Queue()
-    back_visited = list()
-    back_queue.push(var_node)
-    back_visited.append(var_node)
-
-    while not back_queue.is_empty():
-        current_node = back_queue.pop()
-        current_node_type = cpg.nodes[current_node]['cpg_node'].node_type
-        if current_node_type == 'local_variable_declaration':
-            cur_node_successors = list(cpg.successors(current_node))
-            cur_node_successors.reverse()
-            for _cur_successor in cur_node_successors:
-                _cur_successor_type = cpg.nodes[_cur_successor]['cpg_node'].node_type
-                if _cur_successor_type != 'variable_declarator' and check_edge(cpg, current_node, _cur_successor) in ['100']:
-                    if _cur_successor_type == 'type_identifier':
-                        identified_type = cpg.nodes[_cur_successor]['cpg_node'].node_token
-                    elif _cur_successor_type in ['integral_type', 'floating_point_type', 'boolean_type', 'void_type']:
-                        _wrapper_successors = list(cpg.successors(_cur_successor))
-                        if len(_wrapper_successors) == 0:
-                            identified_type = cpg.nodes[_cur_successor]['cpg_node'].node_token
-                        else:
-                            identified_type = cpg.nodes[_wrapper_successors[0]]['cpg_node'].node_type
-                    else:
-                        identified_type = _cur_successor_type
-                    break
-            break
-        elif current_node_type == 'formal_parameter':
-            cur_node_successors = list(cpg.successors(current_node))
-            wrapper_type = cpg.nodes[cur_node_successors[-2]]['cpg_node'].node_type
-            if wrapper_type in ['integral_type', 'floating_point_type', 'boolean_type', 'void_type']:
-                _wrapper_successors = list(cpg.successors(cur_node_successors[-2]))
-                if len(_wrapper_successors) == 0:
-                    identified_type = cpg.nodes[cur_node_successors[-2]]['cpg_node'].node_token
-                else:
-                    identified_type = cpg.nodes[_wrapper_successors[0]]['cpg_node'].node_type
-            else:
-                identified_type = wrapper_type
-            break
-        else:
-            # now we only support local variable declaraion and formal parameter.
-            pass
-        cur_preds = list(cpg.predecessors(current_node))
-        for _pred in cur_preds:
-            if _pred not in back_visited and check_edge(cpg, _pred, current_node) in ['100']:
-                back_queue.push(_pred)
-                back_visited.append(_pred)
-
-    return identified_type
@@ -1,7 +1,8 @@
-from networkx import DiGraph
+from utils.compact_cpg import CPGraph
+from utils.pickling import Slotted, intern_str
 from utils.setting import logger
 
-class CGNode():
+class CGNode(Slotted):
     """Function Meta Structure for call graph construction.
 
     attributes:
@@ -13,20 +14,30 @@ class CGNode():
         entrynode -- control flow graph entry point.
         fringe -- control flow graph out point.
         cpg -- code property graph of each function.
+        node_base -- offset added to node ids of cpg to make them unique across functions, assigned at encoding.
+        degraded -- None if cpg is complete, otherwise [mode, node number, statement number] of a function built over its complexity budget.
+
+    File, function and parameter names are interned, they repeat across the CGNodes of a corpus.
     """
-    def __init__(self, file_name: str, import_header: list, func_name: str, parameter_type: list, parameter_name: list, entrynode: str, fringe: list, cpg: DiGraph, callees: dict) -> None:
+    __slots__ = ['file_name', 'import_header', 'func_name', 'parameter_type', 'parameter_name', 'entrynode', 'fringe', 'cpg', 'callees', 'node_base', 'degraded']
+    slot_defaults = {'node_base': 0, 'degraded': None}
+    interned = ('file_name', 'func_name')
+
+    def __init__(self, file_name: str, import_header: list, func_name: str, parameter_type: list, parameter_name: list, entrynode: int, fringe: list, cpg: CPGraph, callees: dict) -> None:
         if entrynode == None or fringe == [] or cpg == None:
             logger.error('Constructing CGNode failed, lacks entry node, fringe or cpg, exit')
             exit(-1)
-        self.file_name = file_name
+        self.file_name = intern_str(file_name)
         self.import_header = import_header
-        self.func_name = func_name
-        self.parameter_type = parameter_type
-        self.parameter_name = parameter_name
+        self.func_name = intern_str(func_name)
+        self.parameter_type = [intern_str(x) for x in parameter_type]
+        self.parameter_name = [intern_str(x) for x in parameter_name]
         self.entrynode = entrynode
         self.fringe = fringe
         self.cpg = cpg
         self.callees = callees
+        self.node_base = 0
+        self.degraded = None
     
     # TODO
     def is_matched_callee(self) -> bool:
@@ -35,20 +46,23 @@ class CGNode():
         pass
 
 
-class CalleeNode():
+class CalleeNode(Slotted):
     """Class structure for callee function meta information.
     
     attributes:
-        node_key -- statement key
+        node_key -- statement node id in the cpg of the caller
         callee_name -- name of the callee function.
         param_num -- number of arguments
         param_type -- types inferred for arguments.
     """
-    def __init__(self, node_key: str, callee_name: str, param_num: int, param_type: list) -> None:
+    __slots__ = ['node_key', 'callee_name', 'param_num', 'param_type']
+    interned = ('callee_name',)
+
+    def __init__(self, node_key: int, callee_name: str, param_num: int, param_type: list) -> None:
         self.node_key = node_key
-        self.callee_name = callee_name
+        self.callee_name = intern_str(callee_name)
         self.param_num = param_num
-        self.param_type = param_type
+        self.param_type = [intern_str(x) for x in param_type]
     
     def get_key(self) -> str:
         """Generate a key for this callee function.
@@ -7,20 +7,31 @@ from javacpg.cpg.cg_constructor import *
 from javacpg.cpg.ddg_constructor import *
 from javacpg.encoding.encoding import *
 from javacpg.encoding.query import *
+from javacpg.sast.parser_session import get_session
 from javacpg.sast.src_parser import *
 from javacpg.util.common import *
 from javacpg.util.helper import *
 from javacpg.util.visualize import *
+from utils.discovery import is_archive, read_source
+from utils.parse_cache import ParseCache, cached_imap, grammar_digest
 from utils.setting import logger
-from func_timeout import func_set_timeout, FunctionTimedOut
+from utils.complexity import ComplexityBudget
+from utils.supervisor import Budget, FailureReport, supervised_call
 
-@func_set_timeout(80)
-def ast4singleclass(file_path: str = None) -> list:
+def ast4singleclass(file_path: str = None, budget: Budget = None) -> list:
     """Generate ast representations for functions in one class.
+
+    It runs in a supervised worker process within budget (80s by default), SupervisedFailure is raised otherwise.
     """
     if file_path == None:
         logger.error('AST4singleclass lacks file path parameter.')
         exit(-1)
+    if budget == None:
+        budget = Budget(timeout=80)
+
+    return supervised_call(class_asts, file_path, budget)
+
+def class_asts(file_path: str) -> list:
     file_funcs = java_parser(file_path)
     func_list = list()
 
@@ -31,14 +42,20 @@ def ast4singleclass(file_path: str = None) -> list:
 
     return func_list
 
-@func_set_timeout(100)
-def cpg4singleclass(file_path: str = None) -> list:
+def cpg4singleclass(file_path: str = None, budget: Budget = None) -> list:
     """Generate cpg representations for functions in one class.
+
+    It runs in a supervised worker process within budget (100s by default), SupervisedFailure is raised otherwise.
     """
     if file_path == None:
         logger.error('CPG4singleclass lacks fle path parameter.')
         exit(-1)
-    
+    if budget == None:
+        budget = Budget(timeout=100)
+
+    return supervised_call(class_cpgs, file_path, budget)
+
+def class_cpgs(file_path: str) -> list:
     file_funcs = java_parser(file_path)
     func_list = list()
     for func in file_funcs:
@@ -52,10 +69,17 @@ def cpg4singleclass(file_path: str = None) -> list:
     logger.info(len(file_funcs))
     return func_list
 
-@func_set_timeout(60)
-def cpg_constructor(func: FunUnit) -> DiGraph:
+def cpg_constructor(func: FunUnit, budget: Budget = None) -> CPGraph:
     """Construct cpg.
+
+    It runs in a supervised worker process within budget (60s by default), SupervisedFailure is raised otherwise.
     """
+    if budget == None:
+        budget = Budget(timeout=60)
+
+    return supervised_call(build_cpg, func, budget)
+
+def build_cpg(func: FunUnit) -> CPGraph:
     func_root = func.sast.root
     ast_cpg = gen_ast_cpg(func.sast)
     cfg_build(ast_cpg, func_root)
@@ -63,62 +87,68 @@ def cpg_constructor(func: FunUnit) -> DiGraph:
 
     return ast_cpg
 
-"""
-def extract_funcs(dir_path: str = None) -> list:
-    if dir_path == None:
-        logger.error('Cpg4multiclass lacks directory path.')
-        exit(-1)
-    files = traverse_src_files(dir_path, 'java')
-    func_list = list()
-    logger.info('Extract functions...')
+def init_extract_worker() -> None:
+    """Load tree-sitter grammar and compile queries once per extraction process.
+    """
+    get_session()
 
-    for file in files:
-        file_func = java_parser(file)
-        logger.info(f'Parsing file: {file}')
-        if len(file_func) == 0:
-            logger.warn(f'Cannot extract functions from {file}')
-            exit(-1)
-        for func in file_func:
-            if not func.has_type('ERROR'):
-                func_list.append(func)
-                try:
-                    cpg_constructor(func)
-                    # func_list.append(func)
-                    # print(file)
-                except FunctionTimedOut:
-                    logger.warn('Parsing file: {} \t function: {}' .format(file, func.func_name))
-
-                
-            else:
-                logger.error(file)
-                logger.error('Parsing file: {} \t function: {}' .format(file, func.func_name))
+def extract_file_funcs(source) -> list:
+    """Parse one class file with the parser of current process.
 
-    return func_list
-"""
+    attributes:
+        source -- file path, or [member name, source code] of an archive member.
 
-def extract_funcs(dir_path: str = None) -> list:
-    """Extract all functions from multiple classes (directory).
+    returns:
+        [file_path, file_funcs] -- file path and the FunUnits extracted from it.
+    """
+    file_path, src_code = read_source(source)
+    return [file_path, java_parser(file_path, src_code=src_code)]
+
+def iter_file_funcs(dir_path: str = None, workers: int = 1, cache: ParseCache = None, src_filter: SourceFilter = None, report: FailureReport = None):
+    """Yield the valid functions of each class file in file order, see extract_funcs for the attributes.
     """
     if dir_path == None:
         logger.error('Cpg4multiclass lacks directory path.')
         exit(-1)
-    files = traverse_src_files(dir_path, 'java')
-    func_list = list()
+    files = traverse_src_files(dir_path, 'java', src_filter)
+    from_archive = is_archive(dir_path)
     logger.info('Extract functions...')
 
-    for file in files:
-        file_func = java_parser(file)
+    for file, file_func in cached_imap(extract_file_funcs, files, workers, init_extract_worker, cache):
         logger.info(f'Parsing file: {file}')
         if len(file_func) == 0:
+            if from_archive:
+                logger.warn(f'Cannot extract functions from {file}, skipping...')
+                continue
             logger.warn(f'Cannot extract functions from {file}, deleting...')
             os.remove(file)
             continue
+        file_funcs = list()
         for func in file_func:
+            # entries of the parse cache are shared by equal files of other directories
+            func.file_path = file
             if not func.has_type('ERROR'):
-                func_list.append(func)
+                file_funcs.append(func)
+            elif report != None:
+                report.add('extract', file, func.func_name, 'parse_error')
             else:
                 logger.error(f'File: {file} \t function: {func.func_name} has ERROR Type.')
                 exit(-1)
+        yield file_funcs
+
+def extract_funcs(dir_path: str = None, workers: int = 1, cache: ParseCache = None, src_filter: SourceFilter = None, report: FailureReport = None) -> list:
+    """Extract all functions from multiple classes (directory).
+
+    attributes:
+        dir_path -- directory (or .tar, .tar.gz, .zip archive) including java files.
+        workers -- number of parsing processes, functions keep the order of the serial path.
+        cache -- parse cache, unchanged files are loaded from it instead of being parsed.
+        src_filter -- size, exclude and shard options of source files.
+        report -- if given, functions with ERROR nodes are skipped and recorded instead of exiting.
+    """
+    func_list = list()
+    for file_funcs in iter_file_funcs(dir_path, workers, cache, src_filter, report):
+        func_list += file_funcs
 
     return func_list
 
@@ -157,10 +187,44 @@ def cpg4clone(func_list: list = None) -> None:
     
     logger.warn(f'cpg number: {len(cpg_list)}')
 
-def cpg4multifiles(func_list: list) -> dict:
-    """Generate cpg for multi files.
+def open_parse_cache(cache_path: str, max_size: int) -> ParseCache:
+    """Open the parse cache of java files, entries are bound to current grammar and constructor version.
+
+    attributes:
+        cache_path -- root directory of the parse cache.
+        max_size -- upper bound of the cache size in MB.
+    """
+    version = 'java-{}-{}' .format(grammar_digest(get_session().parser.lib_path), CONSTRUCTOR_VERSION)
+    return ParseCache(os.path.join(cache_path, 'java'), max_size * 1024 * 1024, version)
+
+def cpg4multifiles(func_list: list, cache: ParseCache = None, budget: Budget = None, report: FailureReport = None, workers: int = 1, complexity: ComplexityBudget = None) -> dict:
+    """Generate cpg for multi files, CGNodes of unchanged files are taken from cache.
+
+    With budget, cpgs are built in supervised worker processes and functions over budget are skipped and recorded in report.
+    Functions over complexity are built in its degrade mode.
     """
     logger.info('Start generating CPG Dict...')
-    cpg_dict = cg_dict_constructor(func_list)
+    cpg_dict = cg_dict_constructor(func_list, cache, budget, report, workers, complexity)
 
-    return cpg_dict
\ No newline at end of file
+    return cpg_dict
+
+def cpg4chunks(dir_path: str, chunk_size: int, workers: int = 1, cache: ParseCache = None, src_filter: SourceFilter = None, budget: Budget = None, report: FailureReport = None, complexity: ComplexityBudget = None):
+    """Yield [func_list, func_dict] of consecutive files holding at least chunk_size functions (the last chunk may hold fewer),
+    so that only one chunk of cpgs is built at a time. Functions of one file stay in one chunk.
+
+    Cache entries of a chunk are stored once the next chunk is requested.
+    """
+    func_list = list()
+    for file_funcs in iter_file_funcs(dir_path, workers, cache, src_filter, report):
+        func_list += file_funcs
+        if len(func_list) < chunk_size:
+            continue
+        yield [func_list, cpg4multifiles(func_list, cache, budget, report, workers, complexity)]
+        if cache != None:
+            cache.store()
+        func_list = list()
+
+    if len(func_list) > 0:
+        yield [func_list, cpg4multifiles(func_list, cache, budget, report, workers, complexity)]
+        if cache != None:
+            cache.store()
@@ -1,11 +1,14 @@
-from networkx import DiGraph
-from utils.data_structure import Queue, Stack
+from collections import deque
+from utils.compact_cpg import CFG_EDGE, DDG_EDGE, CPGraph
+from utils.data_structure import Stack
+from utils.dataflow import reaching_def_edges
+from utils.traversal import level_order, stat_predecessors, stat_successors
 from utils.setting import logger
 from javacpg.sast.fun_unit import FunUnit
 from javacpg.util.common import cpg_edge_type
 from javacpg.cpg.ddg_node import DDGNode
 
-def ddg_build(cfg_cpg: DiGraph, node: str = None):
+def ddg_build(cfg_cpg: CPGraph, node: str = None):
     """Identify def-use information in control-flow based Code Property Graph and generate data flow edge for cfg_cpg to form complete Code Property Graph.
 
     attribtues:
@@ -16,6 +19,16 @@ def ddg_build(cfg_cpg: DiGraph, node: str = None):
         xxxx
     """
     def_use_chain = gen_def_use_chain(cfg_cpg, node)
+    ddg_edges = reaching_def_edges(cfg_cpg, def_use_chain)
+    if ddg_edges == None:
+        ddg_back_tracking(cfg_cpg, def_use_chain)
+        return
+    for _def, _use in ddg_edges:
+        add_ddg_edge(cfg_cpg, _def, _use)
+
+def ddg_back_tracking(cfg_cpg: CPGraph, def_use_chain: dict) -> None:
+    """Add data flow edges by a backward search from every used variable, used when reaching_def_edges cannot decide the edges.
+    """
     for key, value in def_use_chain.items():
         # print(value.print_defs_uses())
         if value.uses == []:
@@ -62,7 +75,7 @@ def has_dd_rel(use_var: str = None, def_node: DDGNode = None) -> bool:
         _dd_rel = True
     return _dd_rel
 
-def add_ddg_edge(cfg_cpg: DiGraph = None, start_node_identifier: str = None, end_node_identifier: str = None) -> bool:
+def add_ddg_edge(cfg_cpg: CPGraph = None, start_node_identifier: str = None, end_node_identifier: str = None) -> bool:
     """Add data flow edge into cfg_cpg to form complete Code Property Graph.
 
     attributes:
@@ -73,7 +86,7 @@ def add_ddg_edge(cfg_cpg: DiGraph = None, start_node_identifier: str = None, end
     returns:
         True / False -- if add the edge successfully, return True, else False.
     """
-    edge_type = cpg_edge_type(cfg_cpg, start_node_identifier, end_node_identifier, '001')
+    edge_type = cpg_edge_type(cfg_cpg, start_node_identifier, end_node_identifier, DDG_EDGE)
 
     cfg_cpg.add_edge(start_node_identifier, end_node_identifier, edge_type = edge_type)
 
@@ -90,16 +103,17 @@ def initialize_def(func: FunUnit = None) -> list:
     """
     return func.field_params
     
-def check_edge(cfg_cpg: DiGraph = None, start: str = None, end: str = None) -> str:
+def check_edge(cfg_cpg: CPGraph = None, start: str = None, end: str = None) -> str:
     """Check the encoding of edge between start and end.
     """
-    if cfg_cpg.has_edge(start, end):
-        return cfg_cpg[start][end]['edge_type']
+    edge_type = cfg_cpg.edge_type(start, end)
+    if edge_type != None:
+        return edge_type
     
     return False
 
 
-def gen_def_use_chain(cfg_cpg: DiGraph = None, node: str = None) -> dict:
+def gen_def_use_chain(cfg_cpg: CPGraph = None, node: str = None) -> dict:
     """Traverse cfg cpg and extract def-use information for each statement node in order. Remember we traverse the graph by level-order.
 
     attributes:
@@ -111,43 +125,29 @@ def gen_def_use_chain(cfg_cpg: DiGraph = None, node: str = None) -> dict:
 
     ddg_chain = dict()
 
-    # used to check whether visit current node or not to avoid circle.
-    check_exist = list()
-    queue = Queue()
-    queue.push(node)
-    check_exist.append(node)
-
-    while not queue.is_empty():
-        current_node = queue.pop()
+    for current_node in level_order(node, lambda x: stat_successors(cfg_cpg, x)):
         ddg_node = merge_def_use(cfg_cpg, current_node)
         if ddg_node.node_key in ddg_chain:
             logger.error('Appear duplicated Dict key, exit.')
             exit(-1)
         ddg_chain[ddg_node.node_key] = ddg_node
-        node_successors = list(cfg_cpg.successors(current_node))
-        for _successor in node_successors:
-            if cfg_cpg.nodes[_successor]['cpg_node'].match_statement and _successor not in check_exist and check_edge(cfg_cpg, current_node, _successor) in ['010', '110', '011', '111']:
-                queue.push(_successor)
-                check_exist.append(_successor)
 
     return ddg_chain
 
-def back_tracking(cfg_cpg: DiGraph = None, node: str = None, def_use_chain: dict = None, use_var: str = None) -> bool:
+def back_tracking(cfg_cpg: CPGraph = None, node: str = None, def_use_chain: dict = None, use_var: str = None) -> bool:
     """Given cfg-based Code Property Graph and a node identifier, then do back tracking to add data flow edge.
     """
-    visited = list()
-    queue = Queue()
+    visited = set()
+    queue = deque()
     if node == None:
         return True
 
-    queue.push(node)
-    while not queue.is_empty():
-        current_node = queue.pop()
-        visited.append(current_node)
-        predecessors = list(cfg_cpg.predecessors(current_node))
-        for _predecessor in predecessors:
-            _match_stat = cfg_cpg.nodes[_predecessor]['cpg_node'].match_statement
-            if _match_stat and _predecessor not in visited and check_edge(cfg_cpg, _predecessor, current_node) in ['010', '110', '011', '111']:
+    queue.append(node)
+    while queue:
+        current_node = queue.popleft()
+        visited.add(current_node)
+        for _predecessor in stat_predecessors(cfg_cpg, current_node):
+            if _predecessor not in visited:
                 if _predecessor not in def_use_chain:
                     logger.error('Current node cannot be find in def use chain, exit')
                     exit(-1)
@@ -155,7 +155,7 @@ def back_tracking(cfg_cpg: DiGraph = None, node: str = None, def_use_chain: dict
                 if has_dd_rel(use_var, ddg_predecessor):
                     add_ddg_edge(cfg_cpg, ddg_predecessor.node_key, node)
                 else:
-                    queue.push(_predecessor)
+                    queue.append(_predecessor)
     
     # print back tracking path
     # for x in visited:
@@ -163,7 +163,7 @@ def back_tracking(cfg_cpg: DiGraph = None, node: str = None, def_use_chain: dict
     # print()
     return True
 
-def gen_def_use_chains(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def gen_def_use_chains(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Traverse cfg-based cpg and extract def-use information for each statement node in order. Note we traverse the graph with customized DFS to obtain all possible path.
 
     Note: this function can generate all def-use chains, since it simulates all execution paths. However, the time overhead is too large for us, hence, we construst the def use chain via other approach.
@@ -184,7 +184,7 @@ def gen_def_use_chains(cfg_cpg: DiGraph = None, node: str = None) -> list:
                 break
         return res
 
-    def is_leaf(cfg_cpg: DiGraph = None, visited: list = None, current_node: str = None) -> bool:
+    def is_leaf(cfg_cpg: CPGraph = None, visited: list = None, current_node: str = None) -> bool:
         res = True
 
         _successors = list(cfg_cpg.successors(current_node))
@@ -234,7 +234,7 @@ def gen_def_use_chains(cfg_cpg: DiGraph = None, node: str = None) -> list:
                 continue
             if is_visited(visited, _successor):
                 continue
-            if not check_edge(cfg_cpg, current_node[0], _successor) in ['010', '110']:
+            if not check_edge(cfg_cpg, current_node[0], _successor) & CFG_EDGE:
                 continue
 
             _successor_info = [_successor, current_node[1] + 1]
@@ -261,7 +261,7 @@ def combine_fields(left_v: list = None, right_v: list = None) -> list:
 
     return res_v
 
-def merge_def_use(cfg_cpg: DiGraph = None, node: str = None) -> DDGNode:
+def merge_def_use(cfg_cpg: CPGraph = None, node: str = None) -> DDGNode:
     """Parse one statement node, and traverse its all child entities (non cfg) to collect its def use information and Merge them together.
     """
     defs, uses, unknown = [], [], []
@@ -294,7 +294,7 @@ def merge_def_use(cfg_cpg: DiGraph = None, node: str = None) -> DDGNode:
     
     return DDGNode(node, cfg_cpg.nodes[node]['cpg_node'].node_type, tmp_defs, tmp_uses, tmp_unknown)
 
-def extract_def_use(cfg_cpg : DiGraph = None, node: str = None) -> list:
+def extract_def_use(cfg_cpg : CPGraph = None, node: str = None) -> list:
     """Traverse entity of statement identified by node to extract its def-use information.
 
     attributes:
@@ -344,7 +344,7 @@ def extract_def_use(cfg_cpg : DiGraph = None, node: str = None) -> list:
     
     return [defs, uses, unknown]
 
-def ddg_deeper(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_deeper(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse node not be expression.
     """
     defs, uses, unknown = [], [], []
@@ -367,7 +367,7 @@ def ddg_deeper(cfg_cpg: DiGraph = None, node: str = None) -> list:
 handle primary expression
 """
 # identifier
-def ddg_identifier(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_identifier(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse identifier and extract def use information. Specifically, identifier cannot reflect its def use information.
     """
     defs, uses = [], []
@@ -379,7 +379,7 @@ def ddg_identifier(cfg_cpg: DiGraph = None, node: str = None) -> list:
 # TODO
 
 # object creation expression
-def ddg_object_creation_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_object_creation_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse object creation expression and extract def use information. Specifically, object creation expression only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -394,7 +394,7 @@ def ddg_object_creation_expression(cfg_cpg: DiGraph = None, node: str = None) ->
     return [defs, uses, unknown]
 
 # filed_access
-def ddg_field_access(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_field_access(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse field access and extract def use information. Specifically, field access only has used variables. Note: for field access need combinations(e.g., a.b.c, use a, a.b a.b.c)
     """
     defs, uses, unknown = [], [], []
@@ -416,7 +416,7 @@ def ddg_field_access(cfg_cpg: DiGraph = None, node: str = None) -> list:
     return [defs, uses, unknown]
 
 # array_access
-def ddg_array_access(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_array_access(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse array access and extract def use information. Specifically, array access only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -435,7 +435,7 @@ def ddg_array_access(cfg_cpg: DiGraph = None, node: str = None) -> list:
     return [defs, uses, unknown]
 
 # method_invocation
-def ddg_method_invocation(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_method_invocation(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse method invocation and extract def use information. Specifically, method invocation only has used variables.
     """
     method_invocation_successors = list(cfg_cpg.successors(node))
@@ -454,7 +454,7 @@ def ddg_method_invocation(cfg_cpg: DiGraph = None, node: str = None) -> list:
 # TODO
 
 # array_creation_expression
-def ddg_array_creation_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_array_creation_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse array_creation_expression and extract def use information. Specifically, array creation expression only has use variables.
     """
     defs, uses, unknown = [], [], []
@@ -472,7 +472,7 @@ def ddg_array_creation_expression(cfg_cpg: DiGraph = None, node: str = None) ->
 handle expression
 """
 # assignment_expression
-def ddg_assignment_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_assignment_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse assignment expression and extract def use information.
     Specifically, assignment expression has both def and use variables.
     """
@@ -493,7 +493,7 @@ def ddg_assignment_expression(cfg_cpg: DiGraph = None, node: str = None) -> list
     return [defs, uses, unknown]
 
 # binary_expression
-def ddg_binary_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_binary_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse binary expression and extract def use information. Specifically, binary expression only has used variables.
     """
     # situation: 3 children
@@ -513,7 +513,7 @@ def ddg_binary_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
     return [defs, uses, unknown]
 
 # instanceof_expression
-def ddg_instanceof_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_instanceof_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse instanceof expression and extract def use information. Specifically, instanceof expression only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -536,7 +536,7 @@ def ddg_instanceof_expression(cfg_cpg: DiGraph = None, node: str = None) -> list
 # TODO cannot support lambda expression now
 
 # ternary_expression
-def ddg_ternary_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_ternary_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse ternary expression and extract def use information. Specifically, ternary expression only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -558,7 +558,7 @@ def ddg_ternary_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
 
 
 # update_expression
-def ddg_update_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_update_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse update expression and extract def use information. Specifically, update expression only has def variables.
     """
 
@@ -577,7 +577,7 @@ def ddg_update_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
     return [defs, uses, unknown]
 
 # unary_expression
-def ddg_unary_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_unary_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse unary expression and extract def use information, specifically, unary expression only has use variables.
     """
     defs, uses, unknown = [], [], []
@@ -593,7 +593,7 @@ def ddg_unary_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
     return [defs, uses, unknown]
 
 # cast_expression
-def ddg_cast_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_cast_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse cast expression and extract def-use information, specifically, cast_expression only has use variables.
     """
     defs, uses, unknown = [], [], []
@@ -609,7 +609,7 @@ def ddg_cast_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
 """
 handle other situations
 """
-def ddg_variable_declarator(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_variable_declarator(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse variable declarator and extract def use information. Specifically, variable declarator has both def and use variable.
     """
     defs, uses, unknown = [], [], []
@@ -630,7 +630,7 @@ def ddg_variable_declarator(cfg_cpg: DiGraph = None, node: str = None) -> list:
 
     return [defs, uses, unknown]
 
-def ddg_argument_list(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_argument_list(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse argument list and extract def use information. Specifically, argument list only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -644,7 +644,7 @@ def ddg_argument_list(cfg_cpg: DiGraph = None, node: str = None) -> list:
     
     return [defs, uses, unknown]
 
-def ddg_formal_parameter(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_formal_parameter(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse formal parameter and extract def use information. Specifically, formal parameter only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -658,7 +658,7 @@ def ddg_formal_parameter(cfg_cpg: DiGraph = None, node: str = None) -> list:
 
     return [defs, uses, unknown]
 
-def ddg_parenthesized_expression(cfg_cpg: DiGraph = None, node: str = None) -> list:
+def ddg_parenthesized_expression(cfg_cpg: CPGraph = None, node: str = None) -> list:
     """Parse parenthesized expression and extract def use information. Specifically, parenthesized expression only has used variables.
     """
     defs, uses, unknown = [], [], []
@@ -1,9 +1,11 @@
+from utils.pickling import Slotted
 from utils.setting import logger
 
-class DDGNode():
+class DDGNode(Slotted):
     """Node structure used for Data Dependency Graph construction. In general, we traverse the ast-based control flow graph, find each control flow node's def-use information.
     """
-    def __init__(self, node_key: str = None, node_type: str = None, defs: list = [], uses : list = [], unknow: list = []) -> None:
+    __slots__ = ['node_key', 'node_type', 'defs', 'uses', 'unknown']
+    def __init__(self, node_key: int = None, node_type: str = None, defs: list = [], uses : list = [], unknow: list = []) -> None:
         if node_key == None:
             logger.error('DDGNode initialization need node type, exit.')
             exit(-1)
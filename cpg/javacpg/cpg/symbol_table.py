@@ -0,0 +1,127 @@
+"""Declared types of the variables of one function, used to type identifier arguments of callees.
+"""
+from utils.compact_cpg import AST_EDGE, CPGraph
+from utils.traversal import typed_predecessors, typed_successors
+
+primitive_types = ['integral_type', 'floating_point_type', 'boolean_type', 'void_type']
+parameter_types = ['formal_parameter', 'spread_parameter']
+
+class SymbolTable():
+    """Local variables and parameters declared in one function.
+
+    attributes:
+        symbols -- dict, variable name -> list of [scope start, scope end, declaration start, declared type], positions are byte offsets of the source file.
+    """
+    def __init__(self) -> None:
+        self.symbols = dict()
+
+    def declare(self, var_name: str, scope_start: int, scope_end: int, decl_start: int, var_type: str) -> None:
+        if var_name not in self.symbols:
+            self.symbols[var_name] = list()
+        self.symbols[var_name].append([scope_start, scope_end, decl_start, var_type])
+
+    def lookup(self, var_name: str, position: int) -> str:
+        """Declared type of var_name at byte offset position, taken from the innermost visible declaration.
+
+        returns:
+            var_type -- declared type, None if var_name is not declared in scope (e.g., class fields).
+        """
+        var_type = None
+        innermost = -1
+        for scope_start, scope_end, decl_start, _type in self.symbols.get(var_name, []):
+            if decl_start <= position < scope_end and scope_start >= innermost:
+                innermost = scope_start
+                var_type = _type
+
+        return var_type
+
+def type_name(cpg: CPGraph, type_node: int) -> str:
+    """Name of a declared type, class names keep their token, primitive types their keyword, other types (e.g., generic_type, array_type) their node type.
+    """
+    node_type = cpg.node_type(type_node)
+    if node_type == 'type_identifier':
+        return cpg.node_token(type_node)
+    if node_type in primitive_types:
+        _children = typed_successors(cpg, type_node, AST_EDGE)
+        if len(_children) == 0:
+            return cpg.node_token(type_node)
+        return cpg.node_type(_children[0])
+
+    return node_type
+
+def declared_type(cpg: CPGraph, decl_node: int) -> str:
+    """Type of a declaration node, its first child after the modifiers (and the for keyword of an enhanced for statement).
+    A catch parameter has the type it catches, catch_type if it catches several (e.g., IOException | RuntimeException).
+    """
+    for _child in typed_successors(cpg, decl_node, AST_EDGE):
+        _child_type = cpg.node_type(_child)
+        if _child_type in ['modifiers', 'for']:
+            continue
+        if _child_type == 'catch_type':
+            _caught = [x for x in typed_successors(cpg, _child, AST_EDGE) if cpg.node_type(x) != '|']
+            if len(_caught) == 1:
+                return type_name(cpg, _caught[0])
+        return type_name(cpg, _child)
+
+    return None
+
+def declared_names(cpg: CPGraph, decl_node: int) -> list:
+    """Identifier nodes declared by a local_variable_declaration, formal_parameter, spread_parameter, catch_formal_parameter
+    or enhanced_for_statement.
+    """
+    names = list()
+    for _child in typed_successors(cpg, decl_node, AST_EDGE):
+        _child_type = cpg.node_type(_child)
+        if _child_type == 'identifier':
+            names.append(_child)
+        elif _child_type == 'variable_declarator':
+            _declarator = typed_successors(cpg, _child, AST_EDGE)
+            if len(_declarator) > 0 and cpg.node_type(_declarator[0]) == 'identifier':
+                names.append(_declarator[0])
+    # the loop variable comes before the iterated value, which may be an identifier too
+    if cpg.node_type(decl_node) == 'enhanced_for_statement':
+        return names[:1]
+
+    return names
+
+def build_symbol_table(cpg: CPGraph) -> SymbolTable:
+    """Collect the declarations of a function in one pass over its nodes.
+
+    A local variable is visible from its declaration to the end of the enclosing node (block, for statement, switch group, ...),
+    a parameter in the whole method, constructor or lambda declaring it, the variable of an enhanced for statement in the
+    statement and a catch parameter in its catch clause.
+
+    attributes:
+        cpg -- code property graph of one function.
+
+    returns:
+        symbol_table -- SymbolTable of the function.
+    """
+    symbol_table = SymbolTable()
+
+    for node in cpg.nodes:
+        node_type = cpg.node_type(node)
+        if node_type == 'local_variable_declaration':
+            scope_nodes = typed_predecessors(cpg, node, AST_EDGE)
+        elif node_type in parameter_types:
+            # formal_parameters -> method_declaration / constructor_declaration / lambda_expression
+            scope_nodes = typed_predecessors(cpg, node, AST_EDGE)
+            if len(scope_nodes) > 0:
+                scope_nodes = typed_predecessors(cpg, scope_nodes[0], AST_EDGE)
+        elif node_type == 'enhanced_for_statement':
+            scope_nodes = [node]
+        elif node_type == 'catch_formal_parameter':
+            # catch_formal_parameter -> catch_clause
+            scope_nodes = typed_predecessors(cpg, node, AST_EDGE)
+        else:
+            continue
+        if len(scope_nodes) == 0:
+            continue
+        scope = scope_nodes[0]
+        var_type = declared_type(cpg, node)
+        if var_type == None:
+            continue
+        for _name in declared_names(cpg, node):
+            symbol_table.declare(cpg.node_token(_name), cpg.start_idx[scope], cpg.end_idx[scope], cpg.start_idx[node], var_type)
+
+    return symbol_table
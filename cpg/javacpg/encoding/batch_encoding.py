@@ -4,7 +4,10 @@
 from javacpg.encoding.query import *
 from javacpg.encoding.encoding import *
 from javacpg.encoding.clone_encoding import *
+from utils.complexity import degraded_rows, encoding_degraded
+from utils.profiler import profile_phase
 from utils.setting import logger
+from utils.stream_encoding import StreamEncoder
 
 def batch_encoding_typetokens(encode_path: str, func_list: list, start_idx: int = 0) -> None:
     """Encode function list.
@@ -23,67 +26,81 @@ def batch_encoding_sequences(encode_path: str, func_list: list) -> None:
         seqs.append(func.gen_typetoken_sequence())
     encoding_sequence(encode_path, seqs)
 
-def batch_encoding_entities(encode_path: str, func_dict: dict, start_idx: int=0) -> None:
+def batch_encoding_entities(encode_path: str, func_dict: dict, start_idx: int=0) -> list:
     """Encode entities.
+
+    returns:
+        entity_id -- list whose index is the global node id and value is the entity id.
     """
     all_entities = list()
+    assign_node_base(func_dict)
     
     for _, value in func_dict.items():
         for func_cgnode in value:
-            entities = entity_query(func_cgnode.cpg)
+            entities = entity_query(func_cgnode.cpg, func_cgnode.node_base)
             all_entities += entities
     
-    encoding_entity(encode_path, all_entities, start_idx)
+    return encoding_entity(encode_path, all_entities, start_idx)
 
 def batch_encoding_entity2typetoken(encode_path: str) -> None:
     """Call encoding_entity2typetoken directly is ok
     """
     encoding_entity2typetoken(encode_path)
 
-def batch_encoding_triplet(encode_path: str, func_dict: dict) -> None:
+def batch_encoding_triplet(encode_path: str, func_dict: dict, entity_id: list = None) -> None:
     """Batch encoding edges
     """
     all_edges = list()
 
     for _, value in func_dict.items():
         for func_cgnode in value:
-            edges = edge_query(func_cgnode.cpg)
+            edges = edge_query(func_cgnode.cpg, func_cgnode.node_base)
             all_edges += edges
     
-    encoding_triplet(encode_path, all_edges)
+    encoding_triplet(encode_path, all_edges, entity_id)
     reduce_edges(encode_path)
 
-def batch_encoding_statnodes(encode_path: str, func_dict: dict) -> None:
-    """Batch encoding statnodes.
+def batch_encoding_statnodes(encode_path: str, func_dict: dict, entity_id: list = None) -> None:
+    """Batch encoding statnodes, rows are written function by function.
     """
-    all_statement_entities = list()
+    def all_statement_entities():
+        for _, value in func_dict.items():
+            for func_cgnode in value:
+                for s_e in stat_entities(func_cgnode.cpg, func_cgnode.node_base):
+                    yield s_e
 
+    stat_num = 0
     for _, value in func_dict.items():
         for func_cgnode in value:
-            statement_entities = stat_entities(func_cgnode.cpg)
-            all_statement_entities += statement_entities
+            stat_num += func_cgnode.cpg.stat_flags.count(1)
 
-    encoding_statnodes(encode_path, all_statement_entities)
+    encoding_statnodes(encode_path, all_statement_entities(), entity_id, stat_num)
 
-def batch_encoding_cg(encode_path: str, func_dict: dict) -> None:
+def batch_encoding_cg(encode_path: str, func_dict: dict, entity_id: list = None) -> None:
     """Encoding call graph edge, regard all cg edges as control flow edge, edge type 2
     """
-    all_callees = list()
+    all_callee_nodes = list()
     for _, v in func_dict.items():
         for func_cgnode in v:
-            all_callees.append(func_cgnode.callees)
-
-    all_callee_nodes = list()
-    for callees in all_callees:
-        for _, v in callees.items():
-            all_callee_nodes += v
+            for _, callees in func_cgnode.callees.items():
+                all_callee_nodes += [[func_cgnode, callee] for callee in callees]
 
-    encoding_cg(encode_path, all_callee_nodes, func_dict)
+    encoding_cg(encode_path, all_callee_nodes, func_dict, entity_id)
     merge_edges(encode_path)
     reduce_edges(encode_path)
 
+def assign_node_base(func_dict: dict) -> None:
+    """Offset node ids of each cpg so that they are unique across all functions.
+    """
+    node_base = 0
+    for _, value in func_dict.items():
+        for func_cgnode in value:
+            func_cgnode.node_base = node_base
+            node_base += func_cgnode.cpg.number_of_nodes()
+
 def construt_rel_dict(encode_path: str) -> None:
     file_name = os.path.join(encode_path, 'rel2id.txt')
+    # relation ids are the edge type bitmasks stored in triple2id.txt
     if not os.path.exists(file_name):
         with open(file_name, 'w') as fn:
             fn.write('8\n')
@@ -103,9 +120,39 @@ def batch_encoding(encode_path: str, func_list: list, func_dict: dict) -> None:
     logger.info('Start encoding...')
     batch_encoding_typetokens(encode_path, func_list)
     batch_encoding_sequences(encode_path, func_list)
-    batch_encoding_entities(encode_path, func_dict)
+    entity_id = batch_encoding_entities(encode_path, func_dict)
     batch_encoding_entity2typetoken(encode_path)
-    batch_encoding_statnodes(encode_path, func_dict)
-    batch_encoding_triplet(encode_path, func_dict)
-    encoding_clone(encode_path, func_dict)
-    logger.info(f'Encoding finished, check result in {encode_path}.')
\ No newline at end of file
+    batch_encoding_statnodes(encode_path, func_dict, entity_id)
+    batch_encoding_triplet(encode_path, func_dict, entity_id)
+    encoding_clone(encode_path, func_dict, entity_id)
+    encoding_degraded(encode_path, degraded_rows(func_dict, entity_id))
+    logger.info(f'Encoding finished, check result in {encode_path}.')
+
+def stream_encoding(encode_path: str, chunks) -> None:
+    """Encode [func_list, func_dict] chunks one at a time, each chunk is released once its rows are written.
+
+    Entity and typetoken ids follow first appearance instead of the batch order, the encoded graph is the same.
+    """
+    encoder = StreamEncoder(encode_path, clone_file='bcb_clone.txt')
+    construt_rel_dict(encode_path)
+    logger.info('Start stream encoding...')
+    for func_list, func_dict in chunks:
+        with profile_phase('encoding'):
+            encoder.add_sequences([func.gen_typetoken_sequence() for func in func_list])
+            assign_node_base(func_dict)
+            entities, edges = list(), list()
+            for _, value in func_dict.items():
+                for func_cgnode in value:
+                    entities += entity_query(func_cgnode.cpg, func_cgnode.node_base)
+                    edges += edge_query(func_cgnode.cpg, func_cgnode.node_base)
+            entity_id = encoder.add_entities(entities)
+            for _, value in func_dict.items():
+                for func_cgnode in value:
+                    encoder.add_stat_entities(stat_entities(func_cgnode.cpg, func_cgnode.node_base), entity_id)
+            encoder.add_triples(edges, entity_id)
+            for file_id, nodes in clone_entities(func_dict).items():
+                encoder.add_clone_row(file_id, [encoder.find_entity_id(entity_id, x) for x in nodes])
+            encoder.add_degraded_rows(degraded_rows(func_dict, entity_id))
+        del func_list, func_dict, entities, edges, entity_id
+    encoder.close()
+    logger.info(f'Encoding finished, check result in {encode_path}.')
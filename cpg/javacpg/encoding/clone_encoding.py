@@ -1,7 +1,7 @@
 from javacpg.encoding.encoding import encoding_bcb_clone
 
-def encoding_clone(encode_path: str, func_dict: dict) -> None:
-    """Encoding BCB functions for code clone detection.
+def clone_entities(func_dict: dict) -> dict:
+    """Global node ids of the functions of each file, keyed by file name.
     """
     file_dict = dict()
     all_cg_nodes = list()
@@ -11,10 +11,15 @@ def encoding_clone(encode_path: str, func_dict: dict) -> None:
     
     for cg_node in all_cg_nodes:
         file_id = cg_node.file_name
-        cg_entities = list(cg_node.cpg.nodes)
+        cg_entities = [cg_node.node_base + x for x in cg_node.cpg.nodes]
         if file_id in file_dict:
             file_dict[file_id] += cg_entities
         else:
             file_dict[file_id] = cg_entities
-    
-    encoding_bcb_clone(encode_path, file_dict)
\ No newline at end of file
+
+    return file_dict
+
+def encoding_clone(encode_path: str, func_dict: dict, entity_id: list = None) -> None:
+    """Encoding BCB functions for code clone detection.
+    """
+    encoding_bcb_clone(encode_path, clone_entities(func_dict), entity_id)
@@ -3,9 +3,10 @@
 import os
 
 from javacpg.cpg.cg_node import CalleeNode, CGNode
+from utils.compact_cpg import AST_EDGE, CFG_EDGE, DDG_EDGE
 from utils.setting import logger
 
-def encoding_entity(encode_path: str, entities: list = None, start_idx: int = 0) -> bool:
+def encoding_entity(encode_path: str, entities: list = None, start_idx: int = 0) -> list:
     """Encoding entity from start index and store it to local file.
 
     attributes:
@@ -13,7 +14,7 @@ def encoding_entity(encode_path: str, entities: list = None, start_idx: int = 0)
         start_idx -- the start number of the first entity.
 
     returns:
-        True / False -- if encoding correctly, return True, else False.
+        entity_id -- list whose index is the global node id and value is the entity id.
     """
     file_name = 'entity2id.txt'
     file_name = os.path.join(encode_path, file_name)
@@ -38,24 +39,29 @@ def encoding_entity(encode_path: str, entities: list = None, start_idx: int = 0)
     
     logger.info(f'Encoding entities: {len(entity_list)}')
     
+    node_num = max([x[0] for x in entities]) + 1 if length else 0
+    entity_id = [None] * node_num
+
     # write result to entity2id.txt
     with open(file_name, 'w') as entity2id:
         line_num = str(len(entity_list)) + '\n'
         entity2id.write(line_num)
 
         for idx in range(len(entity_list)):
-            id = idx + start_idx
-            _entity_item = [x.strip('\n').replace(',', ' ') for x in entity_list[idx]]
-            line = str(id) + ',' + ','.join(_entity_item) + '\n'
+            id = str(idx + start_idx)
+            _entity_item = [x.strip('\n').replace(',', ' ') for x in entity_list[idx][:2]]
+            for node in entity_list[idx][2:]:
+                entity_id[node] = id
+            line = id + ',' + ','.join(_entity_item + [str(x) for x in entity_list[idx][2:]]) + '\n'
             entity2id.write(line)
     
-    return True
+    return entity_id
     
 
-def load_entity_id(encode_path: str) -> dict:
-    """Load entity pair dict, key is the hashkey and value is the id.
+def load_entity_id(encode_path: str) -> list:
+    """Load entity ids of global node ids.
     returns:
-        entity_id -- dict whose key is the hashkey and value is the id.
+        entity_id -- list whose index is the global node id and value is the entity id.
     """
 
     file_name = 'entity2id.txt'
@@ -65,69 +71,57 @@ def load_entity_id(encode_path: str) -> dict:
         logger.error('Cannot find entity2id file, please check, exit.')
         exit(-1)
     
-    entity_id = dict()
+    entity_id = list()
     
     with open(file_name, 'r') as entity2id:
         lines = entity2id.readlines()
     
     for line in lines[1:]:
         line = line.strip('\n').split(',', 3)
-        for hash_id in line[3].split(','):
-            entity_id[hash_id] = line[0]
+        for node in line[3].split(','):
+            node = int(node)
+            if node >= len(entity_id):
+                entity_id += [None] * (node + 1 - len(entity_id))
+            entity_id[node] = line[0]
 
     # logger.info(f'Load Unique Entities: {len(entity_id)}')
     
     return entity_id
 
-def load_rel_id(encode_path: str) -> dict:
-    """ Load relation id dict
+def find_entity_id(entity_id: list, node: int) -> str:
+    """Return the entity id of a global node id, None if the node is not encoded.
     """
-    file_name = 'rel2id.txt'
-    file_name = os.path.join(encode_path, file_name)
-    if not os.path.exists(file_name):
-        logger.error('Cannot find rel2id file, please check it, exit')
-        exit(-1)
-    
-    rel_id = dict()
-    with open(file_name, 'r') as rel2id:
-        lines = rel2id.readlines()
+    if node < 0 or node >= len(entity_id):
+        return None
     
-    for line in lines[1:]:
-        line = line.strip('\n').split(',')
-        key, id = line[0], line[1]
-        rel_id[key] = id
-    
-    if len(rel_id) != len(lines) - 1:
-        logger.error('Exist Hash Collision, Exit')
-        exit(-1)
-    
-    return rel_id
+    return entity_id[node]
 
-def encoding_triplet(encode_path: str, edges: list) -> bool:
+def encoding_triplet(encode_path: str, edges: list, entity_id: list = None) -> bool:
     """Encode relation between CPGNode and store it to local file.
 
     attributes:
         edges -- edge list waiting to encode.
-        file_name -- file that storing the result.
+        entity_id -- entity ids of global node ids, loaded from entity2id.txt if None.
 
     returns:
         True / False -- if encoding correctly, return True, else False.
     """
     triplet_name = 'triple2id.txt'
     triplet_name = os.path.join(encode_path, triplet_name)
-    entity_id = load_entity_id(encode_path)
-    rel_id = load_rel_id(encode_path)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
 
     edge_list = list()
 
     for edge in edges:
         start, end, edge_type = edge
-        if start not in entity_id.keys() or end not in entity_id.keys():
+        s = find_entity_id(entity_id, start)
+        e = find_entity_id(entity_id, end)
+        if s == None or e == None:
             logger.error('Appear isolated edge (with no node in graph), Exit')
             exit(-1)
-        s = entity_id[start]
-        e = entity_id[end]
-        e_t = rel_id[edge_type]
+        # relation ids in rel2id.txt are the edge type bitmasks
+        e_t = str(edge_type)
         edge_list.append([s, e, e_t])
     
     with open(triplet_name, 'w') as triplet2id:
@@ -141,34 +135,43 @@ def encoding_triplet(encode_path: str, edges: list) -> bool:
 
     return True
 
-def encoding_statnodes(encode_path: str, s_es: list) -> bool:
-    """Encode statement node entities.
+def encoding_statnodes(encode_path: str, s_es, entity_id: list = None, stat_num: int = None) -> bool:
+    """Encode statement node entities, entity ids are loaded from entity2id.txt if None.
+
+    attributes:
+        s_es -- iterable of [statement, statement, entities...] rows of global node ids.
+        stat_num -- number of rows, if given rows are written as s_es yields them instead of being collected first.
     """
     statnodes_name = 'stat2entity.txt'
     statnodes_name = os.path.join(encode_path, statnodes_name)
-    entity_id = load_entity_id(encode_path)
-
-    stat_nodes = list()
-    for stat_node in s_es:
-        stat_id = list()
-        for node in stat_node:
-            if node not in entity_id.keys():
-                logger.error('Appear isolated node (not appear in graph), Exit')
-                exit(-1)
-            node_id = entity_id[node]
-            stat_id.append(node_id)
-        stat_nodes.append(stat_id)
-    
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
+    if stat_num == None:
+        s_es = list(s_es)
+        stat_num = len(s_es)
+
+    written = 0
     with open(statnodes_name, 'w') as stat2entity:
-        line_num = str(len(stat_nodes)) + '\n'
+        line_num = str(stat_num) + '\n'
         stat2entity.write(line_num)
-        for nodes in stat_nodes:
-            line = ','.join(nodes)
+        for stat_node in s_es:
+            stat_id = list()
+            for node in stat_node:
+                node_id = find_entity_id(entity_id, node)
+                if node_id == None:
+                    logger.error('Appear isolated node (not appear in graph), Exit')
+                    exit(-1)
+                stat_id.append(node_id)
+            line = ','.join(stat_id)
             line = line + '\n'
             stat2entity.write(line)
-    
-    logger.info(f'Encode statement nodes {len(stat_nodes)}')
-    
+            written += 1
+
+    if written != stat_num:
+        logger.error(f'Expect {stat_num} statement rows but get {written}, exit.')
+        exit(-1)
+    logger.info(f'Encode statement nodes {stat_num}')
+
     return True
 
 def encoding_typetokens(encode_path: str, type_list: list, start_idx: int = 0) -> bool:
@@ -308,101 +311,156 @@ def encoding_entity2typetoken(encode_path: str) -> bool:
 
     return True
 
-def encoding_cg(encode_path: str, all_callees: list, func_dict: dict) -> bool:
-    """Encode cg.
+def match_parameter_type(callee_type: list, cg_type: list) -> bool:
+    """Whether every argument type of a callee appears in one of the parameter types of a function.
     """
-    def match_parameter_type(callee: CalleeNode, func: CGNode) -> bool:
-        """Given a callee node and a key matched functions, try to determine whether their parameter type match or not.
-        """
-        callee_type = callee.param_type
-        cg_type = func.parameter_type
-
-        is_matched = True
-        for _type in callee_type:
-            flag = False
-            for c_type in cg_type:
-                if c_type.find(_type) == -1:
-                    continue
-                else:
-                    flag = True
-                    break
-            if not flag:
-                is_matched = False
+    for _type in callee_type:
+        flag = False
+        for c_type in cg_type:
+            if c_type.find(_type) != -1:
+                flag = True
                 break
-        
-        return is_matched
-        
-    cg_name = 'cg2id.txt'
-    cg_name = os.path.join(encode_path, cg_name)
-    entity_id = load_entity_id(encode_path)
+        if not flag:
+            return False
 
-    all_edges = list()
+    return True
 
-    for callee in all_callees:
+def import_classes(import_header: list) -> set:
+    """Simple names of the classes named by import headers, e.g., List for `import java.util.List`
+    and Math for `import static java.lang.Math.max`, on-demand imports of packages are skipped.
+    """
+    classes = set()
+    for header in import_header:
+        path = header.strip()[len('import'):].strip()
+        is_static = path.startswith('static ')
+        if is_static:
+            path = path[len('static'):]
+        path = path.replace(' ', '').split('.')
+        if is_static and len(path) >= 2:
+            classes.add(path[-2])
+        elif not is_static and path[-1] != '*':
+            classes.add(path[-1])
+
+    return classes
+
+class CallIndex():
+    """Call graph resolution index over the functions of func_dict.
+
+    Candidates are resolved once per (name-arity key, argument types) of callees, entry and fringe ids once per function.
+    When several candidates remain, the classes visible to the caller (its own class and the imported ones) narrow them.
+
+    attributes:
+        func_dict -- dict of CGNodes with assigned node_base.
+        entity_id -- entity ids of global node ids.
+        matched -- dict, (key, argument types) -> CGNodes whose parameter types match.
+        visible -- dict, file name -> class names visible to the functions of the file.
+        targets -- dict, id of CGNode -> [entry node id, fringe ids].
+    """
+    def __init__(self, func_dict: dict, entity_id: list) -> None:
+        self.func_dict = func_dict
+        self.entity_id = entity_id
+        self.matched = dict()
+        self.visible = dict()
+        self.targets = dict()
+
+    def candidates(self, callee: CalleeNode) -> list:
+        """Functions matching the key and argument types of callee, all of them (at most 3) if no type matches.
+        """
         key = callee.get_key()
-        if key not in func_dict:
-            continue
-        start = callee.node_key
-        if start not in entity_id:
-            logger.error('Cannot find caller node')
-            exit(-1)
-        start_id = entity_id[start]
-        
-        cg_nodes = func_dict[key]
-
-        # there are two situations:
-        # 1: only one matched cg_node
-        # 2: many matched cg_nodes
-
-        # handle situation 1
-        if len(cg_nodes) == 1:
-            cg_node = cg_nodes[0]
-            entrynode = cg_node.entrynode
-            fringe = cg_node.fringe
-            if entrynode not in entity_id:
+        signature = (key, tuple(callee.param_type))
+        if signature not in self.matched:
+            cg_nodes = self.func_dict.get(key, [])
+            if len(cg_nodes) <= 1:
+                matched = list(cg_nodes)
+            else:
+                matched = [x for x in cg_nodes if match_parameter_type(callee.param_type, x.parameter_type)]
+                if len(matched) == 0 and len(cg_nodes) <= 3:
+                    matched = list(cg_nodes)
+            self.matched[signature] = matched
+
+        return self.matched[signature]
+
+    def resolve(self, caller: CGNode, callee: CalleeNode) -> list:
+        """Functions called by callee in caller.
+        """
+        matched = self.candidates(callee)
+        if len(matched) <= 1:
+            return matched
+        if caller.file_name not in self.visible:
+            self.visible[caller.file_name] = import_classes(caller.import_header) | {caller.file_name}
+        visible = self.visible[caller.file_name]
+        narrowed = [x for x in matched if x.file_name in visible]
+        if len(narrowed) > 0:
+            return narrowed
+
+        return matched
+
+    def target_ids(self, cg_node: CGNode) -> list:
+        """Entity ids of the entry node and the fringe of a called function.
+
+        returns:
+            [entrynode_id, fringe_ids]
+        """
+        if id(cg_node) not in self.targets:
+            entrynode_id = find_entity_id(self.entity_id, cg_node.node_base + cg_node.entrynode)
+            if entrynode_id == None:
                 logger.error('Cannot find entry node')
                 exit(-1)
-            entrynode_id = entity_id[entrynode]
             _f_ids = list()
-            for _f in fringe:
-                if _f not in entity_id:
+            for _f in cg_node.fringe:
+                _f_id = find_entity_id(self.entity_id, cg_node.node_base + _f)
+                if _f_id == None:
                     logger.error('Cannot find fringe')
                     exit(-1)
-                _f_ids.append(entity_id[_f])
-            
-            all_edges.append([start_id, entrynode_id, '2'])
+                _f_ids.append(_f_id)
+            self.targets[id(cg_node)] = [entrynode_id, _f_ids]
+
+        return self.targets[id(cg_node)]
+
+def cg_edges(all_callees: list, func_dict: dict, entity_id: list) -> list:
+    """Resolve all callees through one CallIndex.
+
+    attributes:
+        all_callees -- list of [caller, callee], caller is the CGNode including the callee node.
+        func_dict -- dict of CGNodes with assigned node_base.
+        entity_id -- entity ids of global node ids.
+
+    returns:
+        all_edges -- list of [start id, end id, edge type].
+    """
+    index = CallIndex(func_dict, entity_id)
+    all_edges = list()
+
+    for caller, callee in all_callees:
+        if callee.get_key() not in func_dict:
+            continue
+        start_id = find_entity_id(entity_id, caller.node_base + callee.node_key)
+        if start_id == None:
+            logger.error('Cannot find caller node')
+            exit(-1)
+
+        for cg_node in index.resolve(caller, callee):
+            entrynode_id, _f_ids = index.target_ids(cg_node)
+            all_edges.append([start_id, entrynode_id, str(CFG_EDGE)])
             for id in _f_ids:
-                all_edges.append([id, start_id, '2'])
-        
-        # handle situation 2
-        else:
-            tmp_cg_nodes = list()
-            for cg_node in cg_nodes:
-                is_matched = match_parameter_type(callee, cg_node)
-                if is_matched:
-                    tmp_cg_nodes.append(cg_node)
-            if len(tmp_cg_nodes) == 0 and len(cg_nodes) <= 3:
-                tmp_cg_nodes += cg_nodes
-
-            # connect all nodes in tmp_cg_nodes
-            for _cg_node in tmp_cg_nodes:
-                entrynode = _cg_node.entrynode
-                fringe = _cg_node.fringe
-                if entrynode not in entity_id:
-                    logger.error('Cannot find entry node')
-                    exit(-1)
-                entrynode_id = entity_id[entrynode]
-                _f_ids = list()
-                for _f in fringe:
-                    if _f not in entity_id:
-                        logger.error('Cannot find fringe')
-                        exit(-1)
-                    _f_ids.append(entity_id[_f])
-                
-                all_edges.append([start_id, entrynode_id, '2'])
-                for id in _f_ids:
-                    all_edges.append([id, start_id, '2'])
+                all_edges.append([id, start_id, str(CFG_EDGE)])
 
+    return all_edges
+
+def encoding_cg(encode_path: str, all_callees: list, func_dict: dict, entity_id: list = None) -> bool:
+    """Encode cg.
+
+    attributes:
+        all_callees -- list of [caller, callee], caller is the CGNode including the callee node.
+        func_dict -- dict of CGNodes with assigned node_base.
+        entity_id -- entity ids of global node ids, loaded from entity2id.txt if None.
+    """
+    cg_name = 'cg2id.txt'
+    cg_name = os.path.join(encode_path, cg_name)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
+
+    all_edges = cg_edges(all_callees, func_dict, entity_id)
 
     with open(cg_name, 'w') as cg2id:
         line_num = str(len(all_edges)) + '\n'
@@ -468,38 +526,26 @@ def reduce_edges(encode_path: str) -> None:
     dfg = 0
 
     for line in reduced_edges:
-        line = line.split(',')
-        if line[2] == '4':
-            ast += 1
-        elif line[2] == '2':
-            cfg += 1
-        elif line[2] == '1':
-            dfg += 1
-        elif line[2] == '6':
-            ast += 1
-            cfg += 1
-        elif line[2] == '5':
-            ast += 1
-            dfg += 1
-        elif line[2] == '3':
-            cfg += 1
-            dfg += 1
-        elif line[2] == '7':
+        edge_type = int(line.split(',')[2])
+        if edge_type <= 0 or edge_type > AST_EDGE | CFG_EDGE | DDG_EDGE:
+            logger.error('Cannot identify edge')
+            exit(-1)
+        if edge_type & AST_EDGE:
             ast += 1
+        if edge_type & CFG_EDGE:
             cfg += 1
+        if edge_type & DDG_EDGE:
             dfg += 1
-        else:
-            logger.error('Cannot identify edge')
-            exit(-1)
 
     
     logger.info(f'Triple: {len(reduced_edges)}')
     logger.info(f'AST: {ast} \t CFG: {cfg} \t DFG: {dfg}')
 
-def encoding_clone_entities(encode_path: str, functionality_dict: dict) -> None:
-    """Encode functionality for code clone detection.
+def encoding_clone_entities(encode_path: str, functionality_dict: dict, entity_id: list = None) -> None:
+    """Encode functionality for code clone detection, entity ids are loaded from entity2id.txt if None.
     """
-    entity_id = load_entity_id(encode_path)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
     clone_name = 'code_clone.txt'
     clone_name = os.path.join(encode_path, clone_name)
     with open(clone_name, 'w') as cf:
@@ -509,21 +555,23 @@ def encoding_clone_entities(encode_path: str, functionality_dict: dict) -> None:
             f_id = (int(key) - 1) // 500 + 1
             entities = list()
             for entity in value:
-                if entity not in entity_id:
+                _entity_id = find_entity_id(entity_id, entity)
+                if _entity_id == None:
                     logger.error('Cannot find functionality entity id')
                     exit(-1)
-                entities.append(entity_id[entity])
+                entities.append(_entity_id)
             _es = ','.join(entities)
             line = str(f_id) + ',' + _es + '\n'
             cf.write(line)
     
     logger.info('Encode clone functionalities: {}' .format(len(functionality_dict)))
 
-def encoding_bcb_clone(encode_path: str, file_dict: dict) -> None:
-    """Encode bcb functions
+def encoding_bcb_clone(encode_path: str, file_dict: dict, entity_id: list = None) -> None:
+    """Encode bcb functions, entity ids are loaded from entity2id.txt if None.
     """
 
-    entity_id = load_entity_id(encode_path)
+    if entity_id == None:
+        entity_id = load_entity_id(encode_path)
     clone_name = 'bcb_clone.txt'
     clone_name = os.path.join(encode_path, clone_name)
 
@@ -534,10 +582,11 @@ def encoding_bcb_clone(encode_path: str, file_dict: dict) -> None:
             f_id = key
             entities = list()
             for entity in value:
-                if entity not in entity_id:
+                _entity_id = find_entity_id(entity_id, entity)
+                if _entity_id == None:
                     logger.error(f'Cannot find entity {entity}')
                     exit()
-                entities.append(entity_id[entity])
+                entities.append(_entity_id)
             _es = ','.join(entities)
             line = str(f_id) + ',' + _es + '\n'
             cf.write(line)
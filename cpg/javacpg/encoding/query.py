@@ -1,14 +1,17 @@
 """Given an instance of Code Property Graph and provide some query apis.
 """
-from networkx import DiGraph
-from utils.data_structure import Queue
+from array import array
+from collections import deque
+from utils.compact_cpg import AST_EDGE, CPGraph
+from utils.traversal import entity_successors
 from utils.setting import logger
 
-def entity_query(ast_cpg: DiGraph = None) -> list:
-    """Query entity from ast_cpg. Entity is a tuple (hashkey, identifier, token). If identifier or token are empty, it will be None.
+def entity_query(ast_cpg: CPGraph = None, node_base: int = 0) -> list:
+    """Query entity from ast_cpg. Entity is a tuple (node id, identifier, token, match_statement). If identifier or token are empty, it will be None.
 
     attributes:
         ast_cpg -- an instance of Code Property Graph.
+        node_base -- offset turning local node ids of ast_cpg into global node ids.
     
     returns:
         entities -- list of entities.
@@ -20,17 +23,17 @@ def entity_query(ast_cpg: DiGraph = None) -> list:
     entities = list()
     ast_nodes = list(ast_cpg.nodes)
     for node in ast_nodes:
-        cpg_node = ast_cpg.nodes[node]['cpg_node']
-        entity = (cpg_node.node_key, cpg_node.node_type, cpg_node.node_token, cpg_node.match_statement)
+        entity = (node_base + node, ast_cpg.node_type(node), ast_cpg.node_token(node), ast_cpg.is_statement(node))
         entities.append(entity)
     
     return entities
 
-def edge_query(ast_cpg: DiGraph = None) -> list:
-    """Given a cpg instance, query all its edges. Edge is a tuple (head, tail, edge_type) (234, 432, 100).
+def edge_query(ast_cpg: CPGraph = None, node_base: int = 0) -> list:
+    """Given a cpg instance, query all its edges. Edge is a tuple (head, tail, edge_type) (234, 432, 4), edge_type is the bitmask of edge kinds.
 
     attributes:
         ast_cpg -- an instance of Code Property Graph.
+        node_base -- offset turning local node ids of ast_cpg into global node ids.
     
     returns:
         edges -- list of edge.
@@ -40,16 +43,15 @@ def edge_query(ast_cpg: DiGraph = None) -> list:
         return False
     
     edges = list()
-    ast_edges = list(ast_cpg.edges)
+    ast_edges = list(ast_cpg.edge_items())
     for _e in ast_edges:
-        start, end = _e
-        edge_type = ast_cpg[start][end]['edge_type']
-        edge = (start, end, edge_type)
+        start, end, edge_type = _e
+        edge = (node_base + start, node_base + end, edge_type)
         edges.append(edge)
     
     return edges
 
-def statentity_query(ast_cpg: DiGraph = None) -> list:
+def statentity_query(ast_cpg: CPGraph = None) -> list:
     """Query statement node from ast_cpg.
 
     attributes:
@@ -72,7 +74,7 @@ def statentity_query(ast_cpg: DiGraph = None) -> list:
     
     return stats
 
-def statnodes_query(ast_cpg: DiGraph = None, node: str = None) -> list:
+def statnodes_query(ast_cpg: CPGraph = None, node: str = None) -> list:
     """Given a cpg instance, query statement nodes.
 
     attributes:
@@ -80,39 +82,48 @@ def statnodes_query(ast_cpg: DiGraph = None, node: str = None) -> list:
         node -- the identifier of statement node.
     
     returns:
-        child_entities -- the ast node children (hashkey).
+        child_entities -- the ast node children (local node ids).
     """
     child_entities = list()
 
-    queue = Queue()
-    queue.push(node)
+    queue = deque([node])
 
-    while not queue.is_empty():
-        current_node = queue.pop()
-        node_successors = list(ast_cpg.successors(current_node))
-        for _successor in node_successors:
-            if not ast_cpg.nodes[_successor]['cpg_node'].match_statement:
-                child_entities.append(_successor)
-                queue.push(_successor)
+    while queue:
+        current_node = queue.popleft()
+        for _successor in entity_successors(ast_cpg, current_node):
+            child_entities.append(_successor)
+            queue.append(_successor)
     
     return child_entities
 
-def stat_entities(ast_cpg: DiGraph = None) -> list:
-    """Find statement's entities.
+def stat_entities(ast_cpg: CPGraph = None, node_base: int = 0):
+    """Find statement's entities in one pass over the nodes, every non-statement node belongs to its nearest statement ancestor.
+
+    Node ids follow AST level order, so parents are visited before their children and each row lists its entities in level order.
 
     attributes:
         ast_cpg -- an instance of Code Property Graph.
+        node_base -- offset turning local node ids of ast_cpg into global node ids.
     
     returns:
-        s_es -- list of statement and its entities.
+        s_es -- generator of [statement, statement, entities...] rows, statements in node order.
     """
-    s_es = list()
-
-    stats = statentity_query(ast_cpg)
-
-    for stat in stats:
-        child_entities = statnodes_query(ast_cpg, stat)
-        s_e = [stat, stat] + child_entities
-        s_es.append(s_e)
-    
-    return s_es
+    stat_flags = ast_cpg.stat_flags
+    # enclosing statement of each node, -1 outside of statements
+    owner = array('i', [-1]) * ast_cpg.number_of_nodes()
+    rows = dict()
+
+    for node in ast_cpg.nodes:
+        if stat_flags[node]:
+            owner[node] = node
+            rows[node] = [node_base + node, node_base + node]
+        elif owner[node] >= 0:
+            rows[owner[node]].append(node_base + node)
+        if owner[node] < 0:
+            continue
+        for _child, _edge_type in ast_cpg.successor_items(node):
+            if _edge_type & AST_EDGE and not stat_flags[_child]:
+                owner[_child] = owner[node]
+
+    for _, s_e in rows.items():
+        yield s_e
@@ -1,14 +1,15 @@
 import uuid
 import tree_sitter
 
-from treelib import Tree
 from utils.data_structure import Queue
+from utils.compact_sast import CompactSAST, SASTBuilder
 from utils.setting import logger
 from javacpg.sast.ast_node import ASTNode
-from javacpg.sast.query_pattern import JAVA_QUERY
+from javacpg.sast.parser_session import get_session
 
 def generate_ast_key(file_name: str, func_name: str, parsed_node: tree_sitter.Node) -> str:
-    """ Generate unique key value for each ASTNode
+    """Generate stable hash key for a tree-sitter node, ASTNodes use integer ids and
+    this key is only needed to match nodes across runs (see CompactSAST.stable_key).
 
     attributes:
         file_name -- name of the file including current node\\
@@ -24,64 +25,61 @@ def generate_ast_key(file_name: str, func_name: str, parsed_node: tree_sitter.No
 
     return key_value
 
-def build_func_sast(file_name: str, func_name: str, func_tree : tree_sitter.Node, src_code : bytes, exclude_type: list) -> Tree:
+def build_func_sast(file_name: str, func_name: str, func_tree : tree_sitter.Node, src_code : bytes, exclude_type: list, ret_node: tree_sitter.Node = None) -> CompactSAST:
     """Build simplified AST (sast) with function as the basic unit
 
     attributes:
         file_name -- name of the file including current function\\
         func_tree -- function ast generated by tree-sitter\\
         src_code -- serial source code for token querying\\
-        exclude_type -- identifier types ignored
+        exclude_type -- identifier types ignored\\
+        ret_node -- return type node of the function, queried with the session of current process if None
     
     returns:
-        s_ast -- simplified ast organized by ASTNode
+        s_ast -- simplified ast stored in a CompactSAST
     """
-    s_ast = Tree()
+    builder = SASTBuilder(ASTNode, file_name, func_name)
     
     # create root node for this function
     root_node = func_tree
-    root_key = generate_ast_key(file_name, func_name, root_node)
     has_child = len(root_node.children)
     if not has_child:
         root_token = src_code[root_node.start_byte:root_node.end_byte]
     else:
         root_token = ''
-    root_ast = ASTNode(root_key, root_node.type, root_token, root_node.start_byte, root_node.end_byte)
-    s_ast.create_node(tag=root_node.type, identifier=root_key, data=root_ast)
+    root_idx = builder.add_node(root_node.type, root_token, root_node.start_byte, root_node.end_byte)
 
-    query = JAVA_QUERY()
-    ret_node = query.method_ret_query().captures(root_node)[0][0]
+    if ret_node == None:
+        ret_node = get_session().method_ret_query.captures(root_node)[0][0]
     
     # create ret node for each ast
-    ret_key = generate_ast_key(file_name, func_name, ret_node)
     ret_token = src_code[ret_node.start_byte:ret_node.end_byte].decode('utf8')
-    ret_astnode = ASTNode(ret_key, 'ret_type', ret_token, ret_node.start_byte, ret_node.end_byte)
+    ret_idx = None
 
     queue = Queue()
-    queue.push(root_node)
+    queue.push([root_node, root_idx])
     while not queue.is_empty():
-        current_node = queue.pop()
+        current_node, current_idx = queue.pop()
 
         for child in current_node.children:
             child_type = str(child.type)
             if child_type in exclude_type:
                 logger.debug('Ignore node type {}' .format(child_type))
                 continue
-            child_key = generate_ast_key(file_name, func_name, child)
             child_token = ''
             has_child = len(child.children) > 0
             if not has_child:
                 child_token = src_code[child.start_byte:child.end_byte].decode('utf8')
-            parent_identifier = generate_ast_key(file_name, func_name, current_node)
-            s_ast.create_node(tag=child_type, identifier=child_key, parent=parent_identifier, data=ASTNode(child_key, child_type, child_token, child.start_byte, child.end_byte))
+            child_idx = builder.add_node(child_type, child_token, child.start_byte, child.end_byte, current_idx)
+            if child_type == ret_node.type and child.start_byte == ret_node.start_byte and child.end_byte == ret_node.end_byte:
+                ret_idx = child_idx
 
-            queue.push(child)
-    if s_ast.get_node(ret_key) == None:
+            queue.push([child, child_idx])
+    if ret_idx == None:
         logger.debug('Creating return astnode fails. Exit.')
         exit(-1)
     
     # remove return parameter node, and place it as return node.
-    s_ast.remove_node(ret_key)
-    s_ast.create_node(tag=ret_node.type, identifier=ret_key, parent=root_key, data=ret_astnode)
+    builder.move_to_root(ret_idx, 'ret_type', ret_token)
 
-    return s_ast
+    return builder.build()
@@ -1,7 +1,7 @@
 import uuid
 
-from treelib import Tree
-from utils.data_structure import Edge, Queue, Stack
+from utils.compact_sast import CompactSAST
+from utils.data_structure import Edge, Queue
 from utils.setting import logger
 
 
@@ -15,11 +15,14 @@ class FunUnit():
         parameter_type -- parameter type of current function\\
         parameter_name -- parameter name of current function \\
         import_header -- header used by this function\\
-        field_params -- class field parameters for data dependency graph
+        field_params -- class field parameters for data dependency graph\
+        summary -- FuncSummary (type histogram, typetoken sequence, size, depth) computed when the sast is built\
+        file_path -- path of the file including current function, '' for FunUnits pickled before it was recorded
         
     """
+    file_path = ''
     
-    def __init__(self, sast: Tree, file_name: str = None, func_name: str = None, parameter_type: list = [], parameter_name: list = [], import_header: list = [], field_params: list = []) -> None:
+    def __init__(self, sast: CompactSAST, file_name: str = None, func_name: str = None, parameter_type: list = [], parameter_name: list = [], import_header: list = [], field_params: list = [], file_path: str = '') -> None:
         """ Constructor of FunUnit class
         """
         if file_name == None or func_name == None:
@@ -32,6 +35,8 @@ class FunUnit():
         self.parameter_name = parameter_name
         self.import_header = import_header
         self.field_params = field_params
+        self.file_path = file_path
+        self.summary = sast.summary
     
     def format_sast(self) -> list:
         """Transform tree structure (Multi-way Tree) to graph structure (G=(V, E))
@@ -46,7 +51,7 @@ class FunUnit():
         edges = list()
         root = self.sast.root
 
-        nodes[root] = self.sast.get_node(root).data
+        nodes[root] = self.sast.node_data(root)
 
         queue = Queue()
         queue.push(root)
@@ -54,12 +59,10 @@ class FunUnit():
         while not queue.is_empty():
             current_node = queue.pop()
 
-            for child in self.sast.children(current_node):
-                child_identifier = child.identifier
-                child_data = child.data
-                nodes[child_identifier] = child_data
-                edges.append(Edge(current_node, child_identifier, 'ast'))
-                queue.push(child_identifier)
+            for child in self.sast.child_indices(current_node):
+                nodes[child] = self.sast.node_data(child)
+                edges.append(Edge(current_node, child, 'ast'))
+                queue.push(child)
         
         return [nodes, edges]
     
@@ -79,55 +82,19 @@ class FunUnit():
         return func_key
 
     def gen_typetoken_sequence(self) -> list:
-        """Depth-first search for generating type sequence.
+        """Depth-first type/token sequence, collected when the sast is built.
         """
-        sequence = list()
-        root = self.sast.root
-
-        stack = Stack()
-        stack.push(root)
-
-        while not stack.is_empty():
-            current_node = stack.pop()
-            _node_data = self.sast.get_node(current_node).data
-            current_node_type = _node_data.node_type
-            current_node_token = _node_data.node_token
-            sequence.append(current_node_type)
-            if current_node_token:
-                sequence.append(current_node_token)
-            children = self.sast.children(current_node)
-            children.reverse()
-            for child in children:
-                stack.push(child.identifier)
-        
-        return sequence
+        return self.summary.typetoken_seq
     
     def gen_type_sequence(self) -> list:
-        """Depth-first search for generating type sequence.
+        """Depth-first type sequence.
         """
-        sequence = list()
-        root = self.sast.root
-
-        stack = Stack()
-        stack.push(root)
-
-        while not stack.is_empty():
-            current_node = stack.pop()
-            _node_data = self.sast.get_node(current_node).data
-            current_node_type = _node_data.node_type
-            sequence.append(current_node_type)
-            children = self.sast.children(current_node)
-            children.reverse()
-            for child in children:
-                stack.push(child.identifier)
-        
-        return sequence
+        return [self.sast.node_type(x) for x in self.summary.preorder]
 
     def has_type(self, type: str) -> bool:
         """Determine whether the sast contains specifc type.
         """
-        type_sequence = self.gen_type_sequence()
-        if type in type_sequence:
+        if type in self.summary.type_hist:
             return True
         
         return False
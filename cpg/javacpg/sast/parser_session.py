@@ -0,0 +1,59 @@
+from bisect import bisect_left
+import tree_sitter
+from javacpg.sast.ast_parser import ASTParser
+from javacpg.sast.query_pattern import JAVA_QUERY
+
+class ParserSession():
+    """Java parser and compiled queries shared by all files parsed in one process.
+
+    attributes:
+        lib_path -- file path of `my-language.so`, the default library is used if None.
+    """
+    def __init__(self, lib_path: str = None) -> None:
+        self.parser = ASTParser('java', lib_path)
+        self.query = JAVA_QUERY(lib_path)
+        self.file_query = self.query.file_query()
+        self.method_ret_query = self.query.method_ret_query()
+    
+    def parse(self, src_code: bytes = None, old_tree: tree_sitter.Tree = None) -> tree_sitter.Tree:
+        return self.parser.parse(src_code, old_tree)
+    
+    def query_file(self, root_node: tree_sitter.Node) -> dict:
+        """Collect import headers, class fields and methods of one file with a single query pass.
+
+        attributes:
+            root_node -- root node of the file ast.
+        
+        returns:
+            results -- {'import_header': [nodes], 'class_field': [nodes], 'methods': [method]}, each method is a dict
+                       with 'node', 'name', 'params' (fused (node, 'type'/'name') captures) and 'ret_type'.
+        """
+        captures = {'import_header': [], 'class_field': [], 'method': [], 'method_name': [], 'param': [], 'ret_type': []}
+        for node, name in self.file_query.captures(root_node):
+            if name in ['type', 'name']:
+                captures['param'].append((node, name))
+            else:
+                captures[name].append(node)
+        
+        # captures are in document order, nodes inside a method are located by byte range
+        name_start = [x.start_byte for x in captures['method_name']]
+        param_start = [x[0].start_byte for x in captures['param']]
+        ret_start = [x.start_byte for x in captures['ret_type']]
+        methods = list()
+        for method in captures['method']:
+            name_idx = bisect_left(name_start, method.start_byte)
+            ret_idx = bisect_left(ret_start, method.start_byte)
+            params = captures['param'][bisect_left(param_start, method.start_byte):bisect_left(param_start, method.end_byte)]
+            methods.append({'node': method, 'name': captures['method_name'][name_idx], 'params': params, 'ret_type': captures['ret_type'][ret_idx]})
+        
+        return {'import_header': captures['import_header'], 'class_field': captures['class_field'], 'methods': methods}
+
+# sessions created in current process, keyed by library path
+sessions = dict()
+
+def get_session(lib_path: str = None) -> ParserSession:
+    """Return the parser session of current process, grammar and queries are compiled on first use.
+    """
+    if lib_path not in sessions:
+        sessions[lib_path] = ParserSession(lib_path)
+    return sessions[lib_path]
@@ -90,4 +90,33 @@ class JAVA_QUERY():
             (variable_declarator
                 (identifier) @class_field))
         """)
-        return query
\ No newline at end of file
+        return query
+
+    def file_query(self):
+        """Combined pattern matching import headers, class fields and methods
+        (name, parameters, return type) of one file in a single pass
+        """
+        query = self.JV_LANGUAGE.query("""
+        ((import_declaration) @import_header)
+        (field_declaration
+            (variable_declarator
+                (identifier) @class_field))
+        (class_declaration
+            body: (class_body
+                    (method_declaration) @method))
+        (interface_declaration
+            body: (interface_body
+                    (method_declaration) @method))
+        (method_declaration
+        name: (identifier) @method_name)
+        (method_declaration
+        parameters: (
+            formal_parameters
+            (formal_parameter 
+            type: * @type
+            name: * @name)))
+        (method_declaration
+        type: * @ret_type)
+        """)
+
+        return query
@@ -1,9 +1,9 @@
 from utils.data_structure import Stack
+from utils.profiler import profile_phase
 from utils.setting import logger
 from javacpg.sast.ast_builder import build_func_sast
-from javacpg.sast.ast_parser import ASTParser
 from javacpg.sast.fun_unit import FunUnit
-from javacpg.sast.query_pattern import JAVA_QUERY
+from javacpg.sast.parser_session import ParserSession, get_session
 
 exclude_type = [",","{",";","}",")","(",'"',"'","`",""," ","[]","[","]",":",".","''","'.'","b", "\\", "'['", "']","''", "comment", "@", "?"]
 
@@ -57,20 +57,46 @@ def align_query_result(query_result: list, meta1: str, meta2: str) -> list:
 
     return [_meta1, _meta2]
 
-def java_parser(file_path: str) -> list:
+def java_parser(file_path: str, session: ParserSession = None, src_code: bytes = None) -> list:
     """ Parse Java source code file & extract function unit
 
     attributes:
         file_path -- the path of Java source file.
+        session -- parser session holding the compiled queries, the session of current process is used if None.
+        src_code -- content of the file, read from file_path if None (e.g., archive members are parsed from memory).
+    
+    returns:
+        func_list -- list including all function in current file.
+    """
+    if session == None:
+        session = get_session()
+    serial_code = src_code
+    if serial_code == None:
+        with open(file_path, 'rb') as f:
+            serial_code = f.read()
+    with profile_phase('parse', file_path):
+        code_ast = session.parse(serial_code)
+
+    return java_tree_funcs(file_path, serial_code, code_ast, session)
+
+def java_tree_funcs(file_path: str, serial_code: bytes, code_ast, session: ParserSession = None, reuse: dict = None, func_codes: list = None) -> list:
+    """Extract function units from a parsed Java file.
+
+    attributes:
+        file_path -- the path of Java source file.
+        serial_code -- content of the file.
+        code_ast -- tree_sitter Tree of serial_code.
+        session -- parser session holding the compiled queries, the session of current process is used if None.
+        reuse -- dict, method source bytes -> list of FunUnits built before, a method whose source, import headers
+                 and class fields are unchanged takes the old FunUnit (its byte offsets are not updated) instead of rebuilding.
+        func_codes -- if given, the source bytes of each returned function are appended to it.
     
     returns:
         func_list -- list including all function in current file.
     """
     func_list = []
-    parser = ASTParser('java')
-    with open(file_path, 'rb') as f:
-        serial_code = f.read()
-        code_ast = parser.parse(serial_code)
+    if session == None:
+        session = get_session()
     
     root_node = code_ast.root_node
 
@@ -79,29 +105,33 @@ def java_parser(file_path: str) -> list:
     # obtain file name
     file_name = extract_filename(file_path)
 
-    query = JAVA_QUERY()
-    # query import headers (e.g., import java.util.Scanner)
-    import_header = query.import_header_query().captures(root_node)
-    import_header = [serial_code[x[0].start_byte:x[0].end_byte-1].decode('utf8') for x in import_header]
-
-    # query field parameters (e.g., class variables)
-    field_params = query.class_filed_query().captures(root_node)
-    field_params = [serial_code[x[0].start_byte:x[0].end_byte].decode('utf8') for x in field_params]
-
-    # query methods
-    _methods = query.class_method_query().captures(root_node)
-    
-    for _method in _methods:
-        _m_name_tmp = query.method_declaration_query().captures(_method[0])
-        _m_name = serial_code[_m_name_tmp[0][0].start_byte:_m_name_tmp[0][0].end_byte].decode('utf8')
-        _m_param_tmp = query.method_parameters_query().captures(_method[0])
-        _m_param_type, _m_param_name = align_query_result(_m_param_tmp, 'type', 'name')
+    # query import headers, field parameters and methods in one pass
+    with profile_phase('query', file_path):
+        file_query = session.query_file(root_node)
+
+    # import headers (e.g., import java.util.Scanner)
+    import_header = [serial_code[x.start_byte:x.end_byte-1].decode('utf8') for x in file_query['import_header']]
+
+    # field parameters (e.g., class variables)
+    field_params = [serial_code[x.start_byte:x.end_byte].decode('utf8') for x in file_query['class_field']]
+
+    for _method in file_query['methods']:
+        _m_code = serial_code[_method['node'].start_byte:_method['node'].end_byte]
+        if func_codes != None:
+            func_codes.append(_m_code)
+        if reuse != None:
+            _olds = reuse.get(_m_code, [])
+            if _olds and _olds[0].import_header == import_header and _olds[0].field_params == field_params:
+                func_list.append(_olds.pop(0))
+                continue
+        _m_name = serial_code[_method['name'].start_byte:_method['name'].end_byte].decode('utf8')
+        _m_param_type, _m_param_name = align_query_result(_method['params'], 'type', 'name')
         _m_param_type = [serial_code[x.start_byte:x.end_byte].decode('utf8') for x in _m_param_type]
         _m_param_name = [serial_code[x.start_byte:x.end_byte].decode('utf8') for x in _m_param_name]
-        sast = build_func_sast(file_name, _m_name, _method[0], serial_code, exclude_type)
+        with profile_phase('sast', file_path, _m_name, _m_param_type):
+            sast = build_func_sast(file_name, _m_name, _method['node'], serial_code, exclude_type, _method['ret_type'])
 
-        cur_func = FunUnit(sast, file_name, _m_name, _m_param_type, _m_param_name, import_header, field_params)
+        cur_func = FunUnit(sast, file_name, _m_name, _m_param_type, _m_param_name, import_header, field_params, file_path)
         func_list.append(cur_func)
     
     return func_list
-
@@ -1,6 +1,6 @@
 # Provide some functions to calculate statistics of cpg.
 import numpy as np
-from networkx import DiGraph
+from utils.compact_cpg import AST_EDGE, CFG_EDGE, DDG_EDGE, CPGraph
 from utils.setting import logger
 
 def print_cpg_statistics(cpg_dict: dict) -> None:
@@ -31,6 +31,28 @@ def print_cpg_statistics(cpg_dict: dict) -> None:
     logger.info(f'Avg number of edges: {sum(edges) / len(edges)}')
     logger.info(f'Median number of edges: {np.median(edges)}')
 
+def print_func_statistics(func_list: list) -> None:
+    """Print sast statistics of functions from their summaries.
+    :param func_list: function list.
+    """
+    if len(func_list) == 0:
+        return
+    nodes = [func.summary.node_num for func in func_list]
+    depths = [func.summary.depth for func in func_list]
+    type_hist = dict()
+    for func in func_list:
+        for node_type, num in func.summary.type_hist.items():
+            type_hist[node_type] = type_hist.get(node_type, 0) + num
+
+    logger.info('Statistics of sast:')
+    logger.info(f'Number of functions: {len(func_list)}')
+    logger.info(f'Max number of sast nodes: {max(nodes)}')
+    logger.info(f'Avg number of sast nodes: {sum(nodes) / len(nodes)}')
+    logger.info(f'Median number of sast nodes: {np.median(nodes)}')
+    logger.info(f'Max sast depth: {max(depths)}')
+    logger.info(f'Avg sast depth: {sum(depths) / len(depths)}')
+    logger.info(f'Number of node types: {len(type_hist)}')
+
 def cpg_statistics(cpg_dict: dict) -> dict:
     """Calculate statistics of cpg.
     :param cpg_dict: cpg dict.
@@ -56,7 +78,7 @@ def cpg_statistics(cpg_dict: dict) -> dict:
     
     return statistics
 
-def calculate_function_nodes(cpg: DiGraph) -> int:
+def calculate_function_nodes(cpg: CPGraph) -> int:
     """Calculate number of nodes in a function.
     :param cpg: cpg.
     :return: number of nodes in a function.
@@ -65,43 +87,29 @@ def calculate_function_nodes(cpg: DiGraph) -> int:
 
     return len(nodes)
 
-def calculate_function_edges(cpg: DiGraph) -> dict:
+def calculate_function_edges(cpg: CPGraph) -> dict:
     """Calculate number of edges in a function.
     :param cpg: cpg.
     :return: number of edges in a function.
     {'ast': num_of_ast_edges, 'cfg': num_of_cfg_edges, 'dfg': num_of_dfg_edges, 'cg': num_of_cg_edges}
     """
-    cpg_edges = list(cpg.edges)
+    cpg_edges = list(cpg.edge_items())
 
     num_of_ast_edges = 0
     num_of_cfg_edges = 0
     num_of_dfg_edges = 0
 
     for _e in cpg_edges:
-        start, end = _e
-        edge_type = cpg[start][end]['edge_type']
-        if edge_type == '100':
-            num_of_ast_edges += 1
-        elif edge_type == '010':
-            num_of_cfg_edges += 1
-        elif edge_type == '001':
-            num_of_dfg_edges += 1
-        elif edge_type == '110':
-            num_of_ast_edges += 1
-            num_of_cfg_edges += 1
-        elif edge_type == '101':
-            num_of_ast_edges += 1
-            num_of_dfg_edges += 1
-        elif edge_type == '011':
-            num_of_cfg_edges += 1
-            num_of_dfg_edges += 1
-        elif edge_type == '111':
+        start, end, edge_type = _e
+        if edge_type <= 0 or edge_type > AST_EDGE | CFG_EDGE | DDG_EDGE:
+            print(f'{start} {end} {edge_type}: cannot be handled.')
+            exit(-1)
+        if edge_type & AST_EDGE:
             num_of_ast_edges += 1
+        if edge_type & CFG_EDGE:
             num_of_cfg_edges += 1
+        if edge_type & DDG_EDGE:
             num_of_dfg_edges += 1
-        else:
-            print(f'{start} {end} {edge_type}: cannot be handled.')
-            exit(-1)
     
     return {'ast': num_of_ast_edges, 'cfg': num_of_cfg_edges, 'dfg': num_of_dfg_edges}
 
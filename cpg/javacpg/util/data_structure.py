@@ -1,3 +1,5 @@
+from utils.pickling import Slotted
+
 class Stack():
     """Construct the stack structure using list
     """
@@ -33,9 +35,10 @@ class Queue():
         
         return self.__list.pop(0)
 
-class Edge():
+class Edge(Slotted):
     """Edge between two connected ASTNodes
     """
+    __slots__ = ['start', 'end', 'etype']
     def __init__(self, start: str, end: str, etype: str) -> None:
         self.start = start
         self.end = end
@@ -1,6 +1,6 @@
 import os
 from graphviz import Digraph
-from networkx import DiGraph as nxDiGraph
+from utils.compact_cpg import CPGraph, edge_str
 
 def gen_dot_graph(node_dict: dict = {}, edge_list: list = [], dot_name: str = None) -> bool:
     """ Generate dot graph according to Nodes and Edges
@@ -35,11 +35,11 @@ def gen_dot_graph(node_dict: dict = {}, edge_list: list = [], dot_name: str = No
     os.system(command)
     return True
 
-def visualize_ast_cpg(ast_cpg: nxDiGraph = None, dot_name: str = None, ast_display: bool = True) -> bool:
+def visualize_ast_cpg(ast_cpg: CPGraph = None, dot_name: str = None, ast_display: bool = True) -> bool:
     """Visualize ast cpg.
 
     attributes:
-        ast_cpg -- a nx.DiGraph instance.
+        ast_cpg -- a CPGraph instance.
         dot_name -- the name of dot file.
     
     returns:
@@ -66,7 +66,7 @@ def visualize_ast_cpg(ast_cpg: nxDiGraph = None, dot_name: str = None, ast_displ
                 dot.node(name = str(node), label=label)
     
     for edge in edges:
-        edge_type = ast_cpg[edge[0]][edge[1]]['edge_type']
+        edge_type = edge_str(ast_cpg[edge[0]][edge[1]]['edge_type'])
         if edge_type == '100':
             edge_type = None
         if ast_display:
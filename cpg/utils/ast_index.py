@@ -0,0 +1,118 @@
+"""Structural index over the AST edges of one function, shared by the cfg constructors of the c and java pipelines.
+
+Parent pointers and the label map are collected in one pass when the index is built,
+the nearest enclosing statement and the next statement sibling are computed for all nodes at the first
+query of a type list and then answered by lookup.
+
+Answers follow AST edges only. The cfg edges added while the function is built are not walked, so the target of
+a break, continue or goto does not depend on the statements whose cfg was built before it.
+"""
+from array import array
+from utils.compact_cpg import AST_EDGE, CPGraph
+
+class ASTIndex():
+    """AST structure of one function, node ids follow level order so parents precede their children.
+
+    attributes:
+        cpg -- code property graph of the function, only its AST edges are read.
+        stat_types -- bytearray, 1 for nodes whose type is a statement type, climbing to enclosing statements stops at other nodes.
+        root -- the function node.
+        parent -- array, AST parent of each node, -1 for the root.
+        children -- list, AST children of each node.
+        labels -- dict, label token -> labeled_statement node (the first one in level order).
+        enclosing_cache, sibling_cache -- dict, type list -> array answering enclosing() / next_statement() per node.
+    """
+    def __init__(self, cpg: CPGraph, statement_types: list, root: int = 0) -> None:
+        self.cpg = cpg
+        self.root = root
+        node_num = cpg.number_of_nodes()
+        self.stat_types = self.type_flags(statement_types)
+        self.parent = array('i', [-1]) * node_num
+        self.children = [[_child for _child, _edge_type in cpg.successor_items(node) if _edge_type & AST_EDGE] for node in range(node_num)]
+        self.labels = dict()
+        label_flags = self.type_flags(['labeled_statement'])
+        for node in range(node_num):
+            for _child in self.children[node]:
+                self.parent[_child] = node
+            if label_flags[node] and len(self.children[node]) > 0:
+                label = cpg.node_token(self.children[node][0])
+                if label not in self.labels:
+                    self.labels[label] = node
+        self.enclosing_cache = dict()
+        self.sibling_cache = dict()
+
+    def type_flags(self, node_types: list) -> bytearray:
+        """1 for each node whose type is in node_types, resolved once per type id.
+        """
+        type_ids = self.cpg.type_ids
+        matched = bytearray(len(self.cpg.type_table))
+        for _type_id, _type in enumerate(self.cpg.type_table):
+            if _type in node_types:
+                matched[_type_id] = 1
+        return bytearray([matched[_type_id] for _type_id in type_ids])
+
+    def enclosing(self, node: int, node_types: list) -> int:
+        """Nearest ancestor of node whose type is in node_types, climbing through statements only.
+
+        returns:
+            ancestor -- node identifier, False if a non-statement ancestor or the root is reached first.
+        """
+        key = frozenset(node_types)
+        if key not in self.enclosing_cache:
+            nearest = array('i', [-1]) * len(self.parent)
+            matched = self.type_flags(key)
+            for _node in range(len(self.parent)):
+                _parent = self.parent[_node]
+                if _parent < 0 or not self.stat_types[_parent]:
+                    continue
+                if matched[_parent]:
+                    nearest[_node] = _parent
+                else:
+                    nearest[_node] = nearest[_parent]
+            self.enclosing_cache[key] = nearest
+
+        ancestor = self.enclosing_cache[key][node]
+        if ancestor < 0:
+            return False
+        return ancestor
+
+    def next_statement(self, node: int, loop_types: list) -> int:
+        """Statement executed after node falls through: its next statement sibling, otherwise the enclosing loop
+        if the parent is one of loop_types, otherwise the next statement of the parent.
+
+        returns:
+            next_node -- node identifier, False if the root is reached.
+        """
+        key = frozenset(loop_types)
+        if key not in self.sibling_cache:
+            following = array('i', [-1]) * len(self.parent)
+            for _node in range(len(self.parent)):
+                # first statement among the later siblings, scanning the children backwards
+                next_stat = -1
+                for _child in reversed(self.children[_node]):
+                    following[_child] = next_stat
+                    if self.stat_types[_child]:
+                        next_stat = _child
+            next_nodes = array('i', [-1]) * len(self.parent)
+            matched = self.type_flags(key)
+            for _node in range(len(self.parent)):
+                _parent = self.parent[_node]
+                if _parent < 0:
+                    continue
+                if following[_node] >= 0:
+                    next_nodes[_node] = following[_node]
+                elif matched[_parent]:
+                    next_nodes[_node] = _parent
+                else:
+                    next_nodes[_node] = next_nodes[_parent]
+            self.sibling_cache[key] = next_nodes
+
+        next_node = self.sibling_cache[key][node]
+        if next_node < 0:
+            return False
+        return next_node
+
+    def labeled_statement(self, label: str) -> int:
+        """labeled_statement carrying label, False if the function has none.
+        """
+        return self.labels.get(label, False)
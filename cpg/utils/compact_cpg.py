@@ -0,0 +1,301 @@
+"""Array-backed code property graph shared by the c and java pipelines.
+
+A CPGraph keeps the node arrays of the CompactSAST of its function and one bitmask per edge
+(AST_EDGE | CFG_EDGE | DDG_EDGE).
+While cfg and ddg edges are added, adjacency is kept in one dict per node, freeze() packs it
+into CSR arrays once the graph is complete. The networkx DiGraph calls used by the constructors
+(nodes[n]['cpg_node'], successors, predecessors, has_edge, add_edge, edges, graph[u][v]['edge_type'])
+are provided on top.
+"""
+from array import array
+from utils.compact_sast import CompactSAST
+
+# edge kinds are bits of the edge type, an edge of several kinds ORs them (e.g., AST_EDGE | CFG_EDGE == 6)
+AST_EDGE = 4
+CFG_EDGE = 2
+DDG_EDGE = 1
+
+def edge_str(edge_type: int) -> str:
+    """Binary label of an edge type, e.g., '110' for AST_EDGE | CFG_EDGE.
+    """
+    return format(edge_type, '03b')
+
+class CPGNodeView():
+    """CPGNode fields of one node of a CPGraph, graph.nodes[n]['cpg_node'] returns the view itself.
+    """
+    __slots__ = ['graph', 'node_key']
+
+    def __init__(self, graph, node_key: int) -> None:
+        self.graph = graph
+        self.node_key = node_key
+
+    def __getitem__(self, key: str):
+        if key != 'cpg_node':
+            raise KeyError(key)
+        return self
+
+    @property
+    def node_type(self) -> str:
+        return self.graph.type_table[self.graph.type_ids[self.node_key]]
+
+    @property
+    def node_token(self) -> str:
+        return self.graph.token_table[self.graph.token_ids[self.node_key]]
+
+    @property
+    def start_idx(self) -> int:
+        return self.graph.start_idx[self.node_key]
+
+    @property
+    def end_idx(self) -> int:
+        return self.graph.end_idx[self.node_key]
+
+    @property
+    def match_statement(self) -> bool:
+        return self.graph.stat_flags[self.node_key] == 1
+
+    def is_statement_node(self) -> bool:
+        return self.match_statement
+
+    def set_statement_node(self) -> bool:
+        self.graph.set_statement(self.node_key)
+        return True
+
+    def get_cpg_key(self) -> int:
+        return self.node_key
+
+    def get_cpg_type(self) -> str:
+        return self.node_type
+
+    def get_cpg_token(self) -> str:
+        return self.node_token
+
+class NodeTable():
+    """graph.nodes, iterates node ids and maps them to CPGNodeViews.
+    """
+    __slots__ = ['graph']
+
+    def __init__(self, graph) -> None:
+        self.graph = graph
+
+    def __getitem__(self, node: int) -> CPGNodeView:
+        if node < 0 or node >= len(self.graph.type_ids):
+            raise KeyError(node)
+        return CPGNodeView(self.graph, node)
+
+    def __iter__(self):
+        return iter(range(len(self.graph.type_ids)))
+
+    def __len__(self) -> int:
+        return len(self.graph.type_ids)
+
+    def __contains__(self, node) -> bool:
+        return isinstance(node, int) and node >= 0 and node < len(self.graph.type_ids)
+
+class AdjacencyView():
+    """graph[start], maps end nodes to {'edge_type': int}.
+    """
+    __slots__ = ['graph', 'start']
+
+    def __init__(self, graph, start: int) -> None:
+        self.graph = graph
+        self.start = start
+
+    def __getitem__(self, end: int) -> dict:
+        edge_type = self.graph.edge_type(self.start, end)
+        if edge_type == None:
+            raise KeyError(end)
+        return {'edge_type': edge_type}
+
+    def __contains__(self, end: int) -> bool:
+        return self.graph.has_edge(self.start, end)
+
+    def __iter__(self):
+        return iter(self.graph.successors(self.start))
+
+class EdgeView():
+    """graph.edges, iterates (start, end) pairs in networkx order, edges(data=True) adds {'edge_type': int}.
+    """
+    __slots__ = ['graph']
+
+    def __init__(self, graph) -> None:
+        self.graph = graph
+
+    def __iter__(self):
+        for start, end, _ in self.graph.edge_items():
+            yield (start, end)
+
+    def __call__(self, data: bool = False):
+        if not data:
+            return iter(self)
+        return ((start, end, {'edge_type': edge_type}) for start, end, edge_type in self.graph.edge_items())
+
+    def __len__(self) -> int:
+        return self.graph.number_of_edges()
+
+class CPGraph():
+    """Code property graph of one function.
+
+    attributes:
+        type_table, type_ids, token_table, token_ids, start_idx, end_idx -- node arrays shared with the CompactSAST.
+        stat_flags -- bytearray, 1 for nodes matching a statement.
+        succ_adj, pred_adj -- per node dicts (neighbour -> edge mask) while the graph is built, None once frozen.
+        succ_offsets, succ_index, succ_masks -- CSR successors of frozen graphs, successors of node i are succ_index[succ_offsets[i]:succ_offsets[i+1]].
+        pred_offsets, pred_index, pred_masks -- CSR predecessors of frozen graphs.
+        ast_index -- ASTIndex of the AST edges (utils.ast_index), built by the cfg constructors and dropped by freeze().
+    """
+    def __init__(self, sast: CompactSAST, compact_state: list = None) -> None:
+        """Empty graph over the nodes of sast, or the frozen graph described by compact_state (see compact_state()).
+        """
+        self.type_table = sast.type_table
+        self.type_ids = sast.type_ids
+        self.token_table = sast.token_table
+        self.token_ids = sast.token_ids
+        self.start_idx = sast.start_idx
+        self.end_idx = sast.end_idx
+        if compact_state == None:
+            self.stat_flags = bytearray(len(sast))
+            self.succ_adj = [dict() for _ in range(len(sast))]
+            self.pred_adj = [dict() for _ in range(len(sast))]
+            self.succ_offsets = self.succ_index = self.succ_masks = None
+            self.pred_offsets = self.pred_index = self.pred_masks = None
+        else:
+            self.succ_adj = self.pred_adj = None
+            self.stat_flags, self.succ_offsets, self.succ_index, self.succ_masks, self.pred_offsets, self.pred_index, self.pred_masks = compact_state
+        self.ast_index = None
+        self.nodes = NodeTable(self)
+
+    def __len__(self) -> int:
+        return len(self.type_ids)
+
+    def __getitem__(self, start: int) -> AdjacencyView:
+        return AdjacencyView(self, start)
+
+    def __getstate__(self) -> dict:
+        self.freeze()
+        state = dict(self.__dict__)
+        del state['nodes']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.ast_index = None
+        self.nodes = NodeTable(self)
+
+    @property
+    def frozen(self) -> bool:
+        return self.succ_adj == None
+
+    @property
+    def edges(self) -> EdgeView:
+        return EdgeView(self)
+
+    def number_of_nodes(self) -> int:
+        return len(self.type_ids)
+
+    def number_of_edges(self) -> int:
+        if self.frozen:
+            return len(self.succ_index)
+        return sum(len(adj) for adj in self.succ_adj)
+
+    def node_type(self, node: int) -> str:
+        return self.type_table[self.type_ids[node]]
+
+    def node_token(self, node: int) -> str:
+        return self.token_table[self.token_ids[node]]
+
+    def is_statement(self, node: int) -> bool:
+        return self.stat_flags[node] == 1
+
+    def set_statement(self, node: int) -> None:
+        self.stat_flags[node] = 1
+
+    def add_edge(self, start: int, end: int, edge_type: int = 0) -> None:
+        """Add edge start -> end or replace the type of the existing edge, like DiGraph.add_edge(start, end, edge_type=edge_type).
+        """
+        if self.frozen:
+            self.thaw()
+        self.succ_adj[start][end] = edge_type
+        self.pred_adj[end][start] = edge_type
+
+    def has_edge(self, start: int, end: int) -> bool:
+        return self.edge_type(start, end) != None
+
+    def edge_type(self, start: int, end: int) -> int:
+        """Bitmask of edge start -> end, None if there is no such edge.
+        """
+        if not self.frozen:
+            return self.succ_adj[start].get(end)
+        for pos in range(self.succ_offsets[start], self.succ_offsets[start+1]):
+            if self.succ_index[pos] == end:
+                return self.succ_masks[pos]
+        return None
+
+    def successors(self, node: int):
+        if not self.frozen:
+            return iter(self.succ_adj[node])
+        return iter(self.succ_index[self.succ_offsets[node]:self.succ_offsets[node+1]])
+
+    def predecessors(self, node: int):
+        if not self.frozen:
+            return iter(self.pred_adj[node])
+        return iter(self.pred_index[self.pred_offsets[node]:self.pred_offsets[node+1]])
+
+    def successor_items(self, node: int):
+        """(successor, edge mask) pairs of node in insertion order.
+        """
+        if not self.frozen:
+            return self.succ_adj[node].items()
+        start, end = self.succ_offsets[node], self.succ_offsets[node+1]
+        return zip(self.succ_index[start:end], self.succ_masks[start:end])
+
+    def predecessor_items(self, node: int):
+        """(predecessor, edge mask) pairs of node in insertion order.
+        """
+        if not self.frozen:
+            return self.pred_adj[node].items()
+        start, end = self.pred_offsets[node], self.pred_offsets[node+1]
+        return zip(self.pred_index[start:end], self.pred_masks[start:end])
+
+    def edge_items(self):
+        """Yield (start, end, edge mask) of every edge, ordered by start node and then by insertion.
+        """
+        for start in range(len(self.type_ids)):
+            for end, mask in self.successor_items(start):
+                yield (start, end, mask)
+
+    def freeze(self) -> None:
+        """Pack adjacency dicts into CSR arrays and drop the ast index, later add_edge calls unpack them again.
+        """
+        self.ast_index = None
+        if self.frozen:
+            return
+        self.succ_offsets, self.succ_index, self.succ_masks = pack_adjacency(self.succ_adj)
+        self.pred_offsets, self.pred_index, self.pred_masks = pack_adjacency(self.pred_adj)
+        self.succ_adj = self.pred_adj = None
+
+    def compact_state(self) -> list:
+        """Statement flags and CSR edge arrays of the frozen graph, everything not shared with the CompactSAST.
+        CPGraph(sast, compact_state) rebuilds the graph on the node arrays of sast (e.g., after construction in a worker process).
+        """
+        self.freeze()
+        return [self.stat_flags, self.succ_offsets, self.succ_index, self.succ_masks, self.pred_offsets, self.pred_index, self.pred_masks]
+
+    def thaw(self) -> None:
+        succ_adj = [dict(self.successor_items(node)) for node in range(len(self.type_ids))]
+        pred_adj = [dict(self.predecessor_items(node)) for node in range(len(self.type_ids))]
+        self.succ_adj, self.pred_adj = succ_adj, pred_adj
+        self.succ_offsets = self.succ_index = self.succ_masks = None
+        self.pred_offsets = self.pred_index = self.pred_masks = None
+
+def pack_adjacency(adjacency: list) -> list:
+    """Turn per node dicts (neighbour -> mask) into [offsets, index, masks] arrays.
+    """
+    offsets = array('I', [0])
+    index = array('I')
+    masks = array('B')
+    for adj in adjacency:
+        index.extend(adj.keys())
+        masks.extend(adj.values())
+        offsets.append(len(index))
+    return [offsets, index, masks]
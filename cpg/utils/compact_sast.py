@@ -0,0 +1,243 @@
+"""Array-backed simplified AST shared by the c and java pipelines.
+"""
+import uuid
+from array import array
+from utils.pickling import intern_str
+
+class SASTNode():
+    """Node view returned by CompactSAST, exposes the treelib Node fields used by the pipeline.
+
+    attributes:
+        identifier -- node id, the position of the node in the CompactSAST arrays.
+        tag -- node type.
+        data -- ASTNode instance of the node.
+    """
+    __slots__ = ['identifier', 'tag', 'data']
+
+    def __init__(self, identifier: int, tag: str, data) -> None:
+        self.identifier = identifier
+        self.tag = tag
+        self.data = data
+
+class FuncSummary():
+    """Facts of one function collected while its sast is built, so they need no further traversal.
+
+    attributes:
+        type_hist -- dict, node type -> number of nodes of the type.
+        typetoken_seq -- depth-first sequence of node types and their non-empty tokens.
+        preorder -- node ids in depth-first order.
+        node_num -- number of nodes.
+        depth -- number of levels of the tree (1 for a single root).
+    """
+    def __init__(self, type_hist: dict, typetoken_seq: list, preorder: array, node_num: int, depth: int) -> None:
+        self.type_hist = type_hist
+        self.typetoken_seq = typetoken_seq
+        self.preorder = preorder
+        self.node_num = node_num
+        self.depth = depth
+
+    @property
+    def type_set(self) -> set:
+        return set(self.type_hist)
+
+class CompactSAST():
+    """Simplified AST of one function stored in parallel arrays.
+
+    Nodes are identified by integers numbered in breadth-first order (root is 0), the same ids are
+    used by the cpg of the function.
+
+    attributes:
+        node_class -- ASTNode class of the language, used to materialize node data.
+        file_name -- name of the file including the function.
+        func_name -- name of the function.
+        type_table -- interned node types, type_ids index it.
+        token_table -- interned node tokens, token_ids index it ('' is 0).
+        start_idx, end_idx -- byte offsets of each node in the source file.
+        parents -- parent index of each node, -1 for root.
+        child_offsets, child_index -- CSR children lists, children of node i are child_index[child_offsets[i]:child_offsets[i+1]].
+        summary -- FuncSummary of the function.
+    """
+    def __init__(self, node_class, file_name: str, func_name: str, type_table: list, type_ids: array, token_table: list, token_ids: array, start_idx: array, end_idx: array, parents: array, child_offsets: array, child_index: array, summary: FuncSummary = None) -> None:
+        self.node_class = node_class
+        self.file_name = file_name
+        self.func_name = func_name
+        self.type_table = type_table
+        self.type_ids = type_ids
+        self.token_table = token_table
+        self.token_ids = token_ids
+        self.start_idx = start_idx
+        self.end_idx = end_idx
+        self.parents = parents
+        self.child_offsets = child_offsets
+        self.child_index = child_index
+        self.summary = summary
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore a pickled sast with its strings interned again, they are shared with the other functions loaded.
+        """
+        self.__dict__.update(state)
+        self.file_name = intern_str(self.file_name)
+        self.func_name = intern_str(self.func_name)
+        self.type_table = [intern_str(x) for x in self.type_table]
+        self.token_table = [intern_str(x) for x in self.token_table]
+        if self.summary != None:
+            self.summary.typetoken_seq = [intern_str(x) for x in self.summary.typetoken_seq]
+
+    def __len__(self) -> int:
+        return len(self.type_ids)
+
+    def size(self) -> int:
+        return len(self.type_ids)
+
+    @property
+    def root(self) -> int:
+        return 0
+
+    def stable_key(self, idx: int) -> str:
+        """Hash key of node idx that stays the same across runs, only needed to match nodes of different runs.
+        """
+        key_str = self.file_name + '-' + self.func_name + '-' + self.node_type(idx) + '-' + str(self.start_idx[idx]) + '-' + str(self.end_idx[idx])
+        key_value = uuid.uuid3(uuid.NAMESPACE_DNS, key_str)
+
+        return str(key_value).replace('-', '')
+
+    def node_type(self, idx: int) -> str:
+        return self.type_table[self.type_ids[idx]]
+
+    def node_token(self, idx: int) -> str:
+        return self.token_table[self.token_ids[idx]]
+
+    def node_data(self, idx: int):
+        """Materialize the ASTNode of node idx.
+        """
+        return self.node_class(idx, self.node_type(idx), self.node_token(idx), self.start_idx[idx], self.end_idx[idx])
+
+    def child_indices(self, idx: int) -> array:
+        return self.child_index[self.child_offsets[idx]:self.child_offsets[idx+1]]
+
+    def contains(self, nid: int) -> bool:
+        return nid >= 0 and nid < len(self.type_ids)
+
+    def get_node(self, nid: int) -> SASTNode:
+        if not self.contains(nid):
+            return None
+        return SASTNode(nid, self.node_type(nid), self.node_data(nid))
+
+    def children(self, nid: int) -> list:
+        return [SASTNode(child, self.node_type(child), self.node_data(child)) for child in self.child_indices(nid)]
+
+class SASTBuilder():
+    """Collect nodes of one function in discovery order and pack them into a CompactSAST.
+
+    attributes:
+        node_class -- ASTNode class of the language.
+        file_name -- name of the file including the function.
+        func_name -- name of the function.
+    """
+    def __init__(self, node_class, file_name: str, func_name: str) -> None:
+        self.node_class = node_class
+        self.file_name = file_name
+        self.func_name = func_name
+        self.types = list()
+        self.tokens = list()
+        self.starts = list()
+        self.ends = list()
+        self.parents = list()
+        self.moved = None
+
+    def add_node(self, node_type: str, node_token: str, start_idx: int, end_idx: int, parent: int = -1) -> int:
+        """Append one node, parents must be added before their children.
+
+        returns:
+            idx -- discovery index of the new node.
+        """
+        self.types.append(node_type)
+        self.tokens.append(node_token)
+        self.starts.append(start_idx)
+        self.ends.append(end_idx)
+        self.parents.append(parent)
+
+        return len(self.types) - 1
+
+    def move_to_root(self, idx: int, node_type: str, node_token: str) -> None:
+        """Drop the subtree of node idx and re-attach the node alone as the last child of root.
+        """
+        self.types[idx] = node_type
+        self.tokens[idx] = node_token
+        self.moved = idx
+
+    def build(self) -> CompactSAST:
+        length = len(self.types)
+        children = [[] for _ in range(length)]
+        removed = [False] * length
+        for idx in range(1, length):
+            parent = self.parents[idx]
+            # parents always precede children, so removal propagates in one pass
+            if idx == self.moved or removed[parent]:
+                removed[idx] = True
+                continue
+            children[parent].append(idx)
+        if self.moved != None:
+            children[self.moved] = []
+            children[0].append(self.moved)
+
+        # renumber nodes in breadth-first order of the final tree
+        order = [0]
+        for current in order:
+            order.extend(children[current])
+        new_index = dict()
+        for new_idx, old_idx in enumerate(order):
+            new_index[old_idx] = new_idx
+
+        type_table, type_ids = intern_values([self.types[x] for x in order], 'H')
+        token_table, token_ids = intern_values([self.tokens[x] for x in order], 'I', [''])
+        start_idx = array('I', [self.starts[x] for x in order])
+        end_idx = array('I', [self.ends[x] for x in order])
+        parents = array('i', [-1] * len(order))
+        depths = [1] * len(order)
+        child_offsets = array('I', [0])
+        child_index = array('I')
+        for new_idx, old_idx in enumerate(order):
+            for child in children[old_idx]:
+                child_index.append(new_index[child])
+                parents[new_index[child]] = new_idx
+                depths[new_index[child]] = depths[new_idx] + 1
+            child_offsets.append(len(child_index))
+
+        # depth-first walk for the typetoken sequence
+        type_hist = dict()
+        typetoken_seq = list()
+        preorder = array('I')
+        stack = [0]
+        while stack:
+            idx = stack.pop()
+            preorder.append(idx)
+            node_type = type_table[type_ids[idx]]
+            type_hist[node_type] = type_hist.get(node_type, 0) + 1
+            typetoken_seq.append(node_type)
+            if token_ids[idx]:
+                typetoken_seq.append(token_table[token_ids[idx]])
+            stack.extend(reversed(child_index[child_offsets[idx]:child_offsets[idx+1]]))
+        summary = FuncSummary(type_hist, typetoken_seq, preorder, len(order), max(depths))
+
+        return CompactSAST(self.node_class, self.file_name, self.func_name, type_table, type_ids, token_table, token_ids, start_idx, end_idx, parents, child_offsets, child_index, summary)
+
+def intern_values(values: list, typecode: str, table: list = None) -> list:
+    """Replace values with ids of a value table, table strings are interned so that functions share them.
+
+    returns:
+        [table, ids] -- list of distinct values and array of value ids.
+    """
+    if table == None:
+        table = list()
+    table_index = dict()
+    for idx, value in enumerate(table):
+        table_index[value] = idx
+    ids = array(typecode)
+    for value in values:
+        if value not in table_index:
+            table_index[value] = len(table)
+            table.append(intern_str(value))
+        ids.append(table_index[value])
+
+    return [table, ids]
@@ -0,0 +1,161 @@
+"""Per-function complexity budgets, shared by the c and java pipelines.
+
+A function with more sast nodes or statements than its budget is built in a degraded mode instead of in full,
+so that no single function dominates cpg construction time or the size of the encoding results:
+    skip_ddg -- ast and cfg edges, no data dependence edges.
+    truncate -- full cpg of the function cut after the first statements of its body fitting the budget.
+    ast_only -- ast edges only, statements are flagged by node type.
+Degraded CGNodes carry the mode and the original size of their function, the encoders list them in degraded.txt.
+"""
+import os
+from utils.compact_sast import CompactSAST, SASTBuilder
+from utils.setting import logger
+
+DEGRADE_MODES = ['skip_ddg', 'truncate', 'ast_only']
+
+class ComplexityBudget():
+    """Node and statement budget of one function.
+
+    attributes:
+        max_nodes -- sast nodes of one function, no limit if 0.
+        max_stats -- statements of one function, no limit if 0.
+        mode -- degrade mode of functions over budget, one of DEGRADE_MODES.
+    """
+    def __init__(self, max_nodes: int = 0, max_stats: int = 0, mode: str = 'skip_ddg') -> None:
+        self.max_nodes = max_nodes
+        self.max_stats = max_stats
+        self.mode = mode
+
+    def fits(self, node_num: int, stat_num: int) -> bool:
+        return (self.max_nodes == 0 or node_num <= self.max_nodes) and (self.max_stats == 0 or stat_num <= self.max_stats)
+
+def statement_count(sast: CompactSAST, statement_types: list) -> int:
+    """Number of nodes of sast whose type is a statement type, read from the type histogram.
+    """
+    return sum([num for node_type, num in sast.summary.type_hist.items() if node_type in statement_types])
+
+def degrade_record(sast: CompactSAST, statement_types: list, complexity: ComplexityBudget = None) -> list:
+    """Decide how the cpg of a function is built.
+
+    returns:
+        degraded -- [mode, node_num, stat_num] if the function is over budget, None if it is built in full.
+    """
+    if complexity == None:
+        return None
+    node_num = sast.summary.node_num
+    stat_num = statement_count(sast, statement_types)
+    if complexity.fits(node_num, stat_num):
+        return None
+
+    return [complexity.mode, node_num, stat_num]
+
+def truncate_sast(sast: CompactSAST, statement_types: list, block_types: list, complexity: ComplexityBudget) -> CompactSAST:
+    """Cut sast after the first statements fitting complexity.
+
+    Children of the root other than blocks (signature, ret_type) are always kept. Blocks keep their leading
+    statements whose whole subtree fits the remaining budget, a block that does not fit is entered and cut in turn,
+    and every statement after the first one left out is dropped, so the kept statements are a prefix of the body.
+
+    attributes:
+        sast -- CompactSAST of one function.
+        statement_types -- node types counted as statements.
+        block_types -- node types of statement lists that may be cut (e.g., block, compound_statement).
+        complexity -- budget of the kept nodes and statements.
+
+    returns:
+        sast -- CompactSAST of the kept nodes, in breadth-first order like the original.
+    """
+    length = len(sast.type_ids)
+    is_stat = [1 if sast.node_type(idx) in statement_types else 0 for idx in range(length)]
+    is_block = [sast.node_type(idx) in block_types for idx in range(length)]
+    # subtree sizes, children follow their parents in breadth-first order
+    sub_nodes = [1] * length
+    sub_stats = list(is_stat)
+    for idx in range(length - 1, 0, -1):
+        sub_nodes[sast.parents[idx]] += sub_nodes[idx]
+        sub_stats[sast.parents[idx]] += sub_stats[idx]
+
+    kept = bytearray(length)
+    kept[0] = 1
+    used = [1, is_stat[0]]
+    blocks = list()
+    for child in sast.child_indices(0):
+        if is_block[child]:
+            blocks.append(child)
+        else:
+            keep_subtree(sast, child, kept)
+            used[0] += sub_nodes[child]
+            used[1] += sub_stats[child]
+
+    def cut(node: int) -> bool:
+        """Keep the leading children of block node, False once a statement is left out.
+        """
+        for child in sast.child_indices(node):
+            if complexity.fits(used[0] + sub_nodes[child], used[1] + sub_stats[child]):
+                keep_subtree(sast, child, kept)
+                used[0] += sub_nodes[child]
+                used[1] += sub_stats[child]
+            elif is_block[child] and complexity.fits(used[0] + 1, used[1] + is_stat[child]):
+                kept[child] = 1
+                used[0] += 1
+                used[1] += is_stat[child]
+                return cut(child)
+            else:
+                return False
+        return True
+
+    for block in blocks:
+        if not complexity.fits(used[0] + 1, used[1] + is_stat[block]):
+            break
+        kept[block] = 1
+        used[0] += 1
+        used[1] += is_stat[block]
+        if not cut(block):
+            break
+
+    builder = SASTBuilder(sast.node_class, sast.file_name, sast.func_name)
+    new_index = dict()
+    for idx in range(length):
+        if not kept[idx]:
+            continue
+        parent = new_index[sast.parents[idx]] if idx > 0 else -1
+        new_index[idx] = builder.add_node(sast.node_type(idx), sast.node_token(idx), sast.start_idx[idx], sast.end_idx[idx], parent)
+
+    return builder.build()
+
+def keep_subtree(sast: CompactSAST, node: int, kept: bytearray) -> None:
+    stack = [node]
+    while stack:
+        idx = stack.pop()
+        kept[idx] = 1
+        stack.extend(sast.child_indices(idx))
+
+def degraded_rows(func_dict: dict, entity_id: list) -> list:
+    """Rows of degraded.txt for the degraded CGNodes of func_dict.
+
+    attributes:
+        func_dict -- call graph dict, node_base of the CGNodes is assigned.
+        entity_id -- list whose index is the node id (node_base + node) and value is the entity id.
+
+    returns:
+        rows -- list of [entity id of the function node, file name, function name, mode, node number, statement number].
+    """
+    rows = list()
+    for _, value in func_dict.items():
+        for func_cgnode in value:
+            if func_cgnode.degraded == None:
+                continue
+            mode, node_num, stat_num = func_cgnode.degraded
+            rows.append([str(entity_id[func_cgnode.node_base]), func_cgnode.file_name, func_cgnode.func_name, mode, str(node_num), str(stat_num)])
+
+    return rows
+
+def encoding_degraded(encode_path: str, rows: list) -> None:
+    """Write degraded.txt, the functions built over their complexity budget (see degraded_rows).
+    """
+    with open(os.path.join(encode_path, 'degraded.txt'), 'w') as f:
+        f.write(str(len(rows)) + '\n')
+        for row in rows:
+            f.write(','.join(row) + '\n')
+    if len(rows) > 0:
+        logger.info(f'{len(rows)} functions over their complexity budget are degraded, listed in degraded.txt')
@@ -1,3 +1,6 @@
+from collections import deque
+from utils.pickling import Slotted
+
 class Stack():
     """Construct the stack structure using list
     """
@@ -16,13 +19,13 @@ class Stack():
         return self.__list.pop()
 
 class Queue():
-    """Construct the queue structure using list
+    """Construct the queue structure using deque
     """
     def __init__(self) -> None:
-        self.__list = list()
+        self.__list = deque()
     
     def is_empty(self):
-        return self.__list == []
+        return len(self.__list) == 0
     
     def push(self, data):
         self.__list.append(data)
@@ -31,11 +34,12 @@ class Queue():
         if self.is_empty():
             return False
         
-        return self.__list.pop(0)
+        return self.__list.popleft()
 
-class Edge():
+class Edge(Slotted):
     """Edge between two connected ASTNodes
     """
+    __slots__ = ['start', 'end', 'etype']
     def __init__(self, start: str, end: str, etype: str) -> None:
         self.start = start
         self.end = end
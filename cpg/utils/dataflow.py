@@ -0,0 +1,87 @@
+"""Data flow analyses over control-flow based code property graphs shared by the c and java pipelines.
+"""
+from collections import deque
+from utils.compact_cpg import CPGraph
+from utils.traversal import stat_predecessors
+
+def reaching_def_edges(cfg_cpg: CPGraph, def_use_chain: dict) -> list:
+    """Solve reaching definitions over the statements of def_use_chain with a bit-vector worklist.
+
+    A data flow edge d -> n is emitted when statement d defines a variable used by statement n, d != n,
+    and some control flow path from d to n passes no other definition of that variable.
+
+    attributes:
+        cfg_cpg -- cfg-based code property graph for one function.
+        def_use_chain -- dict of DDGNodes, generated by gen_def_use_chain.
+
+    returns:
+        ddg_edges -- list of [def node, use node], grouped by use node in the order of def_use_chain.
+                     None if a statement outside def_use_chain flows into it, callers replay back tracking
+                     for these functions.
+    """
+    nodes = list(def_use_chain.keys())
+    index = {node: idx for idx, node in enumerate(nodes)}
+
+    # one bit per (statement, defined variable)
+    var_bits = dict()
+    def_sites = list()
+    gen = [0] * len(nodes)
+    for idx, node in enumerate(nodes):
+        for var in def_use_chain[node].defs:
+            bit = 1 << len(def_sites)
+            def_sites.append(node)
+            gen[idx] |= bit
+            var_bits[var] = var_bits.get(var, 0) | bit
+    kill = [0] * len(nodes)
+    for idx, node in enumerate(nodes):
+        for var in def_use_chain[node].defs:
+            kill[idx] |= var_bits[var]
+
+    preds = [list() for _ in nodes]
+    succs = [list() for _ in nodes]
+    for idx, node in enumerate(nodes):
+        for _pred in stat_predecessors(cfg_cpg, node):
+            if _pred not in index:
+                return None
+            preds[idx].append(index[_pred])
+            succs[index[_pred]].append(idx)
+
+    reach_in = [0] * len(nodes)
+    reach_out = list(gen)
+    worklist = deque(range(len(nodes)))
+    in_list = [True] * len(nodes)
+    while worklist:
+        idx = worklist.popleft()
+        in_list[idx] = False
+        bits = 0
+        for _pred in preds[idx]:
+            bits |= reach_out[_pred]
+        reach_in[idx] = bits
+        out = gen[idx] | (bits & ~kill[idx])
+        if out != reach_out[idx]:
+            reach_out[idx] = out
+            for _succ in succs[idx]:
+                if not in_list[_succ]:
+                    in_list[_succ] = True
+                    worklist.append(_succ)
+
+    ddg_edges = list()
+    for idx, node in enumerate(nodes):
+        # definitions of the use statement itself only reach it around a loop, which back tracking never follows
+        reach = reach_in[idx] & ~gen[idx]
+        def_nodes = list()
+        for var in def_use_chain[node].uses:
+            bits = reach & var_bits.get(var, 0)
+            var_defs = set()
+            while bits:
+                low = bits & -bits
+                var_defs.add(def_sites[low.bit_length() - 1])
+                bits ^= low
+            # nearer definitions first, approximating the order in which the backward search meets them
+            for _def in sorted(var_defs, key=lambda x: (x > node, -x)):
+                if _def not in def_nodes:
+                    def_nodes.append(_def)
+        for _def in def_nodes:
+            ddg_edges.append([_def, node])
+
+    return ddg_edges
@@ -0,0 +1,68 @@
+"""Deduplication of identical functions before cpg construction, shared by the c and java pipelines.
+
+Sasts keep node types, tokens and the tree shape but neither comments nor layout, so functions with equal
+sasts (e.g., copies differing in whitespace or comments) get equal cpgs: the cpg of one representative per
+group is built and shared by the CGNodes of the other members.
+"""
+import hashlib
+import time
+from utils.compact_sast import CompactSAST
+from utils.setting import logger
+from utils.supervisor import FailureReport
+
+def sast_digest(sast: CompactSAST) -> bytes:
+    """Digest of the node types, tokens and parents of sast, byte offsets and the file name are left out.
+    """
+    digest = hashlib.sha1()
+    digest.update('\0'.join([sast.type_table[x] for x in sast.type_ids]).encode('utf8', 'surrogatepass'))
+    digest.update(b'\1')
+    digest.update('\0'.join([sast.token_table[x] for x in sast.token_ids]).encode('utf8', 'surrogatepass'))
+    digest.update(b'\1')
+    digest.update(sast.parents.tobytes())
+
+    return digest.digest()
+
+def build_deduplicated(func_list: list, func_cgnodes: list, build, share, cache=None, report: FailureReport = None) -> None:
+    """Fill the missing CGNodes of func_cgnodes, building one cpg per group of identical functions.
+
+    attributes:
+        func_list -- list of FunUnits.
+        func_cgnodes -- CGNode of each function, None for functions to build.
+        build -- function (funcs, cgnodes) filling the None CGNodes of funcs, those it skips stay None.
+        share -- function (func, cgnode) returning the CGNode of func on the cpg of cgnode, the CGNode of an identical function.
+        cache -- parse cache receiving the CGNodes of duplicates.
+        report -- records duplicates of skipped functions.
+    """
+    todo = [idx for idx, cgnode in enumerate(func_cgnodes) if cgnode == None]
+    groups = dict()
+    for idx in todo:
+        key = (func_list[idx].func_name, sast_digest(func_list[idx].sast))
+        if key not in groups:
+            groups[key] = [idx]
+        else:
+            groups[key].append(idx)
+    reps = [members[0] for _, members in groups.items()]
+
+    start = time.time()
+    rep_cgnodes = [None] * len(reps)
+    build([func_list[idx] for idx in reps], rep_cgnodes)
+    build_time = time.time() - start
+
+    for rep_cgnode, (_, members) in zip(rep_cgnodes, groups.items()):
+        func_cgnodes[members[0]] = rep_cgnode
+        for idx in members[1:]:
+            func = func_list[idx]
+            if rep_cgnode == None:
+                if report != None:
+                    rep = func_list[members[0]]
+                    report.add('cpg', func.file_name, func.func_name, 'duplicate_skipped', f'{rep.file_name} {rep.func_name}')
+                continue
+            func_cgnodes[idx] = share(func, rep_cgnode)
+            if cache != None:
+                cache.put_cgnode(func, func_cgnodes[idx])
+
+    if len(todo) > 0:
+        duplicates = len(todo) - len(reps)
+        saved = build_time / len(reps) * duplicates if len(reps) > 0 else 0.0
+        logger.info('Dedup: {} functions to build, {} unique, {} duplicates ({:.1f}%), about {:.2f}s of cpg construction saved' .format(
+            len(todo), len(reps), duplicates, 100.0 * duplicates / len(todo), saved))
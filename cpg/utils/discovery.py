@@ -0,0 +1,164 @@
+"""Streaming discovery of source files shared by the c and java pipelines.
+"""
+import fnmatch
+import os
+import tarfile
+import zipfile
+import zlib
+from utils.setting import logger
+
+class SourceFilter():
+    """Options deciding which files under the source directory are parsed.
+
+    attributes:
+        min_size -- files smaller than min_size bytes are skipped.
+        max_size -- files larger than max_size bytes are skipped, no limit if 0.
+        exclude -- glob patterns, files or directories whose name or relative path matches any are skipped.
+        shard -- [index, count], only files whose path hash falls in shard index of count are kept, all files if None.
+    """
+    def __init__(self, min_size: int = 0, max_size: int = 0, exclude: list = None, shard: list = None) -> None:
+        if exclude == None:
+            exclude = list()
+        self.min_size = min_size
+        self.max_size = max_size
+        self.exclude = exclude
+        self.shard = shard
+
+    def is_excluded(self, name: str, rel_path: str) -> bool:
+        for pattern in self.exclude:
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+                return True
+        return False
+
+    def in_size(self, size: int) -> bool:
+        if size < self.min_size:
+            return False
+        if self.max_size and size > self.max_size:
+            return False
+        return True
+
+    def in_shard(self, rel_path: str) -> bool:
+        """Assign files to shards by a hash of their relative path, so every machine agrees on the split.
+        """
+        if self.shard == None:
+            return True
+        index, count = self.shard
+        return zlib.crc32(rel_path.encode('utf8')) % count == index
+
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.zip')
+
+def is_archive(path: str) -> bool:
+    return os.path.isfile(path) and path.endswith(ARCHIVE_SUFFIXES)
+
+def parse_shard(shard: str) -> list:
+    """Parse shard option like '0/4'.
+
+    returns:
+        [index, count] -- None if shard is None.
+    """
+    if shard == None:
+        return None
+    try:
+        index, count = [int(x) for x in shard.split('/')]
+    except ValueError:
+        logger.error(f'Invalid shard {shard}, expect i/N (e.g., 0/4)')
+        exit(-1)
+    if count <= 0 or index < 0 or index >= count:
+        logger.error(f'Invalid shard {shard}, expect 0 <= i < N')
+        exit(-1)
+
+    return [index, count]
+
+def scan_src_files(dir_path: str, extensions: list, src_filter: SourceFilter = None):
+    """Yield source files under dir_path in os.walk order while the tree is being scanned.
+
+    attributes:
+        dir_path -- root directory of source files.
+        extensions -- file extensions to keep (without dot, e.g., ['c']).
+        src_filter -- size, exclude and shard options, keep every source file if None.
+    """
+    if src_filter == None:
+        src_filter = SourceFilter()
+    # stack of directories waiting to be scanned, subdirectories are pushed in reverse to keep os.walk order
+    stack = [[dir_path, '']]
+    while stack:
+        current, rel_dir = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError as e:
+            logger.warning(f'Cannot scan {current}: {e}')
+            continue
+        sub_dirs = list()
+        for entry in entries:
+            rel_path = rel_dir + entry.name
+            if src_filter.is_excluded(entry.name, rel_path):
+                continue
+            if entry.is_dir():
+                # like os.walk, symbolic links to directories are not followed
+                if not entry.is_symlink():
+                    sub_dirs.append([entry.path, rel_path + '/'])
+                continue
+            if os.path.splitext(entry.name)[-1][1:] not in extensions:
+                continue
+            if not src_filter.in_shard(rel_path):
+                continue
+            if (src_filter.min_size or src_filter.max_size) and not src_filter.in_size(entry.stat().st_size):
+                continue
+            yield entry.path
+        stack += reversed(sub_dirs)
+
+def keep_member(name: str, size: int, extensions: list, src_filter: SourceFilter) -> bool:
+    """Apply src_filter to an archive member, member names play the role of relative paths.
+    """
+    parts = name.split('/')
+    for idx in range(len(parts)):
+        if src_filter.is_excluded(parts[idx], '/'.join(parts[:idx+1])):
+            return False
+    if os.path.splitext(parts[-1])[-1][1:] not in extensions:
+        return False
+    if not src_filter.in_shard(name):
+        return False
+
+    return src_filter.in_size(size)
+
+def scan_archive_files(archive_path: str, extensions: list, src_filter: SourceFilter = None):
+    """Yield [member name, source code] of source files in a tar or zip archive without extracting it.
+
+    attributes:
+        archive_path -- path of .tar, .tar.gz or .zip file.
+        extensions -- file extensions to keep (without dot, e.g., ['c']).
+        src_filter -- size, exclude and shard options, keep every source file if None.
+    """
+    if src_filter == None:
+        src_filter = SourceFilter()
+    if archive_path.endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not keep_member(info.filename, info.file_size, extensions, src_filter):
+                    continue
+                yield [info.filename, archive.read(info)]
+        return
+    # stream mode reads compressed tarballs sequentially
+    with tarfile.open(archive_path, 'r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not keep_member(member.name, member.size, extensions, src_filter):
+                continue
+            yield [member.name, archive.extractfile(member).read()]
+
+def scan_sources(src_path: str, extensions: list, src_filter: SourceFilter = None):
+    """Yield source files of a directory (file paths) or an archive ([member name, source code]).
+    """
+    if is_archive(src_path):
+        return scan_archive_files(src_path, extensions, src_filter)
+    return scan_src_files(src_path, extensions, src_filter)
+
+def read_source(source) -> list:
+    """Read a source yielded by scan_sources.
+
+    returns:
+        [file_path, src_code] -- member name is used as file path for archive members.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return [source, f.read()]
+    return source
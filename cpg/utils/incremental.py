@@ -0,0 +1,172 @@
+"""Incremental re-parsing of edited source files shared by the c and java pipelines.
+
+A WatchSession keeps the tree-sitter tree and the FunUnits of every watched file.
+When a file changes, the old tree is edited and re-parsed incrementally, and only
+functions whose source text changed get a new FunUnit and a new CGNode.
+"""
+import os
+import time
+from utils.discovery import SourceFilter, is_archive, scan_src_files
+from utils.setting import logger
+
+# bytes compared at a time when searching the common prefix and suffix of two versions
+CHUNK_SIZE = 4096
+
+def common_prefix(old: bytes, new: bytes) -> int:
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start:start+CHUNK_SIZE] == new[start:start+CHUNK_SIZE]:
+        start += CHUNK_SIZE
+    end = min(start + CHUNK_SIZE, limit)
+    while start < end and old[start] == new[start]:
+        start += 1
+    return start
+
+def common_suffix(old: bytes, new: bytes, prefix: int) -> int:
+    limit = min(len(old), len(new)) - prefix
+    size = 0
+    while size + CHUNK_SIZE <= limit and old[len(old)-size-CHUNK_SIZE:len(old)-size] == new[len(new)-size-CHUNK_SIZE:len(new)-size]:
+        size += CHUNK_SIZE
+    while size < limit and old[len(old)-size-1] == new[len(new)-size-1]:
+        size += 1
+    return size
+
+def point_at(src_code: bytes, byte: int) -> tuple:
+    """(row, column) of byte offset in src_code, as used by tree-sitter.
+    """
+    row = src_code.count(b'\n', 0, byte)
+    column = byte - (src_code.rfind(b'\n', 0, byte) + 1)
+    return (row, column)
+
+def compute_edit(old: bytes, new: bytes) -> list:
+    """Describe the change from old to new as a single tree-sitter edit.
+
+    returns:
+        [start_byte, old_end_byte, new_end_byte, start_point, old_end_point, new_end_point] -- None if old equals new.
+    """
+    if old == new:
+        return None
+    start = common_prefix(old, new)
+    suffix = common_suffix(old, new, start)
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+
+    return [start, old_end, new_end, point_at(old, start), point_at(old, old_end), point_at(new, new_end)]
+
+def poll_changes(src_path: str, extensions: list, src_filter: SourceFilter = None, interval: float = 1.0):
+    """Poll the source directory and yield [changed, removed] file paths whenever files change.
+
+    The first round yields every source file as changed.
+    """
+    if is_archive(src_path):
+        logger.error(f'Cannot watch archive {src_path}, please watch a directory.')
+        exit(-1)
+    stamps = dict()
+    while True:
+        current = dict()
+        for file_path in scan_src_files(src_path, extensions, src_filter):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            current[file_path] = (stat.st_mtime_ns, stat.st_size)
+        changed = [file_path for file_path in current if stamps.get(file_path) != current[file_path]]
+        removed = [file_path for file_path in stamps if file_path not in current]
+        stamps = current
+        if changed or removed:
+            yield [changed, removed]
+        time.sleep(interval)
+
+class WatchSession():
+    """Per-file trees and FunUnits of watched files, also serves as the CGNode cache of cg_dict_constructor.
+
+    attributes:
+        tree_funcs -- function (file_path, src_code, tree, session, reuse, func_codes) -> FunUnits, e.g., java_tree_funcs.
+        session -- parser session of current process.
+        files -- dict, file path -> [src_code, tree, FunUnits, source bytes of each FunUnit].
+        cgnodes -- dict, id(FunUnit) -> CGNode built in previous rounds.
+    """
+    def __init__(self, tree_funcs, session) -> None:
+        self.tree_funcs = tree_funcs
+        self.session = session
+        self.files = dict()
+        self.cgnodes = dict()
+
+    def update(self, file_path: str, src_code: bytes = None) -> list:
+        """Re-parse file_path after a change, unchanged functions keep their FunUnits.
+
+        returns:
+            [rebuilt, reused] -- numbers of functions rebuilt and reused.
+        """
+        if src_code == None:
+            with open(file_path, 'rb') as f:
+                src_code = f.read()
+        reuse = None
+        if file_path in self.files:
+            old_code, old_tree, old_funcs, old_codes = self.files[file_path]
+            edit = compute_edit(old_code, src_code)
+            if edit == None:
+                return [0, len(old_funcs)]
+            old_tree.edit(*edit)
+            tree = self.session.parse(src_code, old_tree)
+            reuse = dict()
+            for func, func_code in zip(old_funcs, old_codes):
+                reuse.setdefault(func_code, []).append(func)
+        else:
+            tree = self.session.parse(src_code)
+
+        func_codes = list()
+        funcs = self.tree_funcs(file_path, src_code, tree, self.session, reuse, func_codes)
+        reused = 0
+        if reuse != None:
+            kept = set(id(func) for func in funcs)
+            for func in old_funcs:
+                if id(func) in kept:
+                    reused += 1
+                else:
+                    self.cgnodes.pop(id(func), None)
+        self.files[file_path] = [src_code, tree, funcs, func_codes]
+
+        return [len(funcs) - reused, reused]
+
+    def remove(self, file_path: str) -> None:
+        if file_path not in self.files:
+            return
+        for func in self.files.pop(file_path)[2]:
+            self.cgnodes.pop(id(func), None)
+
+    def func_list(self) -> list:
+        """FunUnits of all watched files without ERROR nodes, in the order files were first seen.
+        """
+        func_list = list()
+        for file_path, (_, _, funcs, _) in self.files.items():
+            for func in funcs:
+                if func.has_type('ERROR'):
+                    logger.warning(f'File: {file_path} \t function: {func.func_name} has ERROR Type, skipping until fixed.')
+                    continue
+                func_list.append(func)
+        return func_list
+
+    def get_cgnode(self, func):
+        return self.cgnodes.get(id(func))
+
+    def put_cgnode(self, func, cgnode) -> None:
+        self.cgnodes[id(func)] = cgnode
+
+    def apply(self, changed: list, removed: list) -> None:
+        """Apply one round of file changes and log the latency of re-parsing.
+        """
+        start = time.time()
+        rebuilt = reused = 0
+        for file_path in removed:
+            self.remove(file_path)
+        for file_path in changed:
+            try:
+                file_rebuilt, file_reused = self.update(file_path)
+            except OSError as e:
+                logger.warning(f'Cannot read {file_path}: {e}')
+                self.remove(file_path)
+                continue
+            rebuilt += file_rebuilt
+            reused += file_reused
+        logger.info(f'Re-parsed {len(changed)} changed, {len(removed)} removed files in {time.time() - start:.3f}s: {rebuilt} functions rebuilt, {reused} reused')
@@ -0,0 +1,58 @@
+"""Process pool helpers shared by the c and java pipelines.
+"""
+import threading
+from multiprocessing import Pool
+
+
+def bounded_feed(items, slots: threading.Semaphore, stopped: threading.Event):
+    """Yield items while holding one slot per item, the consumer releases a slot for each result.
+    """
+    items = iter(items)
+    while True:
+        slots.acquire()
+        if stopped.is_set():
+            return
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+        yield item
+
+def ordered_imap(func, items, workers: int = 1, initializer=None, initargs: tuple = (), chunksize: int = 1, max_pending: int = 0):
+    """Apply func to every item and yield the results in the order of items.
+
+    attributes:
+        func -- module level function applied to each item (must be picklable).
+        items -- iterable of inputs.
+        workers -- number of worker processes, run in the current process if workers <= 1.
+        initializer -- function called once per worker (e.g., load parser and queries).
+        initargs -- arguments of initializer.
+        chunksize -- number of items sent to one worker at a time.
+        max_pending -- upper bound of items taken from items but not yielded yet, unbounded if 0.
+
+    returns:
+        generator of func(item), ordered as items.
+    """
+    if workers <= 1:
+        if initializer != None:
+            initializer(*initargs)
+        for item in items:
+            yield func(item)
+        return
+
+    if max_pending:
+        # the pool feeds tasks from a background thread, bound it so large inputs are not read ahead
+        slots = threading.Semaphore(max(max_pending, chunksize))
+        stopped = threading.Event()
+        items = bounded_feed(items, slots, stopped)
+
+    with Pool(workers, initializer, initargs) as pool:
+        try:
+            for res in pool.imap(func, items, chunksize):
+                if max_pending:
+                    slots.release()
+                yield res
+        finally:
+            if max_pending:
+                stopped.set()
+                slots.release()
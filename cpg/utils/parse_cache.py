@@ -0,0 +1,216 @@
+"""On-disk cache of parsed source files shared by the c and java pipelines.
+
+Each entry holds the functions extracted from one file and their CGNodes, so an
+unchanged file skips tree-sitter, sast building, cfg and ddg construction.
+"""
+import hashlib
+import os
+import pickle
+from collections import deque
+from functools import partial
+from utils.discovery import read_source
+from utils.parallel import ordered_imap
+from utils.setting import logger
+
+class ParseCache():
+    """Content-addressed cache of per-file parse results.
+
+    attributes:
+        cache_dir -- directory storing cache entries.
+        max_size -- upper bound of the cache size in bytes, least recently used entries are evicted beyond it.
+        version -- grammar & constructor version, entries of other versions are never hit.
+    """
+    def __init__(self, cache_dir: str, max_size: int, version: str) -> None:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.version = version
+        # file key -> [funcs, cgnodes] of files parsed in current run
+        self.pending = dict()
+        # id of FunUnit -> [file key, function index]
+        self.func_keys = dict()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def file_key(self, file_path: str, src_code: bytes) -> str:
+        return content_key(self.version, file_path, src_code)
+
+    def entry_path(self, key: str) -> str:
+        return entry_path(self.cache_dir, key)
+
+    def load(self, key: str) -> list:
+        """Load the cached functions of one file.
+
+        returns:
+            funcs -- None if the file is not cached.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                funcs, cgnodes = pickle.load(f)
+            # refresh access time for lru eviction
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self.hits += 1
+        self.track(key, funcs, cgnodes)
+
+        return funcs
+
+    def add_parsed(self, key: str, funcs: list) -> None:
+        """Record functions of a file missing in the cache, they are stored at flush.
+        """
+        self.misses += 1
+        self.track(key, funcs)
+
+    def track(self, key: str, funcs: list, cgnodes: list = None) -> None:
+        """Remember which file the functions come from, cgnodes are filled by cg_dict_constructor.
+        """
+        if key in self.pending:
+            # duplicated file in this run, its functions are built without the cache
+            return
+        if cgnodes == None:
+            cgnodes = [None] * len(funcs)
+        self.pending[key] = [funcs, cgnodes]
+        for idx, func in enumerate(funcs):
+            self.func_keys[id(func)] = [key, idx]
+
+    def get_cgnode(self, func):
+        """Return the cached CGNode of func or None.
+        """
+        if id(func) not in self.func_keys:
+            return None
+        key, idx = self.func_keys[id(func)]
+        return self.pending[key][1][idx]
+
+    def put_cgnode(self, func, cgnode) -> None:
+        if id(func) not in self.func_keys:
+            return
+        key, idx = self.func_keys[id(func)]
+        self.pending[key][1][idx] = cgnode
+
+    def store(self) -> None:
+        """Store entries of newly parsed files and release the tracked functions and CGNodes.
+        """
+        for key, entry in self.pending.items():
+            path = self.entry_path(key)
+            if os.path.exists(path):
+                continue
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            tmp_path = path + '.{}.tmp'.format(os.getpid())
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self.stored += 1
+        self.pending = dict()
+        self.func_keys = dict()
+
+    def flush(self) -> None:
+        """Store entries of newly parsed files, evict old entries and print the hit/miss report.
+        """
+        self.store()
+        size = self.evict()
+        total = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / total if total else 0.0
+        logger.info('Parse cache: {} hits, {} misses ({:.1f}% hit), {} stored, {} evicted, {:.1f} MB on disk' .format(self.hits, self.misses, hit_rate, self.stored, self.evicted, size / 1024 / 1024))
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits in max_size.
+
+        returns:
+            size -- cache size in bytes after eviction.
+        """
+        entries = list()
+        size = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                entries.append([stat.st_mtime, stat.st_size, path])
+                size += stat.st_size
+        entries.sort()
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            os.remove(path)
+            size -= entry_size
+            self.evicted += 1
+
+        return size
+
+def content_key(version: str, file_path: str, src_code: bytes) -> str:
+    """Hash file content together with its name (node keys depend on it) and the cache version.
+    """
+    sha = hashlib.sha256()
+    sha.update(version.encode('utf8'))
+    sha.update(b'\0')
+    sha.update(os.path.basename(file_path).encode('utf8'))
+    sha.update(b'\0')
+    sha.update(src_code)
+
+    return sha.hexdigest()
+
+def entry_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], key + '.pkl')
+
+def probe_file(parse_func, cache_dir: str, version: str, source) -> list:
+    """Hash one file and parse it only if the cache has no entry for it, runs in parsing processes.
+
+    attributes:
+        source -- file path, or [member name, source code] of an archive member.
+
+    returns:
+        [file_path, key, funcs] -- funcs is None if the entry exists.
+    """
+    file_path, src_code = read_source(source)
+    key = content_key(version, file_path, src_code)
+    if os.path.exists(entry_path(cache_dir, key)):
+        return [file_path, key, None]
+
+    return [file_path, key, parse_func([file_path, src_code])[1]]
+
+def grammar_digest(lib_path: str) -> str:
+    """Hash of the tree-sitter grammar library.
+    """
+    with open(lib_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def cached_imap(parse_func, files: list, workers: int = 1, initializer=None, cache: ParseCache = None):
+    """Yield [file, funcs] in the order of files, only files missing in cache are handed to parse_func.
+
+    Files are consumed lazily, so results are yielded while files are still being discovered.
+
+    attributes:
+        parse_func -- function mapping a source to [file_path, funcs].
+        files -- iterable of sources, file paths or [member name, source code] of archive members.
+        workers -- number of parsing processes.
+        initializer -- function run once in each parsing process.
+        cache -- ParseCache instance, every file is parsed if None.
+    """
+    max_pending = workers * 64
+    if cache == None:
+        for res in ordered_imap(parse_func, files, workers, initializer, chunksize=8, max_pending=max_pending):
+            yield res
+        return
+    # sources handed to the pool and not returned yet, archive members cannot be read again
+    sources = deque()
+    def remember(files):
+        for source in files:
+            sources.append(source)
+            yield source
+    probe = partial(probe_file, parse_func, cache.cache_dir, cache.version)
+    for file, key, funcs in ordered_imap(probe, remember(files), workers, initializer, chunksize=8, max_pending=max_pending):
+        source = sources.popleft()
+        if funcs != None:
+            cache.add_parsed(key, funcs)
+        else:
+            funcs = cache.load(key)
+            if funcs == None:
+                # entry removed or broken after probing, parse it here
+                _, funcs = parse_func(source)
+                cache.add_parsed(key, funcs)
+        yield [file, funcs]
@@ -0,0 +1,113 @@
+"""Slot-based metadata classes and versioned pickles of inter results, shared by the c and java pipelines.
+
+Classes deriving from Slotted keep their fields in __slots__ instead of a per-instance __dict__, and intern the
+strings repeated across instances (file, function and callee names). They are pickled as a dict of their slots,
+so pickles written before they had slots still load, fields missing from old pickles take slot_defaults.
+
+store_inter_results writes a header {'format', 'version'} before the pickled object, load_versioned also accepts
+the unversioned pickles of releases since cpgs are stored as CompactSAST/CPGraph. Inter results of older releases
+(networkx cpgs of CPGNodes, treelib sasts) cannot be used by the current constructors, they are detected while
+unpickling and rejected with a request to rebuild them.
+"""
+import pickle
+import sys
+from utils.setting import logger
+
+# version of the inter result pickles, bump it when stored objects change incompatibly
+IRESULT_VERSION = 1
+IRESULT_FORMAT = 'cpg-iresult'
+
+# modules of the classes only pickled by releases storing networkx cpgs and treelib sasts
+LEGACY_PACKAGES = ['networkx', 'treelib']
+LEGACY_MODULES = ['ccpg.cpg.cpg_node', 'javacpg.cpg.cpg_node']
+
+# slot names of each Slotted class, including those of its bases
+slot_names_cache = dict()
+
+def intern_str(value):
+    """The interned copy of value if it is a string, so that equal strings share one object.
+    """
+    if type(value) == str:
+        return sys.intern(value)
+    return value
+
+def slot_names(cls) -> list:
+    if cls not in slot_names_cache:
+        names = list()
+        for klass in reversed(cls.__mro__):
+            for name in getattr(klass, '__slots__', ()):
+                if name not in names:
+                    names.append(name)
+        slot_names_cache[cls] = names
+    return slot_names_cache[cls]
+
+class Slotted():
+    """Base of slot-based classes.
+
+    attributes:
+        slot_defaults -- class attribute, dict of slot name -> value of slots missing from older pickles.
+        interned -- class attribute, names of the string slots interned when an instance is unpickled.
+    """
+    __slots__ = ()
+    slot_defaults = dict()
+    interned = ()
+
+    def __getstate__(self) -> dict:
+        state = dict()
+        for name in slot_names(type(self)):
+            if hasattr(self, name):
+                state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state) -> None:
+        # (dict, slots) is the default state of slot-based objects, a plain dict the state of former __dict__-based ones
+        if isinstance(state, tuple):
+            dict_state, slot_state = state
+            state = dict(dict_state or {})
+            state.update(slot_state or {})
+        for name, value in self.slot_defaults.items():
+            setattr(self, name, value)
+        for name, value in state.items():
+            if name in self.interned:
+                value = intern_str(value)
+            setattr(self, name, value)
+
+class LegacyResultError(Exception):
+    """Raised while unpickling an inter result of a release storing networkx cpgs and treelib sasts.
+    """
+    pass
+
+class IResultUnpickler(pickle.Unpickler):
+    """Unpickler of inter results, stops at the first class of the legacy format.
+    """
+    def find_class(self, module: str, name: str):
+        if module.split('.')[0] in LEGACY_PACKAGES or module in LEGACY_MODULES:
+            raise LegacyResultError(f'{module}.{name}')
+        return super().find_class(module, name)
+
+def dump_versioned(obj, file_path: str) -> None:
+    """Pickle obj to file_path after the inter result header.
+    """
+    with open(file_path, 'wb') as f:
+        pickle.dump({'format': IRESULT_FORMAT, 'version': IRESULT_VERSION}, f, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+
+def load_versioned(file_path: str):
+    """Load an object written by dump_versioned, or the unversioned pickle of an earlier release.
+
+    Inter results of releases storing networkx cpgs and treelib sasts are rejected, they have to be rebuilt.
+    """
+    with open(file_path, 'rb') as f:
+        try:
+            obj = IResultUnpickler(f).load()
+            if not isinstance(obj, dict) or obj.get('format') != IRESULT_FORMAT:
+                logger.info(f'{file_path} has no version header, loaded as an inter result of an earlier release.')
+                return obj
+            if obj['version'] > IRESULT_VERSION:
+                logger.error('{} is written by a newer release (version {}, supported {}), exit.'.format(file_path, obj['version'], IRESULT_VERSION))
+                exit(-1)
+            return IResultUnpickler(f).load()
+        except LegacyResultError as e:
+            logger.error(f'{file_path} is an inter result of a release storing networkx cpgs and treelib sasts ({e}), '
+                         'which cannot be loaded anymore. Re-run without --load_iresult (with --store_iresult to rebuild it), exit.')
+            exit(-1)
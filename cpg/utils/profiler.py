@@ -0,0 +1,208 @@
+"""Per-phase profiler of cpg construction and encoding, shared by the c and java pipelines.
+
+Phases (parse, query, sast, ast, cfg, ddg, callees, encoding) are timed with profile_phase(), which costs one
+global lookup while profiling is off. Once enable_profiler() is called, the wall time of every phase run is recorded
+per function, and with trace_memory also the memory it allocates (tracemalloc, which slows the run down several
+times). Functions are told apart by file path, name and parameter types, so overloads and same-named files of
+different directories are reported separately. write_report() summarizes the runs into per-phase totals,
+percentiles and the slowest functions.
+"""
+import csv
+import json
+import os
+import time
+import tracemalloc
+from utils.setting import logger
+
+# active profiler of the current process, None while profiling is off
+profiler = None
+
+class NullPhase():
+    """Context manager doing nothing, returned by profile_phase() while profiling is off.
+    """
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+NULL_PHASE = NullPhase()
+
+class PhaseTimer():
+    """One run of a phase, recorded into its profiler on exit.
+    """
+    __slots__ = ['profiler', 'phase', 'file_path', 'func_name', 'param_types', 'start', 'start_mem']
+
+    def __init__(self, profiler, phase: str, file_path: str, func_name: str, param_types: list) -> None:
+        self.profiler = profiler
+        self.phase = phase
+        self.file_path = file_path
+        self.func_name = func_name
+        self.param_types = param_types
+
+    def __enter__(self):
+        if self.profiler.trace_memory:
+            if self.profiler.reset_peak:
+                tracemalloc.reset_peak()
+            self.start_mem = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        elapsed = time.perf_counter() - self.start
+        allocated = peak = None
+        if self.profiler.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            allocated = current - self.start_mem
+            peak = peak - self.start_mem if self.profiler.reset_peak else None
+        self.profiler.record(self.phase, self.file_path, self.func_name, self.param_types, elapsed, allocated, peak)
+        return False
+
+class PhaseProfiler():
+    """Wall time and allocated memory of phase runs.
+
+    attributes:
+        start -- time the profiler was enabled.
+        trace_memory -- allocations of each run are traced.
+        reset_peak -- the peak allocation of each run is measured (tracemalloc.reset_peak, python >= 3.9).
+        phases -- dict, phase -> [elapsed times, net allocated bytes, peak allocated bytes] of its runs in order.
+        funcs -- dict, (file path, function name, parameter types) -> dict phase -> [elapsed time, net allocated bytes,
+                 peak allocated bytes] summed (peak: maximum) over the runs of the phase for the function.
+    """
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.start = time.perf_counter()
+        self.trace_memory = trace_memory
+        self.reset_peak = hasattr(tracemalloc, 'reset_peak')
+        self.phases = dict()
+        self.funcs = dict()
+
+    def record(self, phase: str, file_path: str, func_name: str, param_types: list, elapsed: float, allocated: int, peak: int) -> None:
+        if phase not in self.phases:
+            self.phases[phase] = [list(), list(), list()]
+        times, allocs, peaks = self.phases[phase]
+        times.append(elapsed)
+        if allocated != None:
+            allocs.append(allocated)
+        if peak != None:
+            peaks.append(peak)
+        if func_name:
+            func_phases = self.funcs.setdefault((file_path, func_name, tuple(param_types)), dict())
+            if phase not in func_phases:
+                func_phases[phase] = [0.0, None, None]
+            func_run = func_phases[phase]
+            func_run[0] += elapsed
+            if allocated != None:
+                func_run[1] = allocated if func_run[1] == None else func_run[1] + allocated
+            if peak != None:
+                func_run[2] = peak if func_run[2] == None else max(func_run[2], peak)
+
+    def phase_summary(self) -> list:
+        """One dict per phase: runs, total, mean, percentiles and max of the run times (seconds), share of the total
+        wall time, net allocated and maximum peak memory (MB, None without trace_memory).
+        """
+        wall = time.perf_counter() - self.start
+        summary = list()
+        for phase, (times, allocs, peaks) in self.phases.items():
+            ordered = sorted(times)
+            total = sum(times)
+            summary.append({'phase': phase, 'runs': len(times), 'total_s': round(total, 6), 'mean_s': round(total / len(times), 6),
+                            'p50_s': round(percentile(ordered, 50), 6), 'p90_s': round(percentile(ordered, 90), 6),
+                            'p99_s': round(percentile(ordered, 99), 6), 'max_s': round(ordered[-1], 6),
+                            'share': round(total / wall, 4) if wall > 0 else 0.0,
+                            'allocated_mb': to_mb(sum(allocs)) if len(allocs) > 0 else None,
+                            'peak_mb': to_mb(max(peaks)) if len(peaks) > 0 else None})
+
+        return summary
+
+    def slowest_funcs(self, top: int) -> list:
+        """The top functions by the time of their phases, each a dict of file path, function, parameter types, total
+        time, net allocated and peak memory (MB, None without trace_memory) and the same per phase.
+        """
+        totals = sorted(self.funcs.items(), key=lambda x: sum([run[0] for run in x[1].values()]), reverse=True)[:top]
+        slowest = list()
+        for (file_path, func_name, param_types), phases in totals:
+            allocs = [run[1] for run in phases.values() if run[1] != None]
+            peaks = [run[2] for run in phases.values() if run[2] != None]
+            slowest.append({'file': file_path, 'func': func_name, 'params': list(param_types),
+                            'total_s': round(sum([run[0] for run in phases.values()]), 6),
+                            'allocated_mb': to_mb(sum(allocs)) if len(allocs) > 0 else None,
+                            'peak_mb': to_mb(max(peaks)) if len(peaks) > 0 else None,
+                            'phases': {phase: {'time_s': round(run[0], 6), 'allocated_mb': to_mb(run[1]), 'peak_mb': to_mb(run[2])}
+                                       for phase, run in phases.items()}})
+
+        return slowest
+
+    def write_report(self, report_path: str, top: int = 20) -> None:
+        """Write the phase summary and the top slowest functions, as csv files if report_path ends with .csv
+        (the slowest functions go to <name>_slowest.csv, with <phase>_s time and, with trace_memory,
+        <phase>_allocated_mb columns), as one json file otherwise.
+        """
+        wall = time.perf_counter() - self.start
+        summary = self.phase_summary()
+        slowest = self.slowest_funcs(top)
+        report_dir = os.path.dirname(report_path)
+        if report_dir and not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+        if report_path.endswith('.csv'):
+            fields = ['phase', 'runs', 'total_s', 'mean_s', 'p50_s', 'p90_s', 'p99_s', 'max_s', 'share', 'allocated_mb', 'peak_mb']
+            with open(report_path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(summary)
+            phases = [x['phase'] for x in summary]
+            columns = [[x, 'time_s', x + '_s'] for x in phases]
+            if self.trace_memory:
+                columns += [[x, 'allocated_mb', x + '_allocated_mb'] for x in phases]
+            with open(report_path[:-len('.csv')] + '_slowest.csv', 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['file', 'func', 'params', 'total_s', 'allocated_mb', 'peak_mb'] + [x[2] for x in columns])
+                for func in slowest:
+                    row = [func['file'], func['func'], ','.join(func['params']), func['total_s'], func['allocated_mb'], func['peak_mb']]
+                    row += [func['phases'][phase][field] if phase in func['phases'] else '' for phase, field, _ in columns]
+                    writer.writerow(row)
+        else:
+            with open(report_path, 'w') as f:
+                json.dump({'wall_s': round(wall, 6), 'phases': summary, 'slowest': slowest}, f, indent=2)
+
+        for phase in sorted(summary, key=lambda x: x['total_s'], reverse=True):
+            logger.info('Profile: {:<10} {:>8} runs {:>10.3f}s ({:>5.1f}%) p90 {:.4f}s max {:.4f}s'.format(
+                phase['phase'], phase['runs'], phase['total_s'], 100 * phase['share'], phase['p90_s'], phase['max_s']))
+        logger.info(f'Profile report written to {report_path}')
+
+def to_mb(size: int) -> float:
+    """Bytes to MB rounded to 3 digits, None stays None.
+    """
+    if size == None:
+        return None
+    return round(size / 1048576, 3)
+
+def percentile(ordered: list, pct: float) -> float:
+    """Nearest-rank percentile of a sorted list.
+    """
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def enable_profiler(trace_memory: bool = False) -> PhaseProfiler:
+    """Start profiling phases of the current process, with trace_memory allocations are traced from now on.
+    """
+    global profiler
+    if trace_memory:
+        tracemalloc.start()
+    profiler = PhaseProfiler(trace_memory)
+    return profiler
+
+def profile_phase(phase: str, file_path: str = '', func_name: str = '', param_types: list = ()):
+    """Context manager timing one run of phase, for function func_name(param_types) of file_path if given.
+    """
+    if profiler == None:
+        return NULL_PHASE
+    return PhaseTimer(profiler, phase, file_path, func_name, param_types)
+
+def profile_func_phase(phase: str, func):
+    """profile_phase of one run of phase for the function of FunUnit func.
+    """
+    if profiler == None:
+        return NULL_PHASE
+    return PhaseTimer(profiler, phase, func.file_path or func.file_name, func.func_name, func.parameter_type)
@@ -44,6 +44,48 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--statistics', default=False, action='store_true',
                         help='print cpg statistics or not')
     parser.add_argument('--lang', type=str, default='c', help='language (c, java)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes used to extract functions and build their cpgs (default: 1)')
+    parser.add_argument('--cache_path', type=str, default=None,
+                        help='directory of the parse cache, unchanged files skip parsing and cpg construction (default: disabled)')
+    parser.add_argument('--cache_size', type=int, default=2048,
+                        help='maximum size of the parse cache in MB (default: 2048)')
+    parser.add_argument('--exclude', type=str, action='append', default=[],
+                        help='glob of files or directories to skip, e.g. vendor or */generated (repeatable)')
+    parser.add_argument('--max_file_size', type=int, default=0,
+                        help='skip source files larger than this size in KB (default: 0 - no limit)')
+    parser.add_argument('--shard', type=str, default=None,
+                        help='only parse shard i of N (format i/N), files are split by a hash of their relative path')
+    parser.add_argument('--supervise', default=False, action='store_true',
+                        help='build cpgs in supervised worker processes, functions failing or over budget are skipped and reported')
+    parser.add_argument('--func_timeout', type=float, default=60,
+                        help='wall-clock budget of building one function cpg in seconds, with --supervise (default: 60, 0 - no limit)')
+    parser.add_argument('--func_max_rss', type=int, default=0,
+                        help='memory budget of a cpg worker in MB, with --supervise (default: 0 - no limit)')
+    parser.add_argument('--max_retries', type=int, default=1,
+                        help='times a function is retried after its worker crashed, with --supervise (default: 1)')
+    parser.add_argument('--failure_report', type=str, default='data/failures.json',
+                        help='json report of skipped files and functions, with --supervise')
+    parser.add_argument('--watch', default=False, action='store_true',
+                        help='keep watching src_path, re-parse changed files incrementally and rebuild only changed functions')
+    parser.add_argument('--watch_interval', type=float, default=1.0,
+                        help='seconds between two scans of src_path, with --watch (default: 1.0)')
+    parser.add_argument('--stream', default=False, action='store_true',
+                        help='build and encode cpgs chunk by chunk, only one chunk of cpgs is kept in memory, with --encoding')
+    parser.add_argument('--chunk_size', type=int, default=1000,
+                        help='number of functions per chunk, chunks hold whole files, with --stream (default: 1000)')
+    parser.add_argument('--max_func_nodes', type=int, default=0,
+                        help='sast node budget of one function, larger functions are built in --degrade mode (default: 0 - no limit)')
+    parser.add_argument('--max_func_stats', type=int, default=0,
+                        help='statement budget of one function, larger functions are built in --degrade mode (default: 0 - no limit)')
+    parser.add_argument('--degrade', type=str, default='skip_ddg',
+                        help='cpg of functions over budget: skip_ddg (no data dependence), truncate (first statements within budget) or ast_only (default: skip_ddg)')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='time each construction phase per function, report written to this json (or .csv) file (default: disabled)')
+    parser.add_argument('--profile_memory', default=False, action='store_true',
+                        help='also trace the memory allocated by each phase, with --profile (several times slower)')
+    parser.add_argument('--profile_top', type=int, default=20,
+                        help='number of slowest functions listed in the profile report, with --profile (default: 20)')
     parser.add_argument('--task', type=str, default='clone', 
                         help='task type: clone (clone detection) or code_smell (code smell detection)')
     
@@ -0,0 +1,216 @@
+"""Chunk by chunk writer of the encoding files, shared by the c and java pipelines.
+
+batch_encoding numbers entities once the whole corpus is built, the StreamEncoder numbers entities and
+type tokens in first-seen order instead, so functions are encoded one chunk at a time and released.
+Rows are appended to part files while chunks arrive, close() prefixes every file with its row count.
+
+Resident across chunks: the type token vocabulary, id and node ids of each deduplicated entity
+(non-statement entity sharing type and token with others), and the triples among deduplicated entities.
+Triples touching other entities stay within one function, they are deduplicated per chunk.
+"""
+import os
+import shutil
+from array import array
+from utils.compact_cpg import AST_EDGE, CFG_EDGE, DDG_EDGE
+from utils.setting import logger
+
+def normalize_typetoken(typetoken: str) -> str:
+    """Type or token as written to typetoken2id.txt.
+    """
+    return typetoken.replace('\n', ' ').replace(',', ' ').strip()
+
+class PartFile():
+    """Encoding file whose rows are written before their number is known.
+
+    attributes:
+        path -- final file, the row count followed by the rows.
+        part_path -- rows written so far.
+        rows -- number of rows written.
+    """
+    def __init__(self, encode_path: str, file_name: str) -> None:
+        self.path = os.path.join(encode_path, file_name)
+        self.part_path = self.path + '.part'
+        self.part = open(self.part_path, 'w')
+        self.rows = 0
+
+    def write(self, line: str) -> None:
+        self.part.write(line + '\n')
+        self.rows += 1
+
+    def finalize(self) -> None:
+        self.part.close()
+        with open(self.path, 'w') as f:
+            f.write(str(self.rows) + '\n')
+            with open(self.part_path, 'r') as part:
+                shutil.copyfileobj(part, f)
+        os.remove(self.part_path)
+
+class StreamEncoder():
+    """Encoding files of one corpus, written chunk by chunk.
+
+    For each chunk, add_sequences encodes its functions, add_entities its cpgs (node ids are chunk local, see assign_node_base),
+    then add_stat_entities, add_triples, add_cg_triples, add_clone_row and add_degraded_rows take the entity ids returned by add_entities.
+
+    attributes:
+        encode_path -- directory of the encoding files.
+        key_empty_tokens -- also deduplicate non-statement entities with empty token (c clone task).
+        typetoken_id -- dict, normalized type or token -> id.
+        entity_num -- number of entities encoded so far.
+        keyed_index -- dict, type + token -> index of the deduplicated entity in keyed_rows.
+        keyed_rows -- list of [id, type, token, node ids] of deduplicated entities, written by close().
+        keyed_ids -- set, ids of deduplicated entities.
+        keyed_triples -- set of triples among deduplicated entities.
+        chunk_triples -- set of the other triples of the current chunk.
+        triple_num -- dict, edge kind -> number of triples containing it, logged by close().
+        node_offset -- global id of node 0 of the current chunk.
+        chunk_nodes -- number of nodes of the current chunk.
+        files -- dict, file name -> PartFile.
+    """
+    def __init__(self, encode_path: str, key_empty_tokens: bool = False, clone_file: str = None, cg_file: bool = False) -> None:
+        if not os.path.exists(encode_path):
+            os.makedirs(encode_path)
+        self.encode_path = encode_path
+        self.key_empty_tokens = key_empty_tokens
+        self.typetoken_id = dict()
+        self.entity_num = 0
+        self.keyed_index = dict()
+        self.keyed_rows = list()
+        self.keyed_ids = set()
+        self.keyed_triples = set()
+        self.chunk_triples = set()
+        self.triple_num = {'AST': 0, 'CFG': 0, 'DFG': 0}
+        self.node_offset = 0
+        self.chunk_nodes = 0
+        file_names = ['typetoken_seq.txt', 'entity2id.txt', 'entity2typetoken.txt', 'stat2entity.txt', 'triple2id.txt', 'degraded.txt']
+        if clone_file != None:
+            file_names.append(clone_file)
+        if cg_file:
+            file_names.append('cg2id.txt')
+        self.clone_file = clone_file
+        self.files = {file_name: PartFile(encode_path, file_name) for file_name in file_names}
+
+    def find_typetoken_id(self, typetoken: str) -> str:
+        typetoken = normalize_typetoken(typetoken)
+        if typetoken not in self.typetoken_id:
+            logger.error(f'Cannot find {typetoken} in typetoken dict, exit.')
+            exit(-1)
+        return self.typetoken_id[typetoken]
+
+    def add_sequences(self, seqs: list) -> None:
+        """Encode the type token sequences of functions, unseen types and tokens extend the vocabulary.
+        """
+        for seq in seqs:
+            seq_id = list()
+            for _tt in seq:
+                _tt = normalize_typetoken(_tt)
+                if _tt not in self.typetoken_id:
+                    self.typetoken_id[_tt] = str(len(self.typetoken_id))
+                seq_id.append(self.typetoken_id[_tt])
+            self.files['typetoken_seq.txt'].write(','.join(seq_id))
+
+    def new_entity(self, node_type: str, node_token: str) -> str:
+        _id = str(self.entity_num)
+        self.entity_num += 1
+        token_id = '-1' if len(normalize_typetoken(node_token)) == 0 else self.find_typetoken_id(node_token)
+        self.files['entity2typetoken.txt'].write(','.join([_id, self.find_typetoken_id(node_type), token_id]))
+        return _id
+
+    def add_entities(self, entities: list) -> list:
+        """Encode the entities of one chunk, which starts the chunk.
+
+        attributes:
+            entities -- list of (node id, type, token, match_statement) of every node of the chunk, node ids are chunk local.
+
+        returns:
+            entity_id -- list, chunk local node id -> entity id.
+        """
+        self.node_offset += self.chunk_nodes
+        self.chunk_nodes = max([x[0] for x in entities]) + 1 if len(entities) > 0 else 0
+        self.chunk_triples = set()
+        entity_id = [None] * self.chunk_nodes
+
+        for node, node_type, node_token, match_statement in entities:
+            if match_statement or (len(node_token) == 0 and not self.key_empty_tokens):
+                _id = self.new_entity(node_type, node_token)
+                _entity_item = [x.strip('\n').replace(',', ' ') for x in [node_type, node_token]]
+                self.files['entity2id.txt'].write(','.join([_id] + _entity_item + [str(self.node_offset + node)]))
+            else:
+                key = node_type + node_token
+                if key not in self.keyed_index:
+                    _id = self.new_entity(node_type, node_token)
+                    self.keyed_index[key] = len(self.keyed_rows)
+                    self.keyed_rows.append([_id, node_type, node_token, array('q')])
+                    self.keyed_ids.add(_id)
+                keyed_row = self.keyed_rows[self.keyed_index[key]]
+                keyed_row[3].append(self.node_offset + node)
+                _id = keyed_row[0]
+            entity_id[node] = _id
+
+        return entity_id
+
+    def find_entity_id(self, entity_id: list, node: int) -> str:
+        if node >= len(entity_id) or entity_id[node] == None:
+            logger.error(f'Cannot find node {self.node_offset + node} in entity dict, exit.')
+            exit(-1)
+        return entity_id[node]
+
+    def add_stat_entities(self, stat_entities: list, entity_id: list) -> None:
+        """Encode statement rows [statement, statement, entities below it...] of the chunk.
+        """
+        for s_e in stat_entities:
+            self.files['stat2entity.txt'].write(','.join([self.find_entity_id(entity_id, x) for x in s_e]))
+
+    def add_triple(self, triple: tuple) -> bool:
+        """Write a triple (start id, end id, edge type) unless it is already encoded.
+        """
+        seen = self.keyed_triples if triple[0] in self.keyed_ids and triple[1] in self.keyed_ids else self.chunk_triples
+        if triple in seen:
+            return False
+        seen.add(triple)
+        self.files['triple2id.txt'].write(','.join(triple))
+        edge_type = int(triple[2])
+        for _kind, _mask in [['AST', AST_EDGE], ['CFG', CFG_EDGE], ['DFG', DDG_EDGE]]:
+            if edge_type & _mask:
+                self.triple_num[_kind] += 1
+        return True
+
+    def add_triples(self, edges: list, entity_id: list) -> None:
+        """Encode edges [start node, end node, edge type] of the chunk.
+        """
+        for s_node, e_node, e_type in edges:
+            self.add_triple((self.find_entity_id(entity_id, s_node), self.find_entity_id(entity_id, e_node), str(e_type)))
+
+    def add_cg_triples(self, cg_triples: list) -> None:
+        """Encode call graph triples [start id, end id, edge type], written to cg2id.txt and merged into triple2id.txt.
+        """
+        for cg_triple in cg_triples:
+            self.files['cg2id.txt'].write(','.join(cg_triple))
+            self.add_triple(tuple(cg_triple))
+
+    def add_clone_row(self, f_id: str, entity_ids: list) -> None:
+        self.files[self.clone_file].write(','.join([f_id] + entity_ids))
+
+    def add_degraded_rows(self, rows: list) -> None:
+        """Record functions built over their complexity budget, rows of utils.complexity.degraded_rows.
+        """
+        for row in rows:
+            self.files['degraded.txt'].write(','.join(row))
+
+    def close(self) -> None:
+        """Write the deduplicated entities and the vocabulary, and prefix every file with its row count.
+        """
+        for _id, node_type, node_token, nodes in self.keyed_rows:
+            _entity_item = [x.strip('\n').replace(',', ' ') for x in [node_type, node_token]]
+            self.files['entity2id.txt'].write(','.join([_id] + _entity_item + [str(x) for x in nodes]))
+        for part_file in self.files.values():
+            part_file.finalize()
+
+        with open(os.path.join(self.encode_path, 'typetoken2id.txt'), 'w') as f:
+            f.write(str(len(self.typetoken_id)) + '\n')
+            for _tt, _id in self.typetoken_id.items():
+                f.write(_id + ',' + _tt + '\n')
+
+        if self.files['degraded.txt'].rows > 0:
+            logger.info('{} functions over their complexity budget are degraded, listed in degraded.txt'.format(self.files['degraded.txt'].rows))
+        logger.info('Stream encoding: {} entities, {} typetokens, {} triples (AST: {}, CFG: {}, DFG: {})'.format(
+            self.entity_num, len(self.typetoken_id), self.files['triple2id.txt'].rows, self.triple_num['AST'], self.triple_num['CFG'], self.triple_num['DFG']))
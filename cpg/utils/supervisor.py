@@ -0,0 +1,230 @@
+"""Supervised worker processes with per-item time and memory budgets.
+
+Each item runs in a worker process watched by the caller. An item exceeding its
+wall-clock or RSS budget gets its worker killed and is skipped, exceptions and
+exit() calls inside the item are reported instead of stopping the batch, and
+items whose worker crashed are retried on a fresh worker before being quarantined.
+"""
+import json
+import os
+import time
+from collections import deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from utils.setting import logger
+
+# interval of checking budgets of running items (seconds)
+POLL_INTERVAL = 0.05
+
+class Budget():
+    """Resource budget of one item.
+
+    attributes:
+        timeout -- wall-clock seconds of one item, no limit if 0.
+        max_rss -- resident memory of a worker in bytes, no limit if 0 (only enforced where /proc is available).
+        retries -- times an item is retried after its worker crashed, then it is quarantined.
+    """
+    def __init__(self, timeout: float = 60, max_rss: int = 0, retries: int = 1) -> None:
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.retries = retries
+
+class SupervisedFailure(Exception):
+    """Raised by supervised_call when its item fails or runs over budget.
+
+    attributes:
+        status -- one of error, timeout, memory, crash (see supervised_map).
+        detail -- reason of the failure.
+    """
+    def __init__(self, status: str, detail: str) -> None:
+        super().__init__(f'{status}: {detail}')
+        self.status = status
+        self.detail = detail
+
+class FailureReport():
+    """Machine readable record of skipped items.
+
+    attributes:
+        report_path -- json file written by write().
+        failures -- list of dicts (stage, file, func, reason, detail, elapsed).
+    """
+    def __init__(self, report_path: str) -> None:
+        self.report_path = report_path
+        self.failures = list()
+
+    def add(self, stage: str, file_name: str, func_name: str, reason: str, detail: str = '', elapsed: float = None) -> None:
+        self.failures.append({'stage': stage, 'file': file_name, 'func': func_name, 'reason': reason, 'detail': detail, 'elapsed': elapsed})
+        logger.warning(f'Skip {stage} of {file_name} {func_name}: {reason} {detail}')
+
+    def write(self) -> None:
+        counts = dict()
+        for failure in self.failures:
+            counts[failure['reason']] = counts.get(failure['reason'], 0) + 1
+        report_dir = os.path.dirname(self.report_path)
+        if report_dir and not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+        with open(self.report_path, 'w') as f:
+            json.dump({'counts': counts, 'failures': self.failures}, f, indent=2)
+        logger.info(f'Failure report: {len(self.failures)} skipped, written to {self.report_path}')
+
+def process_rss(pid: int) -> int:
+    """Resident memory of process pid in bytes, None if it cannot be read.
+    """
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def supervised_worker(conn, func, initializer, initargs: tuple) -> None:
+    """Worker loop, run func on every [idx, item] received until None arrives.
+    """
+    if initializer != None:
+        initializer(*initargs)
+    while True:
+        task = conn.recv()
+        if task == None:
+            break
+        idx, item = task
+        start = time.time()
+        try:
+            res = ['ok', func(item), '']
+        except MemoryError:
+            res = ['memory', None, 'MemoryError']
+        except SystemExit as e:
+            res = ['error', None, f'exit({e.code})']
+        except Exception as e:
+            res = ['error', None, repr(e)]
+        elapsed = time.time() - start
+        try:
+            conn.send([idx] + res + [elapsed])
+        except Exception as e:
+            conn.send([idx, 'error', None, f'cannot send result: {e!r}', elapsed])
+
+class WorkerSlot():
+    """One supervised worker process and the item it is running.
+    """
+    def __init__(self, func, initializer, initargs: tuple) -> None:
+        self.func = func
+        self.initializer = initializer
+        self.initargs = initargs
+        self.process = None
+        self.conn = None
+        self.task = None
+        self.start = None
+        self.spawn()
+
+    def spawn(self) -> None:
+        parent_conn, child_conn = Pipe()
+        self.process = Process(target=supervised_worker, args=(child_conn, self.func, self.initializer, self.initargs))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.task = None
+
+    def submit(self, idx: int, item) -> None:
+        self.task = idx
+        self.start = time.time()
+        self.conn.send([idx, item])
+
+    def kill(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+    def restart(self) -> None:
+        self.kill()
+        self.spawn()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+def supervised_map(func, items: list, workers: int = 1, budget: Budget = None, initializer=None, initargs: tuple = ()):
+    """Apply func to every item in supervised worker processes and yield the results in the order of items.
+
+    attributes:
+        func -- module level function applied to each item (must be picklable).
+        items -- list of inputs.
+        workers -- number of worker processes.
+        budget -- time, memory and retry budget of each item.
+        initializer -- function called once per worker.
+        initargs -- arguments of initializer.
+
+    returns:
+        generator of [status, result, detail, elapsed], status is one of ok, error, timeout, memory, crash, result is None unless ok.
+    """
+    if budget == None:
+        budget = Budget()
+    if budget.max_rss and process_rss(os.getpid()) == None:
+        logger.warning('Cannot read process memory on this platform, memory budget is not enforced')
+    pending = deque(range(len(items)))
+    attempts = [0] * len(items)
+    results = dict()
+    next_idx = 0
+    slots = [WorkerSlot(func, initializer, initargs) for _ in range(max(1, min(workers, len(items))))]
+
+    try:
+        while next_idx < len(items):
+            for slot in slots:
+                if slot.task == None and pending:
+                    idx = pending.popleft()
+                    slot.submit(idx, items[idx])
+            busy = [slot for slot in slots if slot.task != None]
+            wait([slot.conn for slot in busy] + [slot.process.sentinel for slot in busy], POLL_INTERVAL)
+            for slot in busy:
+                idx = slot.task
+                elapsed = time.time() - slot.start
+                if slot.conn.poll():
+                    try:
+                        _, status, res, detail, elapsed = slot.conn.recv()
+                        results[idx] = [status, res, detail, elapsed]
+                        slot.task = None
+                        # memory freed by python is rarely returned, recycle workers that grew large
+                        if budget.max_rss:
+                            rss = process_rss(slot.process.pid)
+                            if rss != None and rss > budget.max_rss // 2:
+                                slot.restart()
+                        continue
+                    except (EOFError, OSError):
+                        pass
+                if not slot.process.is_alive() or slot.conn.closed:
+                    attempts[idx] += 1
+                    if attempts[idx] <= budget.retries:
+                        pending.appendleft(idx)
+                    else:
+                        results[idx] = ['crash', None, f'worker exit code {slot.process.exitcode}', elapsed]
+                    slot.restart()
+                elif budget.timeout and elapsed > budget.timeout:
+                    results[idx] = ['timeout', None, f'exceeds {budget.timeout}s', elapsed]
+                    slot.restart()
+                elif budget.max_rss:
+                    rss = process_rss(slot.process.pid)
+                    if rss != None and rss > budget.max_rss:
+                        results[idx] = ['memory', None, f'rss {rss // 1024 // 1024}MB exceeds {budget.max_rss // 1024 // 1024}MB', elapsed]
+                        slot.restart()
+            while next_idx in results:
+                yield results.pop(next_idx)
+                next_idx += 1
+    finally:
+        for slot in slots:
+            slot.stop()
+
+def supervised_call(func, item, budget: Budget = None):
+    """Apply func to item in one supervised worker process.
+
+    returns:
+        result -- func(item), SupervisedFailure is raised if it fails or runs over budget.
+    """
+    status, result, detail, _ = next(supervised_map(func, [item], 1, budget))
+    if status != 'ok':
+        raise SupervisedFailure(status, detail)
+    return result
@@ -0,0 +1,53 @@
+"""Traversal primitives shared by the cpg constructors of the c and java pipelines.
+
+Neighbours are read from the adjacency of the CPGraph and filtered by ANDing their edge types with a mask
+of edge kinds, queues are deques and visited nodes are kept in sets.
+"""
+from collections import deque
+from utils.compact_cpg import CFG_EDGE, CPGraph
+
+def typed_successors(cpg: CPGraph, node: int, edge_mask: int) -> list:
+    """Successors of node connected by an edge of any kind in edge_mask (e.g., AST_EDGE | CFG_EDGE).
+    """
+    return [_successor for _successor, _edge_type in cpg.successor_items(node) if _edge_type & edge_mask]
+
+def typed_predecessors(cpg: CPGraph, node: int, edge_mask: int) -> list:
+    """Predecessors of node connected by an edge of any kind in edge_mask.
+    """
+    return [_predecessor for _predecessor, _edge_type in cpg.predecessor_items(node) if _edge_type & edge_mask]
+
+def stat_successors(cpg: CPGraph, node: int, edge_mask: int = CFG_EDGE) -> list:
+    """Statement successors of node, connected by control flow edges by default.
+    """
+    return [_successor for _successor in typed_successors(cpg, node, edge_mask) if cpg.stat_flags[_successor]]
+
+def stat_predecessors(cpg: CPGraph, node: int, edge_mask: int = CFG_EDGE) -> list:
+    """Statement predecessors of node, connected by control flow edges by default.
+    """
+    return [_predecessor for _predecessor in typed_predecessors(cpg, node, edge_mask) if cpg.stat_flags[_predecessor]]
+
+def entity_successors(cpg: CPGraph, node: int, edge_mask: int = None) -> list:
+    """Non-statement successors of node, connected by any edge if edge_mask is None.
+    """
+    if edge_mask == None:
+        successors = cpg.successors(node)
+    else:
+        successors = typed_successors(cpg, node, edge_mask)
+    return [_successor for _successor in successors if not cpg.stat_flags[_successor]]
+
+def level_order(start: int, neighbours):
+    """Yield nodes reachable from start in level order, each node once.
+
+    attributes:
+        start -- the first node.
+        neighbours -- function node -> iterable of next nodes (e.g., lambda x: stat_successors(cpg, x)).
+    """
+    visited = {start}
+    queue = deque([start])
+    while queue:
+        current_node = queue.popleft()
+        yield current_node
+        for _next in neighbours(current_node):
+            if _next not in visited:
+                visited.add(_next)
+                queue.append(_next)
@@ -8,6 +8,11 @@ from util.setting import log
 from util.helper import ensure_dir, exist_dir
 from random_choice import randint_choice
 
+# bits of edge kinds in the relation ids of triple2id.txt
+AST_EDGE = 4
+CFG_EDGE = 2
+PDG_EDGE = 1
+
 class Data(object):
     def __init__(self, args:argparse.Namespace) -> None:
         super().__init__()
@@ -160,20 +165,18 @@ class Data(object):
                 t_id = int(triple[1])
                 r_id = int(triple[2])
 
-                # We hardcode AST, CFG, and PDG as 100, 010, and 001
-                r_b = "{0:03b}".format(r_id)
-
-                if not (r_b == '100' or r_b == '110' or r_b == '111' or r_b == '010' or r_b == '011' or r_b == '001' or r_b == '101'):
+                # r_id is the bitmask of edge kinds, AST, CFG, and PDG are 100, 010, and 001
+                if r_id <= 0 or r_id > AST_EDGE | CFG_EDGE | PDG_EDGE:
                     log.error('unknown r_id in {}'.format(triple))
                     exit(-1)
 
-                if r_b[0] == '1':
+                if r_id & AST_EDGE:
                     inter_dict[0].append([h_id, t_id])
                     inter_mat.append([h_id, t_id])
-                if r_b[1] == '1' and self.cpg_no_cfg == False:
+                if r_id & CFG_EDGE and self.cpg_no_cfg == False:
                     inter_dict[1].append([h_id, t_id])
                     inter_mat.append([h_id, t_id])
-                if r_b[2] == '1' and self.cpg_no_dfg == False:
+                if r_id & PDG_EDGE and self.cpg_no_dfg == False:
                     inter_dict[2].append([h_id, t_id])
                     inter_mat.append([h_id, t_id])
 